@@ -2,7 +2,7 @@
 # BEE2_config creates this config file to allow easy cross-module access
 from BEE2_config import GEN_OPTS
 
-from app import gameMan, paletteLoader, UI, music_conf, logWindow, img, TK_ROOT
+from app import gameMan, paletteLoader, UI, music_conf, logWindow, img, tkMarkdown, TK_ROOT
 import loadScreen
 import packages
 import utils
@@ -109,6 +109,9 @@ LOGGER.info('Initialising UI...')
 UI.init_windows()  # create all windows
 LOGGER.info('UI initialised!')
 
+# Render the remaining descriptions while the user is busy.
+tkMarkdown.start_prerender()
+
 loadScreen.main_loader.destroy()
 # Delay this until the loop has actually run.
 # Directly run TK_ROOT.lift() in TCL, instead
@@ -3,6 +3,7 @@ from tkinter import filedialog
 from tkinter import ttk
 from app.tooltip import add_tooltip, set_tooltip
 import base64
+import os
 
 from PIL import Image, ImageTk
 
@@ -14,8 +15,10 @@ from packages import CORRIDOR_COUNTS, CorrDesc
 from srctools import Property, AtomicWriter
 from srctools.logger import get_logger
 from app.tk_tools import FileField
+import compile_stats
+import light_profiles
 
-from typing import Dict, Tuple, Optional
+from typing import Dict, List, Tuple, Optional
 
 
 LOGGER = get_logger(__name__)
@@ -71,6 +74,7 @@ PLAYER_MODELS_REV = {value: key for key, value in PLAYER_MODELS.items()}
 
 COMPILE_CFG = ConfigFile('compile.cfg')
 COMPILE_CFG.set_defaults(COMPILE_DEFAULTS)
+COMPILE_CFG.set_defaults(light_profiles.DEFAULTS)
 window = None
 UI = {}  # type: Dict[str, Widget]
 
@@ -111,6 +115,26 @@ count_brush.should_flash = False
 count_entity.should_flash = False
 count_overlay.should_flash = False
 
+# Statistics for recent compiles, written by VBSP.
+COMPILE_HISTORY = compile_stats.HistoryReader()
+# How often to check for new compiles, in milliseconds.
+HISTORY_POLL_DELAY = 1000
+# The number of compiles to average for trends.
+TREND_COUNT = 10
+# Profile name -> the text for its radiobutton.
+LIGHT_PROFILE_NAMES: Dict[str, str] = {}
+# When the lighting timings were last read.
+light_times_mtime = 0
+# Names for the compile stages recorded by VBSP.
+STAGE_NAMES = {
+    'settings': _('Loading settings'),
+    'load': _('Parsing map'),
+    'conditions': _('Conditions'),
+    'generate': _('Generating geometry'),
+    'save': _('Saving'),
+    'vbsp': _('VBSP'),
+}
+
 # The data for the 3 progress bars -
 # (variable, config_name, default_max, description)
 COUNT_CATEGORIES = [
@@ -140,9 +164,13 @@ COUNT_CATEGORIES = [
     ),
 ]
 
-vrad_light_type = IntVar(
-    value=COMPILE_CFG.get_bool('General', 'vrad_force_full')
-)
+vrad_profile = StringVar(value=COMPILE_CFG.get_val(
+    'General', 'vrad_profile',
+    # Previously this was a boolean.
+    light_profiles.PROFILE_FULL
+    if COMPILE_CFG.get_bool('General', 'vrad_force_full')
+    else light_profiles.PROFILE_FAST,
+))
 cleanup_screenshot = IntVar(
     value=COMPILE_CFG.get_bool('Screenshot', 'del_old', True)
 )
@@ -353,9 +381,46 @@ def flash_count():
         TK_ROOT.after(750, flash_count)
 
 
-def refresh_counts(reload=True):
+def poll_history() -> None:
+    """Check for new compiles periodically, and display them."""
+    try:
+        if COMPILE_HISTORY.poll():
+            refresh_counts(reload=False)
+        try:
+            mtime = os.stat(light_profiles.TIMINGS_LOC).st_mtime_ns
+        except FileNotFoundError:
+            pass
+        else:
+            if mtime != light_times_mtime:
+                refresh_light_times()
+    finally:
+        TK_ROOT.after(HISTORY_POLL_DELAY, poll_history)
+
+
+def _trend(value: float, previous: List[float]) -> str:
+    """Describe how a value compares to the average of previous compiles."""
+    if not previous:
+        return ''
+    average = sum(previous) / len(previous)
+    # i18n: Shows the average of the previous compiles.
+    return _('(avg. {:.0f}, {:+.0f})').format(average, value - average)
+
+
+def refresh_counts(reload: bool=True) -> None:
+    """Display the statistics for the last compile.
+
+    If reload is set, compile.cfg is reloaded too, in case the compile
+    predates the history.
+    """
     if reload:
         COMPILE_CFG.load()
+    COMPILE_HISTORY.poll()
+    latest = COMPILE_HISTORY.latest
+    # The previous successful compiles, to show trends.
+    previous = [
+        stats for stats in COMPILE_HISTORY.successful()
+        if stats is not latest
+    ][-TREND_COUNT:]
 
     # Don't re-run the flash function if it's already on.
     run_flash = not (
@@ -365,7 +430,13 @@ def refresh_counts(reload=True):
     )
 
     for bar_var, name, default, tip_blurb in COUNT_CATEGORIES:
-        value = COMPILE_CFG.get_int('Counts', name)
+        if latest is not None:
+            value = latest.counts.get(name, 0)
+            max_value = latest.limits.get(name, 0)
+        else:
+            # Compiled before the history was added.
+            value = COMPILE_CFG.get_int('Counts', name)
+            max_value = COMPILE_CFG.get_int('Counts', 'max_' + name)
 
         if name == 'entity':
             # The in-engine entity limit is different to VBSP's limit
@@ -373,7 +444,7 @@ def refresh_counts(reload=True):
             max_value = default
         else:
             # Use or to ensure no divide-by-zero occurs..
-            max_value = COMPILE_CFG.get_int('Counts', 'max_' + name) or default
+            max_value = max_value or default
 
         # If it's hit the limit, make it continously scroll to draw
         # attention to the bar.
@@ -383,17 +454,50 @@ def refresh_counts(reload=True):
             bar_var.should_flash = False
             bar_var.set(100 * value / max_value)
 
-        set_tooltip(UI['count_' + name], '{}/{} ({:.2%}):\n{}'.format(
+        set_tooltip(UI['count_' + name], '{}/{} ({:.2%}) {}\n{}'.format(
             value,
             max_value,
             value / max_value,
+            _trend(value, [stats.counts.get(name, 0) for stats in previous]),
             tip_blurb,
         ))
 
+    if latest is not None and latest.timings:
+        total = latest.total_time
+        UI['count_time']['text'] = '{} {}'.format(
+            _('{:.1f}s').format(total),
+            _trend(total, [stats.total_time for stats in previous]),
+        )
+        set_tooltip(UI['count_time'], '\n'.join([
+            latest.map,
+        ] + [
+            '{}: {:.2f}s'.format(STAGE_NAMES.get(stage, stage), duration)
+            for stage, duration in latest.timings.items()
+        ]))
+    else:
+        UI['count_time']['text'] = ''
+        set_tooltip(UI['count_time'], '')
+
     if run_flash:
         flash_count()
 
 
+def refresh_light_times() -> None:
+    """Show how long VRAD has taken with each lighting profile."""
+    global light_times_mtime
+    try:
+        light_times_mtime = os.stat(light_profiles.TIMINGS_LOC).st_mtime_ns
+    except FileNotFoundError:
+        return
+    timings = light_profiles.average_times()
+    for profile, name in LIGHT_PROFILE_NAMES.items():
+        try:
+            average = timings[profile]
+        except KeyError:
+            continue
+        UI['light_' + profile]['text'] = '{} ({:.0f}s)'.format(name, average)
+
+
 def set_pack_dump_dir(path: str) -> None:
     COMPILE_CFG['General']['packfile_dump_dir'] = path
     COMPILE_CFG.save_check()
@@ -497,7 +601,7 @@ def make_widgets() -> None:
     make_setter('General', 'use_voice_priority', VOICE_PRIORITY_VAR)
     make_setter('General', 'spawn_elev', start_in_elev)
     make_setter('Screenshot', 'del_old', cleanup_screenshot)
-    make_setter('General', 'vrad_force_full', vrad_light_type)
+    make_setter('General', 'vrad_profile', vrad_profile)
 
     ttk.Label(window, justify='center', text=_(
         "Options on this panel can be changed \n"
@@ -628,18 +732,20 @@ def make_comp_widgets(frame: ttk.Frame):
     )
     vrad_frame.grid(row=1, column=0, sticky=EW)
 
+    LIGHT_PROFILE_NAMES[light_profiles.PROFILE_FAST] = _('Fast')
+    LIGHT_PROFILE_NAMES[light_profiles.PROFILE_FULL] = _('Full')
     UI['light_fast'] = ttk.Radiobutton(
         vrad_frame,
         text=_('Fast'),
-        value=0,
-        variable=vrad_light_type,
+        value=light_profiles.PROFILE_FAST,
+        variable=vrad_profile,
     )
     UI['light_fast'].grid(row=0, column=0)
     UI['light_full'] = ttk.Radiobutton(
         vrad_frame,
         text=_('Full'),
-        value=1,
-        variable=vrad_light_type,
+        value=light_profiles.PROFILE_FULL,
+        variable=vrad_profile,
     )
     UI['light_full'].grid(row=0, column=1)
 
@@ -656,6 +762,18 @@ def make_comp_widgets(frame: ttk.Frame):
           "but takes longer to compute. Use if you're arranging lights.\n"
           "When publishing, this is always used.")
     )
+    # Additional profiles defined in the config.
+    for i, profile in enumerate(light_profiles.get_profiles(COMPILE_CFG)[2:], start=2):
+        LIGHT_PROFILE_NAMES[profile] = light_profiles.display_name(COMPILE_CFG, profile)
+        UI['light_' + profile] = ttk.Radiobutton(
+            vrad_frame,
+            text=LIGHT_PROFILE_NAMES[profile],
+            value=profile,
+            variable=vrad_profile,
+        )
+        UI['light_' + profile].grid(row=i // 2, column=i % 2)
+        add_tooltip(UI['light_' + profile])
+    refresh_light_times()
 
     packfile_enable = ttk.Checkbutton(
         frame,
@@ -756,11 +874,18 @@ def make_comp_widgets(frame: ttk.Frame):
     )
     UI['count_brush'].grid(row=3, column=2, sticky=EW, padx=5)
 
-    for wid_name in ('count_overlay', 'count_entity', 'count_brush'):
+    UI['count_time'] = ttk.Label(
+        count_frame,
+        anchor=CENTER,
+    )
+    UI['count_time'].grid(row=4, column=0, columnspan=3, sticky=EW)
+
+    for wid_name in ('count_overlay', 'count_entity', 'count_brush', 'count_time'):
         # Add in tooltip logic to the widgets.
         add_tooltip(UI[wid_name])
 
     refresh_counts(reload=False)
+    TK_ROOT.after(HISTORY_POLL_DELAY, poll_history)
 
 
 def make_map_widgets(frame: ttk.Frame):
@@ -68,6 +68,8 @@ selected_style = "BEE2_CLEAN"
 selectedPalette = 0
 # fake value the menu radio buttons set
 selectedPalette_radio = IntVar(value=0)
+# The label and readonly flag of each palette currently in the listbox and menu.
+_pal_shown = []  # type: List[Tuple[str, bool]]
 # Variable used for export button (changes to include game name)
 EXPORT_CMD_VAR = StringVar(value=_('Export...'))
 # If set, save settings into the palette in addition to items.
@@ -719,59 +721,74 @@ def suggested_refresh():
 
 
 def refresh_pal_ui() -> None:
-    """Update the UI to show the correct palettes."""
+    """Update the UI to show the correct palettes.
+
+    Only the entries which changed since the last call are replaced.
+    """
     global selectedPalette
     cur_palette = paletteLoader.pal_list[selectedPalette]
     paletteLoader.pal_list.sort(key=str)  # sort by name
     selectedPalette = paletteLoader.pal_list.index(cur_palette)
 
     listbox = UI['palette']  # type: Listbox
-    listbox.delete(0, END)
+    pal_menu = menus['pal']  # type: Menu
 
-    for i, pal in enumerate(paletteLoader.pal_list):
-        if pal.settings is not None:
-            listbox.insert(i, CHR_GEAR + pal.name)
-        else:
-            listbox.insert(i, pal.name)
-
-        if pal.prevent_overwrite:
-            listbox.itemconfig(
-                i,
-                foreground='grey',
-                background=tk_tools.LISTBOX_BG_COLOR,
-                selectbackground=tk_tools.LISTBOX_BG_SEL_COLOR,
-            )
-        else:
-            listbox.itemconfig(
-                i,
-                foreground='black',
-                background=tk_tools.LISTBOX_BG_COLOR,
-                selectbackground=tk_tools.LISTBOX_BG_SEL_COLOR,
-            )
+    new_shown = [
+        (CHR_GEAR + pal.name if pal.has_settings else pal.name, pal.prevent_overwrite)
+        for pal in paletteLoader.pal_list
+    ]
+    # The radiobuttons are always at the end of the menu.
+    menu_start = pal_menu.index(END) + 1 - len(_pal_shown)
+
+    # Find the range which differs, everything outside that is kept.
+    prefix = 0
+    max_prefix = min(len(_pal_shown), len(new_shown))
+    while prefix < max_prefix and _pal_shown[prefix] == new_shown[prefix]:
+        prefix += 1
+    suffix = 0
+    while (
+        suffix < max_prefix - prefix
+        and _pal_shown[-1 - suffix] == new_shown[-1 - suffix]
+    ):
+        suffix += 1
+    old_end = len(_pal_shown) - suffix
+    new_end = len(new_shown) - suffix
+
+    if old_end > prefix:
+        listbox.delete(prefix, old_end - 1)
+        pal_menu.delete(menu_start + prefix, menu_start + old_end - 1)
+
+    for i in range(prefix, new_end):
+        label, readonly = new_shown[i]
+        listbox.insert(i, label)
+        listbox.itemconfig(
+            i,
+            foreground='grey' if readonly else 'black',
+            background=tk_tools.LISTBOX_BG_COLOR,
+            selectbackground=tk_tools.LISTBOX_BG_SEL_COLOR,
+        )
+        pal_menu.insert_radiobutton(
+            menu_start + i,
+            label=label,
+            variable=selectedPalette_radio,
+            value=i,
+            command=set_pal_radio,
+        )
+
+    if new_end != old_end:
+        # The palettes after the changed section were moved.
+        for i in range(new_end, len(new_shown)):
+            pal_menu.entryconfigure(menu_start + i, value=i)
+
+    _pal_shown[:] = new_shown
 
     if len(paletteLoader.pal_list) < 2 or cur_palette.prevent_overwrite:
         UI['pal_remove'].state(('disabled',))
-        menus['pal'].entryconfigure(1, state=DISABLED)
+        pal_menu.entryconfigure(1, state=DISABLED)
     else:
         UI['pal_remove'].state(('!disabled',))
-        menus['pal'].entryconfigure(1, state=NORMAL)
+        pal_menu.entryconfigure(1, state=NORMAL)
 
-    for ind in range(menus['pal'].index(END), 0, -1):
-        # Delete all the old radiobuttons
-        # Iterate backward to ensure indexes stay the same.
-        if menus['pal'].type(ind) == RADIOBUTTON:
-            menus['pal'].delete(ind)
-    # Add a set of options to pick the palette into the menu system
-    for val, pal in enumerate(paletteLoader.pal_list):
-        menus['pal'].add_radiobutton(
-            label=(
-                pal.name if pal.settings is None
-                else CHR_GEAR + pal.name
-            ),
-            variable=selectedPalette_radio,
-            value=val,
-            command=set_pal_radio,
-            )
     selectedPalette_radio.set(selectedPalette)
 
 
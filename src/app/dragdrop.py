@@ -1,6 +1,7 @@
 """Implements drag/drop logic."""
 from collections import defaultdict
 
+import time
 import tkinter
 import utils
 from app import sound, img, TK_ROOT
@@ -35,6 +36,9 @@ ItemT = TypeVar('ItemT', bound=ItemProto)  # The object the items move around.
 
 # Tag used on canvases for our flowed slots.
 _CANV_TAG = '_BEE2_dragdrop_item'
+# Minimum time between processing motion events while dragging, in seconds.
+# This roughly matches the display refresh rate.
+_MOVE_INTERVAL = 1 / 60
 
 
 class Event(Enum):
@@ -92,6 +96,17 @@ class Manager(Generic[ItemT]):
         # While dragging, the place we started at.
         self._cur_prev_slot = None  # type: Optional[Slot[ItemT]]
 
+        # The target slots bucketed by screen position, for finding the slot
+        # under the cursor. Cells are the size of a slot, each slot is put
+        # into every cell it overlaps. None if this needs to be rebuilt.
+        self._hit_index = None  # type: Optional[Dict[Tuple[int, int], List[Tuple[Slot[ItemT], int, int, int, int]]]]
+        # Motion events are throttled - the most recent position, the time
+        # it was last handled, and the scheduled callback if any.
+        self._move_pos = (0, 0)
+        self._move_time = 0.0
+        self._move_pending = None  # type: Optional[str]
+        self._drag_cursor = ''
+
         self._callbacks = {
             event: []
             for event in Event
@@ -131,12 +146,14 @@ class Manager(Generic[ItemT]):
             self._sources.append(slot)
         else:
             self._targets.append(slot)
+            self._hit_index = None
 
         return slot
 
     def remove(self, slot: 'Slot[ItemT]') -> None:
         """Remove the specified slot."""
         (self._sources if slot.is_source else self._targets).remove(slot)
+        self._hit_index = None
 
     def refresh_icons(self) -> None:
         """Update all items to set new icons."""
@@ -178,6 +195,7 @@ class Manager(Generic[ItemT]):
         Any previously added slots will be removed.
         padding is the amount added on each side of each slot.
         """
+        self._hit_index = None
         canv.delete(_CANV_TAG)
         item_width = self.width + spacing * 2
         item_height = self.width + spacing * 2
@@ -226,19 +244,35 @@ class Manager(Generic[ItemT]):
         for cback in self._callbacks[event]:
             cback(slot)
 
+    def _build_hit_index(self) -> None:
+        """Record the screen position of each target slot.
+
+        Slots can't be moved while dragging (the drag window has the grab),
+        so this only needs to be done when a drag starts.
+        """
+        index = defaultdict(list)  # type: Dict[Tuple[int, int], List[Tuple[Slot[ItemT], int, int, int, int]]]
+        for slot in self._targets:
+            if slot._pos_type is None:
+                continue
+            lbl = slot._lbl
+            left = lbl.winfo_rootx()
+            top = lbl.winfo_rooty()
+            width = lbl.winfo_width()
+            height = lbl.winfo_height()
+            bbox = (slot, left, top, width, height)
+            for cell_x in range(left // self.width, (left + width) // self.width + 1):
+                for cell_y in range(top // self.height, (top + height) // self.height + 1):
+                    index[cell_x, cell_y].append(bbox)
+        self._hit_index = index
+
     def _pos_slot(self, x: float, y: float) -> 'Optional[Slot[ItemT]]':
         """Find the slot under this X,Y (if any)."""
-        for slot in self._targets:
-            if slot._pos_type is not None:
-                lbl = slot._lbl
-                if in_bbox(
-                    x, y,
-                    lbl.winfo_rootx(),
-                    lbl.winfo_rooty(),
-                    lbl.winfo_width(),
-                    lbl.winfo_height(),
-                ):
-                    return slot
+        if self._hit_index is None:
+            self._build_hit_index()
+        cell = (int(x // self.width), int(y // self.height))
+        for slot, left, top, width, height in self._hit_index.get(cell, ()):
+            if in_bbox(x, y, left, top, width, height):
+                return slot
         return None
 
     def _display_item(
@@ -306,6 +340,9 @@ class Manager(Generic[ItemT]):
 
         self._display_item(self._drag_lbl, self._cur_drag, show_group)
         self._cur_prev_slot = slot
+        # Windows may have moved since the last drag.
+        self._hit_index = None
+        self._drag_cursor = ''
 
         sound.fx('config')
 
@@ -323,24 +360,52 @@ class Manager(Generic[ItemT]):
         self._drag_win.bind(utils.EVENTS['LEFT_MOVE'], self._evt_move)
 
     def _evt_move(self, event: tkinter.Event) -> None:
-        """Reposition the item whenever moving."""
+        """Reposition the item whenever moving.
+
+        Motion events can arrive far faster than the screen updates, so
+        only the most recent position is used, at most once per frame.
+        """
         if self._cur_drag is None or self._cur_prev_slot is None:
             # We aren't dragging, ignore the event.
             return
 
+        self._move_pos = (event.x_root, event.y_root)
+        if self._move_pending is not None:
+            # Already scheduled, that'll use the new position.
+            return
+        delay = self._move_time + _MOVE_INTERVAL - time.perf_counter()
+        if delay <= 0:
+            self._do_move()
+        else:
+            self._move_pending = self._drag_win.after(
+                int(delay * 1000) + 1,
+                self._do_move,
+            )
+
+    def _do_move(self) -> None:
+        """Move the drag window to the last cursor position."""
+        self._move_pending = None
+        if self._cur_drag is None or self._cur_prev_slot is None:
+            return
+        self._move_time = time.perf_counter()
+        x, y = self._move_pos
+
         self._drag_win.geometry('+{}+{}'.format(
-            event.x_root - self.width // 2,
-            event.y_root - self.height // 2,
+            x - self.width // 2,
+            y - self.height // 2,
         ))
 
-        dest = self._pos_slot(event.x_root, event.y_root)
+        dest = self._pos_slot(x, y)
 
         if dest:
-            self._drag_win.configure(cursor=utils.CURSORS['move_item'])
+            cursor = utils.CURSORS['move_item']
         elif self._cur_prev_slot.is_source:
-            self._drag_win.configure(cursor=utils.CURSORS['invalid_drag'])
+            cursor = utils.CURSORS['invalid_drag']
         else:
-            self._drag_win.configure(cursor=utils.CURSORS['destroy_item'])
+            cursor = utils.CURSORS['destroy_item']
+        if cursor != self._drag_cursor:
+            self._drag_cursor = cursor
+            self._drag_win.configure(cursor=cursor)
 
     def _evt_stop(self, event: tkinter.Event) -> None:
         """User released the item."""
@@ -348,6 +413,9 @@ class Manager(Generic[ItemT]):
             return
 
         sound.fx('config')
+        if self._move_pending is not None:
+            self._drag_win.after_cancel(self._move_pending)
+            self._move_pending = None
         self._drag_win.grab_release()
         self._drag_win.withdraw()
         self._drag_win.unbind(utils.EVENTS['LEFT_MOVE'])
@@ -16,9 +16,11 @@ import shutil
 import math
 import re
 import io
+import hashlib
 import pickle
 import pickletools
 import copy
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed
 
 from BEE2_config import ConfigFile, GEN_OPTS
 from srctools import (
@@ -247,6 +249,14 @@ def quit_application():
     sys.exit()
 
 
+def _encode_text(text: str) -> bytes:
+    """Encode generated text for write_if_changed().
+
+    This matches writing the file in text mode, using the platform's newlines.
+    """
+    return text.replace('\n', os.linesep).encode('utf8')
+
+
 def should_backup_app(file: str) -> bool:
     """Check if the given application is Valve's, or ours.
 
@@ -282,12 +292,16 @@ class Game:
         steam_id: str,
         folder: str,
         mod_times: Dict[str, int],
+        export_hashes: Dict[str, str]=None,
     ) -> None:
         self.name = name
         self.steamID = steam_id
         self.root = folder
         # The last modified date of packages, so we know whether to copy it over.
         self.mod_times = mod_times
+        # The modification time and hash of each generated file when last
+        # exported, so we can skip rewriting unchanged files.
+        self.export_hashes = export_hashes if export_hashes is not None else {}
 
     @classmethod
     def parse(cls, gm_id: str, config: ConfigFile) -> 'Game':
@@ -304,12 +318,15 @@ class Game:
             raise ValueError(f'Folder {folder} does not exist for game {gm_id}!')
 
         mod_times = {}
+        export_hashes = {}
 
         for name, value in config.items(gm_id):
             if name.startswith('pack_mod_'):
                 mod_times[name[9:].casefold()] = srctools.conv_int(value)
+            elif name.startswith('export_hash_'):
+                export_hashes[name[12:].casefold()] = value
 
-        return cls(gm_id, steam_id, folder, mod_times)
+        return cls(gm_id, steam_id, folder, mod_times, export_hashes)
 
     def save(self) -> None:
         """Write a game into the config page."""
@@ -319,6 +336,8 @@ class Game:
         CONFIG[self.name]['Dir'] = self.root
         for pack, mod_time in self.mod_times.items():
             CONFIG[self.name]['pack_mod_' + pack] = str(mod_time)
+        for path, file_hash in self.export_hashes.items():
+            CONFIG[self.name]['export_hash_' + path] = file_hash
 
     def dlc_priority(self) -> Iterator[str]:
         """Iterate through all subfolders, in order of high to low priority.
@@ -349,6 +368,41 @@ class Game:
         """Return the full path to something relative to this game's folder."""
         return os.path.normcase(os.path.join(self.root, path))
 
+    def write_if_changed(self, path: str, data: bytes) -> bool:
+        """Write data to the game-relative path, unless it's unchanged.
+
+        We store the hash and modification time of each file we write. If the
+        file wasn't touched since, we don't need to read it back to check.
+        Otherwise (Steam verified the cache, for example), the contents are
+        compared directly.
+        Returns whether the file was written.
+        """
+        full_path = self.abs_path(path)
+        key = path.casefold()
+        file_hash = hashlib.sha256(data).hexdigest()
+        try:
+            stat = os.stat(full_path)
+        except FileNotFoundError:
+            pass
+        else:
+            if stat.st_size == len(data):
+                if self.export_hashes.get(key) == f'{stat.st_mtime_ns}:{file_hash}':
+                    LOGGER.info('"{}" is unchanged, skipping.', path)
+                    return False
+                with open(full_path, 'rb') as file:
+                    if hashlib.sha256(file.read()).hexdigest() == file_hash:
+                        LOGGER.info('"{}" is unchanged, skipping.', path)
+                        self.export_hashes[key] = f'{stat.st_mtime_ns}:{file_hash}'
+                        return False
+
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        # AtomicWriter writes to a temporary file, then renames in one step.
+        # This ensures the file won't be half-written.
+        with srctools.AtomicWriter(full_path, is_bytes=True) as file:
+            file.write(data)
+        self.export_hashes[key] = f'{os.stat(full_path).st_mtime_ns}:{file_hash}'
+        return True
+
     def add_editor_sounds(
         self,
         sounds: Iterable[packages.EditorSound],
@@ -408,7 +462,13 @@ class Game:
                     clean_line = srctools.clean_line(line)
                     if add_line:
                         if clean_line == GAMEINFO_LINE:
-                            break  # Already added!
+                            # Already added, no need to rewrite the file.
+                            LOGGER.debug(
+                                "Gameinfo hook already present in {}",
+                                info_path,
+                            )
+                            data = None
+                            break
                         elif '|gameinfo_path|' in clean_line:
                             LOGGER.debug(
                                 "Adding gameinfo hook to {}",
@@ -435,6 +495,8 @@ class Game:
                         )
                     continue
 
+                if data is None:
+                    continue
                 with srctools.AtomicWriter(info_path) as file:
                     for line in data:
                         file.write(line)
@@ -485,19 +547,17 @@ class Game:
                 del data[i:]
                 break
 
-        with srctools.AtomicWriter(fgd_path, is_bytes=True) as file:
-            for line in data:
-                file.write(line)
-            if add_lines:
-                file.write(
-                    b'// BEE 2 EDIT FLAG = 1 \n'
-                    b'// Added automatically by BEE2. Set above to "0" to '
-                    b'allow editing below text without being overwritten.\n'
-                    b'\n\n'
-                )
-                with utils.install_path('BEE2.fgd').open('rb') as bee2_fgd:
-                    shutil.copyfileobj(bee2_fgd, file)
-                file.write(imp_res_read_binary(srctools, 'srctools.fgd'))
+        if add_lines:
+            data.append(
+                b'// BEE 2 EDIT FLAG = 1 \n'
+                b'// Added automatically by BEE2. Set above to "0" to '
+                b'allow editing below text without being overwritten.\n'
+                b'\n\n'
+            )
+            data.append(utils.install_path('BEE2.fgd').read_bytes())
+            data.append(imp_res_read_binary(srctools, 'srctools.fgd'))
+
+        self.write_if_changed('bin/portal2.fgd', b''.join(data))
 
     def cache_invalid(self) -> bool:
         """Check to see if the cache is valid."""
@@ -589,6 +649,7 @@ class Game:
             pass
 
         self.mod_times.clear()
+        self.export_hashes.clear()
 
     def export(
         self,
@@ -650,6 +711,12 @@ class Game:
         # Gameinfo
         export_screen.set_length('EXP', len(packages.OBJ_TYPES) + 6)
 
+        # Exporters which only write their own files, and the final config
+        # writers run in the background. Everything modifying the shared
+        # configs is run here in order, so the output is deterministic.
+        executor = ThreadPoolExecutor(thread_name_prefix='export')
+        background: Dict[Future, str] = {}
+
         # Do this before setting music and resources,
         # those can take time to compute.
         export_screen.show()
@@ -684,22 +751,23 @@ class Game:
                 if obj_name == 'Style':
                     continue  # Done above already
 
-                LOGGER.info('Exporting "{}"', obj_name)
                 selected = selected_objects.get(obj_name, None)
+                exp_data = packages.ExportData(
+                    game=self,
+                    selected=selected,
+                    all_items=all_items,
+                    renderables=renderables,
+                    vbsp_conf=vbsp_config,
+                    selected_style=style,
+                )
 
-                try:
-                    obj_data.cls.export(packages.ExportData(
-                        game=self,
-                        selected=selected,
-                        all_items=all_items,
-                        renderables=renderables,
-                        vbsp_conf=vbsp_config,
-                        selected_style=style,
-                    ))
-                except packages.NoVPKExport:
-                    # Raised by StyleVPK to indicate it failed to copy.
-                    vpk_success = False
+                if not obj_data.export_shared:
+                    LOGGER.info('Exporting "{}" in the background', obj_name)
+                    background[executor.submit(obj_data.cls.export, exp_data)] = obj_name
+                    continue
 
+                LOGGER.info('Exporting "{}"', obj_name)
+                obj_data.cls.export(exp_data)
                 export_screen.step('EXP')
 
             vbsp_config.set_key(('Options', 'Game_ID'), self.steamID)
@@ -799,25 +867,17 @@ class Game:
                 self.edit_fgd(True)
             export_screen.step('EXP')
 
-            # AtomicWriter writes to a temporary file, then renames in one step.
-            # This ensures editoritems won't be half-written.
-            LOGGER.info('Writing Editoritems script...')
-            with srctools.AtomicWriter(self.abs_path('portal2_dlc2/scripts/editoritems.txt')) as editor_file:
-                editoritems.Item.export(editor_file, all_items, renderables)
-            export_screen.step('EXP')
-
-            LOGGER.info('Writing Editoritems database...')
-            with open(self.abs_path('bin/bee2/editor.bin'), 'wb') as inst_file:
-                pick = pickletools.optimize(pickle.dumps(all_items))
-                inst_file.write(pick)
-            export_screen.step('EXP')
-
-            LOGGER.info('Writing VBSP Config!')
-            os.makedirs(self.abs_path('bin/bee2/'), exist_ok=True)
-            with open(self.abs_path('bin/bee2/vbsp_config.cfg'), 'w', encoding='utf8') as vbsp_file:
-                for line in vbsp_config.export():
-                    vbsp_file.write(line)
-            export_screen.step('EXP')
+            # The shared configs are complete, write them out while we copy
+            # the compiler and resources.
+            background[executor.submit(
+                self._write_editoritems, all_items, renderables,
+            )] = 'editoritems.txt'
+            background[executor.submit(
+                self._write_editor_db, all_items,
+            )] = 'editor.bin'
+            background[executor.submit(
+                self._write_vbsp_config, vbsp_config,
+            )] = 'vbsp_config.cfg'
 
             if num_compiler_files > 0:
                 LOGGER.info('Copying Custom Compiler!')
@@ -829,6 +889,21 @@ class Game:
 
                     dest = self.abs_path('bin' / comp_file.relative_to(compiler_src))
 
+                    # We copy with metadata, so matching size and mtime
+                    # means this is the file we copied last time.
+                    src_stat = comp_file.stat()
+                    try:
+                        dest_stat = os.stat(dest)
+                    except FileNotFoundError:
+                        pass
+                    else:
+                        if (
+                            dest_stat.st_size == src_stat.st_size and
+                            int(dest_stat.st_mtime) == int(src_stat.st_mtime)
+                        ):
+                            export_screen.step('COMP')
+                            continue
+
                     LOGGER.info('\t* {} -> {}', comp_file, dest)
 
                     folder = Path(dest).parent
@@ -840,7 +915,7 @@ class Game:
                             # First try and give ourselves write-permission,
                             # if it's set read-only.
                             utils.unset_readonly(dest)
-                        shutil.copy(comp_file, dest)
+                        shutil.copy2(comp_file, dest)
                     except PermissionError:
                         # We might not have permissions, if the compiler is currently
                         # running.
@@ -862,6 +937,15 @@ class Game:
                 music_files = self.copy_mod_music()
                 self.refresh_cache(music_files)
 
+            for future in as_completed(background):
+                try:
+                    future.result()
+                except packages.NoVPKExport:
+                    # Raised by StyleVPK to indicate it failed to copy.
+                    vpk_success = False
+                LOGGER.info('Exported "{}"', background[future])
+                export_screen.step('EXP')
+
             LOGGER.info('Optimizing editor models...')
             self.clean_editor_models(all_items)
             export_screen.step('EXP')
@@ -873,10 +957,54 @@ class Game:
                 with open(self.abs_path('sdk_content/maps/instances/bee2/tag_coop_gun.vmf'), 'w') as f:
                     TAG_COOP_INST_VMF.export(f)
 
+            # Record the hashes of the files we generated.
+            self.save()
+            CONFIG.save_check()
+
             export_screen.reset()  # Hide loading screen, we're done
             return True, vpk_success
         except loadScreen.Cancelled:
             return False, False
+        finally:
+            # If we failed, don't bother running anything which hasn't
+            # started yet.
+            for future in background:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+    def _write_editoritems(
+        self,
+        all_items: List[editoritems.Item],
+        renderables: Dict[editoritems.RenderableType, editoritems.Renderable],
+    ) -> None:
+        """Generate and write editoritems.txt.
+
+        Each file is generated in memory, then only written if it changed
+        since the last export.
+        """
+        LOGGER.info('Writing Editoritems script...')
+        editor_file = io.StringIO()
+        editoritems.Item.export(editor_file, all_items, renderables)
+        self.write_if_changed(
+            'portal2_dlc2/scripts/editoritems.txt',
+            _encode_text(editor_file.getvalue()),
+        )
+
+    def _write_editor_db(self, all_items: List[editoritems.Item]) -> None:
+        """Pickle the items, so the compiler can read the parsed data."""
+        LOGGER.info('Writing Editoritems database...')
+        self.write_if_changed(
+            'bin/bee2/editor.bin',
+            pickletools.optimize(pickle.dumps(all_items)),
+        )
+
+    def _write_vbsp_config(self, vbsp_config: Property) -> None:
+        """Write vbsp_config.cfg."""
+        LOGGER.info('Writing VBSP Config!')
+        self.write_if_changed(
+            'bin/bee2/vbsp_config.cfg',
+            _encode_text(''.join(vbsp_config.export())),
+        )
 
     def clean_editor_models(self, items: Iterable[editoritems.Item]) -> None:
         """The game is limited to having 1024 models loaded at once.
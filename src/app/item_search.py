@@ -1,47 +1,121 @@
+"""Implements the searchbar for the item list.
+
+The search index is built once the packages are loaded, then only the items
+which changed are updated when styles are switched. Queries are run in a
+background thread after typing pauses, so the UI stays responsive.
+"""
 from tkinter import ttk
 import tkinter as tk
 
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, Future
+import threading
 
-from app import UI
+from app import UI, tkMarkdown
 
 from marisa_trie import Trie
-from typing import Dict, Optional, Set, Callable, Tuple
+from typing import Dict, Optional, Set, FrozenSet, Callable, Tuple, Iterable
 import srctools.logger
 
 
 LOGGER = srctools.logger.get_logger(__name__)
+ItemKey = Tuple[str, int]  # Item ID, subtype index.
+
 database = Trie()
-word_to_ids: Dict[str,  Set[Tuple[str, int]]] = defaultdict(set)
+word_to_ids: Dict[str, Set[ItemKey]] = defaultdict(set)
+# The words currently indexed for each item, so we can update incrementally.
+item_words: Dict[ItemKey, FrozenSet[str]] = {}
+# Each 3-letter sequence -> the words containing it, for matching the middle
+# of words.
+trigram_to_words: Dict[str, Set[str]] = defaultdict(set)
+# Guards the above, since searches are done in the background.
+_index_lock = threading.Lock()
+
+# Wait this long (in ms) after the last keypress to search.
+DEBOUNCE_DELAY = 150
+_search_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix='item_search')
 _type_cback: Optional[Callable[[], None]] = None
 
 
-def init(frm: tk.Frame, refresh_cback: Callable[[Optional[Set[Tuple[str, int]]]], None]) -> None:
+def _trigrams(word: str) -> Iterable[str]:
+    """Produce all the 3-letter sequences in a word."""
+    for i in range(len(word) - 2):
+        yield word[i:i + 3]
+
+
+def _desc_text(desc: tkMarkdown.MarkdownData) -> str:
+    """Extract the plain text from a description.
+
+    This doesn't require the description to be rendered.
+    """
+    return desc.plain_text()
+
+
+def search(text: str) -> Optional[Set[ItemKey]]:
+    """Find all the items matching the given text.
+
+    Each complete word must match exactly, the last word may be the start
+    or part of an indexed word. None is returned if no words are present.
+    """
+    words = text.casefold().split()
+    if not words:
+        return None
+
+    found: Set[ItemKey] = set()
+    *words, last = words
+    with _index_lock:
+        for word in words:
+            # Don't use [], that would add the word to the defaultdict.
+            found.update(word_to_ids.get(word, ()))
+        if not last:
+            return found
+        for match in database.iterkeys(last):
+            found |= word_to_ids[match]
+        if len(last) >= 3:
+            # Find words containing this, by intersecting the trigrams.
+            grams = iter(_trigrams(last))
+            candidates = trigram_to_words.get(next(grams), set()).copy()
+            for gram in grams:
+                candidates &= trigram_to_words.get(gram, set())
+            for match in candidates:
+                if last in match:
+                    found |= word_to_ids[match]
+    return found
+
+
+def init(frm: tk.Frame, refresh_cback: Callable[[Optional[Set[ItemKey]]], None]) -> None:
     """Initialise the UI objects.
 
     The callback is triggered whenever the UI changes, passing along
     the visible items.
     """
     global _type_cback
-
-    def on_type(*args):
-        """Re-search whenever text is typed."""
-        text = search_var.get().casefold()
-        words = text.split()
-        if not words:
-            refresh_cback(None)
+    # The pending after() callback, and the most recent search sent off.
+    pending_id: Optional[str] = None
+    cur_search: Optional[Future] = None
+
+    def on_type(*args) -> None:
+        """Whenever text is typed, restart the countdown to searching."""
+        nonlocal pending_id
+        if pending_id is not None:
+            searchbar.after_cancel(pending_id)
+        pending_id = searchbar.after(DEBOUNCE_DELAY, start_search)
+
+    def start_search() -> None:
+        """Send the search off to the background thread."""
+        nonlocal pending_id, cur_search
+        pending_id = None
+        cur_search = _search_thread.submit(search, search_var.get())
+        searchbar.after(10, check_search, cur_search)
+
+    def check_search(fut: Future) -> None:
+        """Poll the search, then apply the results when done."""
+        if fut is not cur_search:
+            return  # A newer search superseded this one.
+        if not fut.done():
+            searchbar.after(10, check_search, fut)
             return
-
-        found: Set[Tuple[str, int]] = set()
-        *words, last = words
-        for word in words:
-            try:
-                found |= word_to_ids[word]
-            except KeyError:
-                pass
-        if last:
-            for match in database.iterkeys(last):
-                found |= word_to_ids[match]
+        found = fut.result()
 
         # Calling the callback deselects us, so save and restore.
         insert = searchbar.index('insert')
@@ -69,17 +143,55 @@ def init(frm: tk.Frame, refresh_cback: Callable[[Optional[Set[Tuple[str, int]]]]
 
 
 def rebuild_database() -> None:
-    """Rebuild the search database."""
+    """Update the search database.
+
+    Only items whose words changed since the last call are modified.
+    """
     global database
     LOGGER.info('Updating search database...')
-    # Clear and reset.
-    word_to_ids.clear()
 
+    new_words: Dict[ItemKey, FrozenSet[str]] = {}
     for item in UI.item_list.values():
+        desc_words = _desc_text(item.data.desc).split()
         for subtype_ind in item.visual_subtypes:
-            for tag in item.get_tags(subtype_ind):
-                for word in tag.split():
-                    word_to_ids[word.casefold()].add((item.id, subtype_ind))
-    database = Trie(word_to_ids.keys())
-    LOGGER.debug('Tags: {}', database.keys())
+            new_words[item.id, subtype_ind] = frozenset([
+                word.casefold()
+                for tag in item.get_tags(subtype_ind)
+                for word in tag.split()
+            ] + [
+                word.casefold().strip('.,:;!?()"\'')
+                for word in desc_words
+            ]) - {''}
+
+    changed = 0
+    with _index_lock:
+        for key in item_words.keys() - new_words.keys():
+            # Item removed entirely.
+            for word in item_words.pop(key):
+                word_to_ids[word].discard(key)
+            changed += 1
+
+        for key, words in new_words.items():
+            old_words = item_words.get(key, frozenset())
+            if words == old_words:
+                continue
+            changed += 1
+            for word in old_words - words:
+                word_to_ids[word].discard(key)
+            for word in words - old_words:
+                word_to_ids[word].add(key)
+            item_words[key] = words
+
+        if changed:
+            # Discard words which no longer match anything.
+            for word in [word for word, ids in word_to_ids.items() if not ids]:
+                del word_to_ids[word]
+                for gram in _trigrams(word):
+                    trigram_to_words[gram].discard(word)
+            for word in word_to_ids.keys() - database.keys():
+                for gram in _trigrams(word):
+                    trigram_to_words[gram].add(word)
+            database = Trie(word_to_ids.keys())
+
+    LOGGER.debug('{} items changed, {} words indexed.', changed, len(word_to_ids))
     _type_cback()
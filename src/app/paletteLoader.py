@@ -1,4 +1,5 @@
 import os
+import pickle
 import shutil
 import zipfile
 import random
@@ -6,9 +7,9 @@ import utils
 
 import srctools.logger
 import BEE2_config
-from srctools import Property, NoKeyError, KeyValError
+from srctools import Property, NoKeyError, KeyValError, AtomicWriter
 
-from typing import List, Tuple, Optional, Dict
+from typing import List, Tuple, Optional, Dict, NamedTuple
 
 
 LOGGER = srctools.logger.get_logger(__name__)
@@ -17,8 +18,24 @@ PAL_DIR = utils.conf_location('palettes/')
 
 PAL_EXT = '.bee2_palette'
 
+# Stores the name and flags for each palette file, so they don't need to be
+# parsed until selected.
+INDEX_LOC = utils.conf_location('cache/palettes.bin')
+# Increment if the format of the index changes.
+INDEX_VERSION = 1
+
 pal_list: List['Palette'] = []
 
+
+class IndexEntry(NamedTuple):
+    """The information about a palette file needed to list it."""
+    key: Tuple[int, int]  # Modification time and size.
+    name: str
+    trans_name: str
+    readonly: bool
+    has_settings: bool
+
+
 # Allow translating the names of the built-in palettes
 TRANS_NAMES: Dict[str, str] = {
     # i18n: Last exported items
@@ -218,17 +235,77 @@ class Palette:
         # None determines a filename automatically.
         self.filename = filename
         # List of id, index tuples.
-        self.pos = pos
+        self._pos = pos
         # If true, prevent overwriting the original file
         # (premade palettes or <LAST EXPORT>)
         self.prevent_overwrite = prevent_overwrite
 
         # If not None, settings associated with the palette.
-        self.settings = settings
+        self._settings = settings
+        # If False, pos and settings need to be read from the file.
+        self._loaded = True
+        self._has_settings = settings is not None
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_index(cls, filename: str, entry: IndexEntry) -> 'Palette':
+        """Create a palette from the index, which is read when required."""
+        pal = cls(
+            entry.name,
+            [],
+            trans_name=entry.trans_name,
+            prevent_overwrite=entry.readonly,
+            filename=filename,
+        )
+        pal._loaded = False
+        pal._has_settings = entry.has_settings
+        return pal
+
+    def _load(self) -> None:
+        """Read the items and settings from the file, if not already."""
+        if self._loaded:
+            return
+        self._loaded = True
+        LOGGER.debug('Loading palette "{}"', self.filename)
+        try:
+            parsed = Palette.parse(os.path.join(PAL_DIR, self.filename))
+        except (OSError, KeyValError) as exc:
+            LOGGER.warning('Could not parse palette file "{}":\n{}', self.filename, exc)
+            return
+        self._pos = parsed.pos
+        self._settings = parsed.settings
+        self._has_settings = parsed.settings is not None
+
+    @property
+    def pos(self) -> List[Tuple[str, int]]:
+        """The item ID and subtype for each position."""
+        self._load()
+        return self._pos
+
+    @pos.setter
+    def pos(self, value: List[Tuple[str, int]]) -> None:
+        self._load()
+        self._pos = value
+
+    @property
+    def settings(self) -> Optional[Property]:
+        """If not None, settings associated with the palette."""
+        self._load()
+        return self._settings
+
+    @settings.setter
+    def settings(self, value: Optional[Property]) -> None:
+        self._load()
+        self._settings = value
+        self._has_settings = value is not None
+
+    @property
+    def has_settings(self) -> bool:
+        """Check if settings are present, without loading the palette."""
+        return self._has_settings
+
 
     @classmethod
     def parse(cls, path: str):
@@ -314,8 +391,38 @@ class Palette:
             os.remove(os.path.join(PAL_DIR, self.filename))
 
 
+def _load_index() -> Dict[str, IndexEntry]:
+    """Load the palette index, if present."""
+    try:
+        with open(INDEX_LOC, 'rb') as f:
+            version, index = pickle.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception:
+        LOGGER.warning('Could not read palette index:', exc_info=True)
+        return {}
+    if version != INDEX_VERSION:
+        return {}
+    return index
+
+
+def _save_index(index: Dict[str, IndexEntry]) -> None:
+    """Write out the palette index."""
+    try:
+        with AtomicWriter(str(INDEX_LOC), is_bytes=True) as f:
+            pickle.dump((INDEX_VERSION, index), f, pickle.HIGHEST_PROTOCOL)
+    except OSError:
+        LOGGER.warning('Could not write palette index:', exc_info=True)
+
+
 def load_palettes():
-    """Scan and read in all palettes in the specified directory."""
+    """Scan and read in all palettes in the specified directory.
+
+    Palette files which haven't changed since the last time are only
+    listed, their contents are read when selected.
+    """
+    old_index = _load_index()
+    index: Dict[str, IndexEntry] = {}
 
     # Load our builtin palettes.
     for name, items in DEFAULT_PALETTES.items():
@@ -333,12 +440,28 @@ def load_palettes():
         pos_file, prop_file = None, None
         try:
             if name.endswith(PAL_EXT):
+                stat = os.stat(path)
+                key = (stat.st_mtime_ns, stat.st_size)
+                entry = old_index.get(name)
+                if entry is not None and entry.key == key:
+                    pal_list.append(Palette.from_index(name, entry))
+                    index[name] = entry
+                    continue
                 try:
-                    pal_list.append(Palette.parse(path))
+                    pal = Palette.parse(path)
                 except KeyValError as exc:
                     # We don't need the traceback, this isn't an error in the app
                     # itself.
                     LOGGER.warning('Could not parse palette file, skipping:\n{}', exc)
+                    continue
+                pal_list.append(pal)
+                index[name] = IndexEntry(
+                    key,
+                    pal.name,
+                    pal.trans_name,
+                    pal.prevent_overwrite,
+                    pal.settings is not None,
+                )
                 continue
             elif name.endswith('.zip'):
                 # Extract from a zip
@@ -378,6 +501,9 @@ def load_palettes():
             pal.save()
             shutil.rmtree(path)
 
+    if index != old_index:
+        _save_index(index)
+
     # Ensure the list has a defined order..
     pal_list.sort(key=str)
     return pal_list
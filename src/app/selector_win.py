@@ -11,9 +11,10 @@ from tkinter import ttk  # themed ui components that match the OS
 from collections import defaultdict
 from operator import itemgetter
 from enum import Enum
+import bisect
 import functools
 import math
-from typing import NamedTuple, Optional, List, Dict, Union, Iterable, Mapping
+from typing import NamedTuple, Optional, List, Dict, Tuple, Union, Iterable, Mapping
 
 from app.richTextBox import tkRichText
 from app.tkMarkdown import MarkdownData
@@ -233,22 +234,27 @@ class Item:
     - context_lbl: The text shown on the rightclick menu. This is either
       the short or long name, depending on the size of the long name.
     - icon: The image object for the item icon. The icon should be 96x96
-      pixels large.
+      pixels large. This is loaded when first displayed.
     - large_icon: If set, a different file to use for the 192x192 icon.
+      This is also loaded when first displayed.
     - ico_file: The file path for the image.
     - desc: A list of tuples, following the richTextBox text format.
     - authors: A list of the item's authors.
     - group: Items with the same group name will be shown together.
     - attrs: a dictionary containing the attribute values for this item.
 
-    - button, Set later, the button TK object for this item
+    - button: The button TK object for this item, if it's currently
+      scrolled into view. Buttons are reused for other items as the window
+      scrolls.
     """
     __slots__ = [
         'name',
         'shortName',
         'longName',
-        'icon',
-        'large_icon',
+        '_icon',
+        '_icon_src',
+        '_large_icon',
+        '_large_icon_src',
         'desc',
         'authors',
         'group',
@@ -286,11 +292,11 @@ class Item:
         else:
             self._context_lbl = self.longName
 
-        if icon is not None:
-            self.icon = get_icon(icon, ICON_SIZE, err_icon)
-        else:
-            self.icon = img.color_square(img.PETI_ITEM_BG, ICON_SIZE)
-        self.large_icon = get_icon(large_icon, ICON_SIZE_LRG, err_icon_lrg)
+        # The icons are only loaded when first displayed.
+        self._icon = None
+        self._icon_src = icon
+        self._large_icon = None
+        self._large_icon_src = large_icon
 
         if isinstance(desc, str):
             self.desc = tkMarkdown.convert(desc)
@@ -300,7 +306,7 @@ class Item:
         self.snd_sample = snd_sample
         self.authors: List[str] = list(authors)
         self.attrs: Dict[str, AttrValues] = dict(attributes)
-        # The button widget for this item.
+        # The button widget for this item, if visible.
         self.button: Optional[ttk.Button] = None
         # The selector window we belong to.
         self._selector: Optional['selWin'] = None
@@ -311,6 +317,34 @@ class Item:
     def __repr__(self):
         return '<Item:' + self.name + '>'
 
+    @property
+    def icon(self) -> img.ImageTk.PhotoImage:
+        """The icon shown on the button."""
+        if self._icon is None:
+            if self._icon_src is not None:
+                self._icon = get_icon(self._icon_src, ICON_SIZE, err_icon)
+            else:
+                self._icon = img.color_square(img.PETI_ITEM_BG, ICON_SIZE)
+        return self._icon
+
+    @icon.setter
+    def icon(self, value: img.ImageTk.PhotoImage) -> None:
+        self._icon = value
+        self._icon_src = None
+
+    @property
+    def large_icon(self) -> Optional[img.ImageTk.PhotoImage]:
+        """The larger icon shown in the description, if present."""
+        if self._large_icon is None and self._large_icon_src is not None:
+            self._large_icon = get_icon(self._large_icon_src, ICON_SIZE_LRG, err_icon_lrg)
+            self._large_icon_src = None
+        return self._large_icon
+
+    @large_icon.setter
+    def large_icon(self, value: Optional[img.ImageTk.PhotoImage]) -> None:
+        self._large_icon = value
+        self._large_icon_src = None
+
     @property
     def context_lbl(self) -> str:
         """The text displayed on the rightclick menu."""
@@ -320,7 +354,7 @@ class Item:
     def context_lbl(self, value):
         """Update the context menu whenver this is set."""
         self._context_lbl = value
-        if self._selector and self._context_ind:
+        if self._selector and self._selector.context_built and self._context_ind:
             self._selector.context_menus[self.group.casefold()].entryconfigure(
                 self._context_ind,
                 label=value,
@@ -342,23 +376,16 @@ class Item:
             attributes=attrs,
         )
 
-    def set_pos(self, x=None, y=None):
-        """Place the item on the palette."""
-        if x is None or y is None:
-            # Remove from the window.
-            self.button.place_forget()
-        else:
-            self.button.place(x=x, y=y)
-            self.button.lift()  # Force a particular stacking order for widgets
-        
     def copy(self) -> 'Item':
         """Duplicate an item."""
         item = Item.__new__(Item)
         item.name = self.name
         item.shortName = self.shortName
         item.longName = self.longName
-        item.icon = self.icon
-        item.large_icon = self.large_icon
+        item._icon = self._icon
+        item._icon_src = self._icon_src
+        item._large_icon = self._large_icon
+        item._large_icon_src = self._large_icon_src
         item.desc = self.desc.copy()
         item.authors = self.authors.copy()
         item.group = self.group
@@ -530,6 +557,26 @@ class selWin:
         # The maximum number of items that fits per row (set in flow_items)
         self.item_width = 1
 
+        # Buttons are only created for the items which are scrolled into
+        # view, and are reused for other items as the view scrolls.
+        # The positions for all items are computed by flow_items(), sorted
+        # by y position.
+        self._layout_y: List[int] = []
+        self._layout_items: List[Item] = []
+        self._item_pos: Dict[Item, Tuple[int, int]] = {}
+        self._pal_height = 0
+        # Item -> the button currently displaying it.
+        self._shown: Dict[Item, ttk.Button] = {}
+        # Button widget name -> the item it displays.
+        self._button_items: Dict[str, Item] = {}
+        self._button_pool: List[ttk.Button] = []
+        self._update_pending = False
+        # All group headers are the same height, measured once.
+        self._header_height = 0
+
+        # The context menu is only filled in when first displayed.
+        self.context_built = False
+
         if desc:
             self.desc_label = ttk.Label(
                 self.win,
@@ -571,7 +618,13 @@ class selWin:
             command=self.wid_canvas.yview,
         )
         self.wid_scroll.grid(row=0, column=1, sticky="NS")
-        self.wid_canvas['yscrollcommand'] = self.wid_scroll.set
+
+        def on_scroll(first: str, last: str) -> None:
+            """When scrolled, update the buttons which are visible."""
+            self.wid_scroll.set(first, last)
+            self._schedule_update()
+
+        self.wid_canvas['yscrollcommand'] = on_scroll
 
         utils.add_mousewheel(self.wid_canvas, self.win)
 
@@ -882,45 +935,12 @@ class selWin:
         grouped_items = defaultdict(list)
         # If the item is groupless, use 'Other' for the header.
         self.group_names = {'':  _('Other')}
-        # Ungrouped items appear directly in the menu.
-        self.context_menus = {'': self.context_menu}
-
-        # First clear off the menu.
-        self.context_menu.delete(0, 'end')
 
         for ind, item in enumerate(self.item_list):
             if item._selector is not None and item._selector is not self:
                 raise ValueError(f'Item {item} reused on a different selector!')
             item._selector = self
 
-            if item.button is None:  # New, create the button widget.
-                if item is self.noneItem:
-                    item.button = ttk.Button(
-                        self.pal_frame,
-                        image=item.icon,
-                    )
-                    item.context_lbl = item.context_lbl
-                else:
-                    item.button = ttk.Button(
-                        self.pal_frame,
-                        text=item.shortName,
-                        image=item.icon,
-                        compound='top',
-                    )
-
-                @utils.bind_leftclick(item.button)
-                def click_item(event=None, *, _self=self, _item=item):
-                    """Handle clicking on the item.
-
-                    If it's already selected, save and close the window.
-                    """
-                    # We need to capture the item in a default, since it's
-                    # the same variable in different iterations
-                    if _item is self.selected:
-                        _self.save()
-                    else:
-                        _self.sel_item(_item)
-
             group_key = item.group.casefold()
             grouped_items[group_key].append(item)
 
@@ -929,19 +949,6 @@ class selWin:
             if group_key not in self.group_widgets:
                 self.group_widgets[group_key] = GroupHeader(self, item.group)
 
-            try:
-                menu = self.context_menus[group_key]
-            except KeyError:
-                self.context_menus[group_key] = menu = Menu(
-                    self.context_menu,
-                )
-
-            menu.add_radiobutton(
-                label=item.context_lbl,
-                command=functools.partial(self.sel_item_id, item.name),
-                var=self.context_var,
-                value=item.name,
-            )
             item._context_ind = len(grouped_items[group_key]) - 1
 
         # Convert to a normal dictionary, after adding all items.
@@ -951,9 +958,39 @@ class selWin:
         # Note - empty string should sort to the beginning!
         self.group_order[:] = sorted(self.grouped_items.keys())
 
+        # Rebuild the menu when next shown.
+        self.context_built = False
+        self.flow_items()
+
+    def _build_context_menu(self) -> None:
+        """Fill in the context menu, if it's out of date."""
+        if self.context_built:
+            return
+        self.context_built = True
+
+        # Ungrouped items appear directly in the menu.
+        self.context_menus = {'': self.context_menu}
+        # First clear off the menu.
+        self.context_menu.delete(0, 'end')
+
+        for group_key in self.group_order:
+            try:
+                menu = self.context_menus[group_key]
+            except KeyError:
+                self.context_menus[group_key] = menu = Menu(
+                    self.context_menu,
+                )
+            for item in self.grouped_items[group_key]:
+                menu.add_radiobutton(
+                    label=item.context_lbl,
+                    command=functools.partial(self.sel_item_id, item.name),
+                    var=self.context_var,
+                    value=item.name,
+                )
+
         # We start with the ungrouped items, so increase the index
         # appropriately.
-        if '' in grouped_items:
+        if '' in self.grouped_items:
             start = len(self.grouped_items[''])
         else:
             start = 0
@@ -971,7 +1008,9 @@ class selWin:
             )
             # Set a custom attribute to keep track of the menu's index.
             menu._context_index = index
-        self.flow_items()
+
+        if self.suggested is not None:
+            self._set_context_font(self.suggested, self.sugg_font)
 
     def exit(self, event: Event = None) -> None:
         """Quit and cancel, choosing the originally-selected item."""
@@ -1050,6 +1089,7 @@ class selWin:
     def open_context(self, e: Event = None) -> None:
         """Dislay the context window at the text widget."""
         if not self._readonly:
+            self._build_context_menu()
             self.context_menu.post(
                 self.display.winfo_rootx(),
                 self.display.winfo_rooty() + self.display.winfo_height())
@@ -1120,9 +1160,11 @@ class selWin:
         else:
             self.prop_desc.set_text(item.desc)
 
-        self.selected.button.state(('!alternate',))
+        if self.selected.button is not None:
+            self.selected.button.state(('!alternate',))
         self.selected = item
-        item.button.state(('alternate',))
+        if item.button is not None:
+            item.button.state(('alternate',))
         self.scroll_to(item)
 
         if self.sampler:
@@ -1136,6 +1178,8 @@ class selWin:
                 if is_playing:
                     # Start the sampler again, so it plays the current item!
                     self.sampler.play_sample()
+                else:
+                    self.sampler.prefetch(item.snd_sample)
             else:
                 self.samp_button.state(('disabled',))
 
@@ -1332,6 +1376,12 @@ class selWin:
         # Hide suggestion indicator if the item's not visible.
         self.sugg_lbl.place_forget()
 
+        # Only the positions are computed here, the buttons are placed by
+        # _update_visible().
+        self._layout_y.clear()
+        self._layout_items.clear()
+        self._item_pos.clear()
+
         for group_key in self.group_order:
             items = self.grouped_items[group_key]
             group_wid = self.group_widgets[group_key]  # type: GroupHeader
@@ -1340,29 +1390,22 @@ class selWin:
                 y=y_off,
                 width=width * ITEM_WIDTH,
             )
-            group_wid.update_idletasks()
-            y_off += group_wid.winfo_reqheight()
+            if self._header_height <= 1:
+                group_wid.update_idletasks()
+                self._header_height = group_wid.winfo_reqheight()
+            y_off += self._header_height
 
             if not group_wid.visible:
-                # Hide everything!
-                for item in items:  # type: Item
-                    item.set_pos()
                 continue
 
-            # Place each item
             for i, item in enumerate(items):  # type: int, Item
+                x = (i % width) * ITEM_WIDTH + 1
+                y = (i // width) * ITEM_HEIGHT + y_off
                 if item == self.suggested:
-                    self.sugg_lbl.place(
-                        x=(i % width) * ITEM_WIDTH + 1,
-                        y=(i // width) * ITEM_HEIGHT + y_off,
-                    )
-                    self.sugg_lbl['width'] = item.button.winfo_width()
-                item.set_pos(
-                    x=(i % width) * ITEM_WIDTH + 1,
-                    y=(i // width) * ITEM_HEIGHT + y_off + 20,
-                )
-                item.button['text'] = item.shortName
-                item.button['image'] = item.icon
+                    self.sugg_lbl.place(x=x, y=y)
+                self._item_pos[item] = x, y + 20
+                self._layout_y.append(y + 20)
+                self._layout_items.append(item)
 
             # Increase the offset by the total height of this item section
             y_off += math.ceil(len(items) / width) * ITEM_HEIGHT + 5
@@ -1374,6 +1417,98 @@ class selWin:
             y_off,
         )
         self.pal_frame['height'] = y_off
+        self._pal_height = y_off
+        self._update_visible()
+
+        if self.suggested is not None and self.suggested.button is not None:
+            self.sugg_lbl['width'] = self.suggested.button.winfo_width()
+
+    def _schedule_update(self) -> None:
+        """Update the visible buttons once Tk is idle."""
+        if not self._update_pending:
+            self._update_pending = True
+            self.win.after_idle(self._update_visible)
+
+    def _get_button(self) -> ttk.Button:
+        """Fetch an unused button, or create a new one."""
+        try:
+            return self._button_pool.pop()
+        except IndexError:
+            pass
+        button = ttk.Button(self.pal_frame, compound='top')
+
+        @utils.bind_leftclick(button)
+        def click_item(event=None) -> None:
+            """Handle clicking on the item.
+
+            If it's already selected, save and close the window.
+            """
+            item = self._button_items.get(str(button))
+            if item is None:
+                return
+            if item is self.selected:
+                self.save()
+            else:
+                self.sel_item(item)
+
+        if self.sampler is not None:
+            def hover_item(event: Event) -> None:
+                """Start loading the item's sample, in case it's picked."""
+                item = self._button_items.get(str(button))
+                if item is not None and item.snd_sample:
+                    self.sampler.prefetch(item.snd_sample)
+
+            button.bind('<Enter>', hover_item, add='+')
+
+        return button
+
+    def _update_visible(self) -> None:
+        """Assign buttons to the items which are scrolled into view.
+
+        Buttons for items that are no longer visible are reused.
+        """
+        self._update_pending = False
+        if self._pal_height > 0:
+            view_top, view_bottom = self.wid_canvas.yview()
+        else:
+            view_top, view_bottom = 0.0, 1.0
+        # Include an extra row either side, so partially visible rows are
+        # drawn.
+        start = bisect.bisect_left(
+            self._layout_y,
+            view_top * self._pal_height - ITEM_HEIGHT,
+        )
+        end = bisect.bisect_right(
+            self._layout_y,
+            view_bottom * self._pal_height + ITEM_HEIGHT,
+        )
+        visible = self._layout_items[start:end]
+        visible_set = set(visible)
+
+        for item in list(self._shown):
+            if item not in visible_set:
+                button = self._shown.pop(item)
+                button.place_forget()
+                del self._button_items[str(button)]
+                item.button = None
+                self._button_pool.append(button)
+
+        for item in visible:
+            try:
+                button = self._shown[item]
+            except KeyError:
+                button = self._shown[item] = self._get_button()
+                self._button_items[str(button)] = item
+                item.button = button
+            # Always reconfigure, the item may have been changed.
+            if item is self.noneItem:
+                button.configure(text='', image=item.icon, compound='image')
+            else:
+                button.configure(text=item.shortName, image=item.icon, compound='top')
+            button.state(('alternate',) if item is self.selected else ('!alternate',))
+            x, y = self._item_pos[item]
+            button.place(x=x, y=y)
+            button.lift()  # Force a particular stacking order for widgets
 
     def scroll_to(self, item: Item) -> None:
         """Scroll to an item so it's visible."""
@@ -1387,7 +1522,10 @@ class selWin:
         bottom *= height
         top *= height
 
-        y = item.button.winfo_y()
+        try:
+            x, y = self._item_pos[item]
+        except KeyError:
+            return  # Not visible.
 
         if bottom <= y - 8 and y + ICON_SIZE + 8 <= top:
             return  # Already in view
@@ -1417,13 +1555,17 @@ class selWin:
     def _set_context_font(self, item, font: tk_font.Font) -> None:
         """Set the font of an item, and its parent group."""
 
+        if item.group:
+            # Apply the font to the group header.
+            self.group_widgets[item.group.casefold()].title['font'] = font
+
+        if not self.context_built:
+            return  # This is applied when the menu is built.
+
         if item.group:
             group_key = item.group.casefold()
             menu = self.context_menus[group_key]
 
-            # Apply the font to the group header as well.
-            self.group_widgets[group_key].title['font'] = font
-
             # Also highlight the menu
             self.context_menu.entryconfig(
                 menu._context_index,  # Use a custom attr to keep track of this...
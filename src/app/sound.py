@@ -4,14 +4,17 @@ To use, call sound.fx() with one of the dict keys.
 If PyGame fails to load, all fx() calls will fail silently.
 (Sounds are not critical to the app, so they just won't play.)
 """
+import io
 import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
 from tkinter import Event
-from typing import IO, Optional, Callable, Union, Dict
+from typing import Optional, Callable, Union, Dict
 
 import utils
 
 from app import TK_ROOT
-from srctools.filesys import FileSystemChain, FileSystem, RawFileSystem
+from srctools.filesys import FileSystemChain, RawFileSystem
 import srctools.logger
 
 __all__ = [
@@ -140,6 +143,59 @@ else:
     ticker_cmd = ('after', 150, TK_ROOT.register(ticker))
     TK_ROOT.tk.call(ticker_cmd)
 
+    # Samples are loaded in the background, so the UI doesn't freeze.
+    _sample_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sound_sample')
+    # Number of recently used samples to keep.
+    SAMPLE_CACHE_SIZE = 8
+    # For recently used samples, either the path on disk or the file data
+    # if inside a package archive. Only used from the sample thread.
+    _sample_data: 'OrderedDict[str, Union[str, bytes]]' = OrderedDict()
+
+    def _load_sample(system: FileSystemChain, filename: str) -> Source:
+        """Open a sample for streaming. This runs in the sample thread."""
+        try:
+            data = _sample_data.pop(filename)
+        except KeyError:
+            with system:
+                file = system[filename]
+                child_sys = system.get_system(file)
+                # Special case raw filesystems - Pyglet is more efficient
+                # if it can just open the file itself.
+                if isinstance(child_sys, RawFileSystem):
+                    data = os.path.join(child_sys.path, file.path)
+                    LOGGER.debug('Loading music directly from {!r}', data)
+                else:
+                    # Read the still-encoded file out of the archive, so
+                    # the archive doesn't need to be kept open.
+                    with file.open_bin() as f:
+                        data = f.read()
+                    LOGGER.debug('Loading music from {!r}', file)
+            while len(_sample_data) >= SAMPLE_CACHE_SIZE:
+                _sample_data.popitem(last=False)
+        _sample_data[filename] = data
+
+        if isinstance(data, str):
+            return pyglet.media.load(data, streaming=True)
+        else:
+            return pyglet.media.load(filename, io.BytesIO(data), streaming=True)
+
+    def _close_sample(future: Future) -> None:
+        """Close a loaded sample which won't be played."""
+        if future.cancelled() or future.exception() is not None:
+            return
+        try:
+            future.result().delete()
+        except Exception:
+            LOGGER.warning('Could not close sample:', exc_info=True)
+
+    def _discard_sample(future: Future) -> None:
+        """Cancel a sample load, or close the sample once it's loaded.
+
+        Cancelling it means it won't hold up loads queued after it.
+        """
+        if not future.cancel():
+            future.add_done_callback(_close_sample)
+
     class SamplePlayer:
         """Handles playing a single audio file, and allows toggling it on/off."""
         def __init__(
@@ -156,26 +212,31 @@ else:
             self.start_callback: Callable[[], None] = start_callback
             self.stop_callback: Callable[[], None] = stop_callback
             self.cur_file: Optional[str] = None
-            # The system we need to cleanup.
-            self._handle: Optional[IO[bytes]] = None
-            self._cur_sys: Optional[FileSystem] = None
             self.system: FileSystemChain = system
+            # Samples being loaded in the background, which haven't been
+            # played yet. Each can only be played once.
+            self._prepared: Dict[str, Future] = {}
+            # If set, the load we're waiting on to start playing.
+            self._loading: Optional[Future] = None
 
         @property
         def is_playing(self):
             """Is the player currently playing sounds?"""
-            return self.sample is not None
+            return self.sample is not None or self._loading is not None
 
-        def _close_handles(self) -> None:
-            """Close down previous sounds."""
-            if self._handle is not None:
-                self._handle.close()
-            if self._cur_sys is not None:
-                self._cur_sys.close_ref()
-            self._handle = self._cur_sys = None
+        def prefetch(self, filename: Optional[str]) -> None:
+            """Start loading this sample, so it plays immediately if chosen."""
+            if not filename or filename in self._prepared:
+                return
+            # Only keep the current and the newly requested file.
+            for other in list(self._prepared):
+                if other != self.cur_file:
+                    _discard_sample(self._prepared.pop(other))
+            self._prepared[filename] = _sample_thread.submit(
+                _load_sample, self.system, filename,
+            )
 
         def play_sample(self, e: Event=None) -> None:
-            pass
             """Play a sample of music.
 
             If music is being played it will be stopped instead.
@@ -183,62 +244,64 @@ else:
             if self.cur_file is None:
                 return
 
-            if self.sample is not None:
+            if self.is_playing:
                 self.stop()
                 return
 
-            self._close_handles()
-
-            with self.system:
-                try:
-                    file = self.system[self.cur_file]
-                except (KeyError, FileNotFoundError):
-                    self.stop_callback()
-                    LOGGER.error('Sound sample not found: "{}"', self.cur_file)
-                    return  # Abort if music isn't found..
+            try:
+                future = self._prepared.pop(self.cur_file)
+            except KeyError:
+                future = _sample_thread.submit(_load_sample, self.system, self.cur_file)
+            self._loading = future
+            self.start_callback()
+            self._check_loaded(future, self.cur_file)
 
-                child_sys = self.system.get_system(file)
-                # Special case raw filesystems - Pyglet is more efficient
-                # if it can just open the file itself.
-                if isinstance(child_sys, RawFileSystem):
-                    load_path = os.path.join(child_sys.path, file.path)
-                    self._cur_sys = self._handle = None
-                    LOGGER.debug('Loading music directly from {!r}', load_path)
-                else:
-                    # Use the file objects directly.
-                    load_path = self.cur_file
-                    self._cur_sys = child_sys
-                    self._cur_sys.open_ref()
-                    self._handle = file.open_bin()
-                    LOGGER.debug('Loading music via {!r}', self._handle)
-                try:
-                    sound = pyglet.media.load(load_path, self._handle)
-                except (MediaDecodeException, MediaFormatException):
-                    self.stop_callback()
-                    LOGGER.exception('Sound sample not valid: "{}"', self.cur_file)
-                    return  # Abort if music isn't found..
+        def _check_loaded(self, future: Future, filename: str) -> None:
+            """Start playing once the sample is loaded."""
+            if future is not self._loading:
+                # Stopped in the meantime.
+                return
+            if not future.done():
+                TK_ROOT.after(10, self._check_loaded, future, filename)
+                return
+            self._loading = None
+            try:
+                sound = future.result()
+            except (KeyError, FileNotFoundError):
+                self.stop_callback()
+                LOGGER.error('Sound sample not found: "{}"', filename)
+                return  # Abort if music isn't found..
+            except (MediaDecodeException, MediaFormatException):
+                self.stop_callback()
+                LOGGER.exception('Sound sample not valid: "{}"', filename)
+                return  # Abort if music isn't found..
 
             if self.start_time:
                 try:
                     sound.seek(self.start_time)
                 except CannotSeekException:
-                    LOGGER.exception('Cannot seek in "{}"!', self.cur_file)
+                    LOGGER.exception('Cannot seek in "{}"!', filename)
 
             self.sample = sound.play()
             self.after = TK_ROOT.after(
                 int(sound.duration * 1000),
                 self._finished,
             )
-            self.start_callback()
 
         def stop(self) -> None:
             """Cancel the music, if it's playing."""
+            if self._loading is not None:
+                # Not started yet, just discard the result.
+                _discard_sample(self._loading)
+                self._loading = None
+                self.stop_callback()
+                return
+
             if self.sample is None:
                 return
 
             self.sample.pause()
             self.sample = None
-            self._close_handles()
             self.stop_callback()
 
             if self.after is not None:
@@ -249,5 +312,4 @@ else:
             """Reset values after the sound has finished."""
             self.sample = None
             self.after = None
-            self._close_handles()
             self.stop_callback()
@@ -1,7 +1,14 @@
 """Parse Markdown and display it in Tkinter widgets.
 
 This produces a stream of values, which are fed into richTextBox to display.
+Conversion is deferred until the data is first displayed, since most
+descriptions in packages are never looked at. Once the UI has loaded,
+start_prerender() renders the remainder in the background.
 """
+import re
+import threading
+import weakref
+
 import mistletoe
 from mistletoe import block_token as btok
 from mistletoe import span_token as stok
@@ -37,24 +44,90 @@ _HR = [
 ]
 
 
+# Rendering uses the shared renderer, and may happen in the background.
+_RENDER_LOCK = threading.RLock()
+# Data which hasn't been rendered yet, for start_prerender().
+_PENDING: 'weakref.WeakSet[MarkdownData]' = weakref.WeakSet()
+_PENDING_LOCK = threading.Lock()
+# Markup removed when extracting text from unrendered data.
+_MARKUP_RE = re.compile(r'!?\[([^\]]*)\]\([^)]*\)|\*+|`+|~~|^ *(?:#+|>)', re.MULTILINE)
+
+# Either source text, or several datas to join together.
+Source = Union[str, Tuple['MarkdownData', ...]]
+
+
 class MarkdownData:
     """The output of the conversion, a set of tags and link references for callbacks.
 
-    Blocks are a list of data.
+    Blocks are a list of data. If produced by convert() or join(), this is
+    only computed when first accessed.
     """
-    __slots__ = ['blocks']
+    __slots__ = ['_blocks', '_source', '__weakref__']
     def __init__(
         self,
         blocks: Iterable[Block] = (),
     ) -> None:
-        self.blocks = list(blocks)
+        self._blocks: Optional[List[Block]] = list(blocks)
+        self._source: Optional[Source] = None
+
+    @classmethod
+    def _lazy(cls, source: Source) -> 'MarkdownData':
+        """Create data which is rendered when required."""
+        data = cls.__new__(cls)
+        data._blocks = None
+        data._source = source
+        with _PENDING_LOCK:
+            _PENDING.add(data)
+        return data
+
+    @property
+    def blocks(self) -> List[Block]:
+        """The rendered data."""
+        if self._blocks is None:
+            with _RENDER_LOCK:
+                # Check again, another thread may have rendered this.
+                if self._blocks is None:
+                    if isinstance(self._source, str):
+                        with _RENDERER:
+                            blocks = _RENDERER.render(mistletoe.Document(self._source)).blocks
+                    else:
+                        blocks = _join(*self._source).blocks
+                    self._blocks = blocks
+                    self._source = None
+        return self._blocks
 
     def __bool__(self) -> bool:
         """Empty data is false."""
-        return bool(self.blocks)
+        if self._blocks is not None:
+            return bool(self._blocks)
+        elif isinstance(self._source, str):
+            return not self._source.isspace() and self._source != ''
+        else:
+            return any(self._source)
+
+    def plain_text(self) -> str:
+        """Return the text in this data, without formatting.
+
+        If not rendered yet, the markup is stripped from the source instead,
+        which is approximate but much cheaper.
+        """
+        source = self._source
+        if self._blocks is not None or source is None:
+            return ''.join([
+                block.text for block in self.blocks
+                if isinstance(block, TextSegment)
+            ])
+        elif isinstance(source, str):
+            return _MARKUP_RE.sub(lambda match: match.group(1) or '', source)
+        else:
+            return ' '.join([data.plain_text() for data in source])
 
     def copy(self) -> 'MarkdownData':
         """Create and return a duplicate of this object."""
+        source = self._source
+        if self._blocks is None and source is not None:
+            # Sources are never modified, so they can be shared.
+            return MarkdownData._lazy(source)
         return MarkdownData(self.blocks.copy())
 
     __copy__ = copy
@@ -180,7 +253,7 @@ class TKRenderer(mistletoe.BaseRenderer):
             prefix = f'{count}. '
             self._list_stack[-1] += 1
 
-        result = join(
+        result = _join(
             self._text(prefix, 'list_start'),
             self._with_tag(token, 'list'),
         )
@@ -189,9 +262,9 @@ class TKRenderer(mistletoe.BaseRenderer):
 
     def render_paragraph(self, token: btok.Paragraph) -> MarkdownData:
         if self._list_stack:  # Collapse together.
-            return join(self.render_inner(token), self._text('\n'))
+            return _join(self.render_inner(token), self._text('\n'))
         else:
-            return join(self._text('\n'), self.render_inner(token), self._text('\n'))
+            return _join(self._text('\n'), self.render_inner(token), self._text('\n'))
 
     def render_raw_text(self, token: stok.RawText) -> MarkdownData:
         return self._text(token.content)
@@ -230,16 +303,26 @@ _RENDERER = TKRenderer()
 
 
 def convert(text: str) -> MarkdownData:
-    """Convert markdown syntax into data ready to be passed to richTextBox."""
-    with _RENDERER:
-        return _RENDERER.render(mistletoe.Document(text))
+    """Convert markdown syntax into data ready to be passed to richTextBox.
+
+    The text is only parsed when the data is first used.
+    """
+    return MarkdownData._lazy(text)
 
 
 def join(*args: MarkdownData) -> MarkdownData:
     """Join several text blocks together.
 
     This merges together blocks, reassigning link callbacks as needed.
+    The blocks are only merged when the data is first used.
     """
+    if len(args) == 1:
+        return args[0].copy()
+    return MarkdownData._lazy(args)
+
+
+def _join(*args: MarkdownData) -> MarkdownData:
+    """Immediately join several text blocks together."""
     if len(args) == 1:
         # We only have one block, just copy and return.
         return MarkdownData(args[0].blocks.copy())
@@ -255,3 +338,25 @@ def join(*args: MarkdownData) -> MarkdownData:
             blocks.append(data)
 
     return MarkdownData(blocks)
+
+
+def start_prerender() -> None:
+    """Render all the remaining data in a background thread.
+
+    This way it doesn't need to be done when the data is first displayed.
+    """
+    def worker() -> None:
+        """Render each data in turn."""
+        with _PENDING_LOCK:
+            pending = list(_PENDING)
+            _PENDING.clear()
+        LOGGER.debug('Prerendering {} descriptions...', len(pending))
+        for data in pending:
+            try:
+                data.blocks
+            except Exception:
+                LOGGER.warning('Could not render description:', exc_info=True)
+        # Release them, so they can be freed.
+        pending.clear()
+
+    threading.Thread(target=worker, name='markdown_prerender', daemon=True).start()
@@ -0,0 +1,212 @@
+"""Run the BEE2 map conversion over a folder of PeTI maps.
+
+This is intended for regression-testing packages. Settings are loaded once
+from an exported bee2/ folder (by default the current directory's), then
+each map is converted in a separate process forked from this one. Styled
+maps are written to the output folder, along with a log for each map and
+a summary of the timings (timings.csv).
+
+By default only the conversion is done, so this can run without Portal 2.
+Pass --game to generate antigel materials, and --run-vbsp to also compile
+the maps with Valve's VBSP. Pass --dump-connections to write each map's item
+connections as a Graphviz .dot file.
+"""
+from srctools.logger import init_logging
+
+LOGGER = init_logging(main_logger=__name__)
+
+import argparse
+import csv
+import multiprocessing
+import os
+import sys
+import time
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+
+from srctools.game import Game
+
+import compile_server
+
+
+class MapResult(NamedTuple):
+    """The result of converting a single map."""
+    name: str
+    success: bool
+    duration: float  # In seconds.
+    error: str = ''
+
+
+def convert(
+    path: Path,
+    dest: Path,
+    game_dir: Optional[str],
+    run_vbsp: bool,
+    dump_connections: bool=False,
+) -> MapResult:
+    """Convert a single map. This runs inside the worker processes."""
+    import vbsp
+    start = time.perf_counter()
+    # VBSP copies the map's own .log file next to the styled map.
+    compile_server.reset_logging(str(dest.with_suffix('.bee2.log')))
+    if dump_connections:
+        os.environ['BEE2_CONN_GRAPH_LOC'] = str(dest.with_suffix('.conn.dot'))
+    try:
+        game = Game(game_dir) if game_dir is not None else None
+        vmf = vbsp.convert_map(str(path), game)
+        vbsp.save(vmf, str(dest))
+        if run_vbsp:
+            vbsp.run_vbsp(
+                vbsp_args=['-game', game_dir, str(dest)],
+                path=str(path),
+                new_path=str(dest),
+                # The workers would all be writing to the same files.
+                save_stats=False,
+            )
+    except SystemExit as exc:
+        # run_vbsp() exits if VBSP fails.
+        success = exc.code in (None, 0)
+        error = '' if success else 'VBSP failed ({})'.format(exc.code)
+    except Exception as exc:
+        LOGGER.exception('Conversion failed:')
+        success = False
+        error = '{}: {}'.format(type(exc).__name__, exc)
+    else:
+        success = True
+        error = ''
+    return MapResult(path.name, success, time.perf_counter() - start, error)
+
+
+def _load_worker() -> None:
+    """Load the settings in a spawned worker process."""
+    import vbsp
+    vbsp.BEE2_config.load()
+    vbsp.preload_settings()
+
+
+def main(argv: List[str]) -> int:
+    """Convert all the maps."""
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        'maps',
+        help='Folder containing the PeTI VMFs to convert.',
+    )
+    parser.add_argument(
+        '-o', '--output',
+        help='Folder to write styled maps, logs and timings to. '
+             'Defaults to "styled/" inside the maps folder.',
+    )
+    parser.add_argument(
+        '--bin',
+        default='.',
+        help='Folder containing the exported bee2/ folder, usually '
+             'Portal 2/bin/. Defaults to the current directory.',
+    )
+    parser.add_argument(
+        '--game',
+        help='The game folder (portal2/). Required for antigel '
+             'materials and for --run-vbsp.',
+    )
+    parser.add_argument(
+        '--run-vbsp',
+        action='store_true',
+        help="Also compile the styled maps with Valve's VBSP.",
+    )
+    parser.add_argument(
+        '--dump-connections',
+        action='store_true',
+        help='Write the item connections for each map to a .dot file.',
+    )
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=os.cpu_count() or 1,
+        help='Number of maps to convert at once.',
+    )
+    args = parser.parse_args(argv)
+
+    if args.run_vbsp and args.game is None:
+        parser.error('--run-vbsp requires --game!')
+
+    map_folder = Path(args.maps).resolve()
+    out_folder = Path(args.output).resolve() if args.output else map_folder / 'styled'
+    game_dir = str(Path(args.game).resolve()) if args.game else None
+    out_folder.mkdir(parents=True, exist_ok=True)
+    maps = sorted(map_folder.glob('*.vmf'))
+    if not maps:
+        LOGGER.error('No maps found in "{}"!', map_folder)
+        return 1
+
+    # The settings use paths relative to bin/, so this needs to be done
+    # before importing VBSP.
+    os.chdir(args.bin)
+    import vbsp
+    compile_server.reset_logging(str(out_folder / 'batch.log'))
+    LOGGER.info('Loading settings...')
+    start = time.perf_counter()
+    vbsp.BEE2_config.load()
+    vbsp.preload_settings()
+    LOGGER.info('Settings loaded in {:.2f}s.', time.perf_counter() - start)
+
+    if 'fork' in multiprocessing.get_all_start_methods():
+        # Workers are forked from here, so they share the loaded settings.
+        context = multiprocessing.get_context('fork')
+        initializer = None
+    else:
+        # Each worker will need to load the settings again.
+        context = multiprocessing.get_context('spawn')
+        initializer = _load_worker
+
+    LOGGER.info('Converting {} maps with {} processes...', len(maps), args.jobs)
+    start = time.perf_counter()
+    # Conversion modifies lots of global state, so each worker must only
+    # handle a single map.
+    with context.Pool(args.jobs, initializer, maxtasksperchild=1) as pool:
+        pending = [
+            pool.apply_async(convert, (
+                path,
+                out_folder / path.name,
+                game_dir,
+                args.run_vbsp,
+                args.dump_connections,
+            ))
+            for path in maps
+        ]
+        results: List[MapResult] = []
+        for path, res in zip(maps, pending):
+            try:
+                result = res.get()
+            except Exception as exc:
+                # The worker itself died.
+                result = MapResult(path.name, False, 0.0, repr(exc))
+            if result.success:
+                LOGGER.info('{}: {:.2f}s', result.name, result.duration)
+            else:
+                LOGGER.error('{}: FAILED - {}', result.name, result.error)
+            results.append(result)
+    total = time.perf_counter() - start
+
+    with (out_folder / 'timings.csv').open('w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(MapResult._fields)
+        for result in results:
+            writer.writerow([
+                result.name,
+                int(result.success),
+                '{:.3f}'.format(result.duration),
+                result.error,
+            ])
+
+    failed = sum(not result.success for result in results)
+    LOGGER.info(
+        'Converted {}/{} maps in {:.2f}s.',
+        len(results) - failed, len(results), total,
+    )
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
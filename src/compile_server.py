@@ -0,0 +1,300 @@
+"""Optional long-running server for VBSP and VRAD, to skip startup costs.
+
+Each compile normally spawns fresh processes which import everything,
+register conditions and parse the exported configs. When the server is
+running (`vbsp_linux -bee2_server` from the bin/ folder, or
+`python compiler_launch.py vbsp -bee2_server` from source), it does this
+once. The vbsp/vrad executables then act as thin clients, passing their
+arguments and standard streams over a Unix socket. The server forks a copy
+of itself for each compile, so maps never see data modified by a previous
+compile.
+
+If the exported configs change, the server turns away the compile and
+restarts itself to reload them. If the server isn't running or rejects the
+request, or the OS doesn't support fork(), the compilers just run
+in-process as usual.
+
+This module is imported by the client, so it must only use the stdlib at
+the top level.
+"""
+import array
+import json
+import os
+import signal
+import socket
+import struct
+import sys
+
+from typing import Optional, List, Dict, Tuple
+
+
+# Relative to the bin/ folder, which is the working directory for compiles.
+SOCKET_LOC = 'bee2/compile_server.sock'
+# If any of these change, the settings need to be reloaded.
+WATCHED_FILES = [
+    'bee2/vbsp_config.cfg',
+    'bee2/editor.bin',
+    'bee2/pack_list.cfg',
+    'bee2/templates.vmf',
+]
+# Set this environment variable to skip the server entirely.
+DISABLE_ENV = 'BEE2_NO_COMPILE_SERVER'
+# The argument which starts the server, instead of compiling.
+SERVER_ARG = '-bee2_server'
+
+# Messages are prefixed by their length.
+HEADER = struct.Struct('<I')
+EXIT_CODE = struct.Struct('<i')
+# Sent once the server has taken responsibility for the compile.
+ACCEPTED = b'\x01'
+# The three standard streams are passed along with the request.
+STD_FDS = [0, 1, 2]
+TOOLS = ('vbsp', 'vrad')
+
+
+def is_supported() -> bool:
+    """Check if the server can be used on this OS."""
+    return hasattr(os, 'fork') and hasattr(socket, 'AF_UNIX')
+
+
+def _recv_exact(conn: socket.socket, size: int) -> bytes:
+    """Read exactly this many bytes, or raise EOFError."""
+    data = bytearray()
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            raise EOFError
+        data += chunk
+    return bytes(data)
+
+
+def run_client(tool: str, argv: List[str]) -> Optional[int]:
+    """Try to run the compile on the server.
+
+    If successful the exit code is returned, otherwise None is returned and
+    the compile should be done in-process.
+    """
+    if not is_supported() or DISABLE_ENV in os.environ or SERVER_ARG in argv:
+        return None
+    if not os.path.exists(SOCKET_LOC):
+        return None
+
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            conn.connect(SOCKET_LOC)
+        except OSError:
+            # Stale socket, the server isn't running.
+            return None
+        request = json.dumps({
+            'tool': tool,
+            'argv': argv,
+            'cwd': os.getcwd(),
+        }).encode('utf8')
+        sys.stdout.flush()
+        sys.stderr.flush()
+        conn.sendmsg(
+            [HEADER.pack(len(request)), request],
+            [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array('i', STD_FDS))],
+        )
+        try:
+            if _recv_exact(conn, len(ACCEPTED)) != ACCEPTED:
+                return None
+        except (EOFError, OSError):
+            # Rejected, compile ourselves.
+            return None
+        # The server is now responsible for the compile, losing the
+        # connection from here on is a failure.
+        try:
+            [code] = EXIT_CODE.unpack(_recv_exact(conn, EXIT_CODE.size))
+        except (EOFError, OSError):
+            print('Lost connection to the BEE2 compile server!', file=sys.stderr)
+            return 1
+        return code
+    finally:
+        conn.close()
+
+
+def _recv_request(conn: socket.socket) -> Tuple[Dict[str, object], List[int]]:
+    """Read a request, along with the file descriptors sent with it."""
+    fds = array.array('i')
+    msg, ancdata, flags, addr = conn.recvmsg(
+        HEADER.size,
+        socket.CMSG_SPACE(len(STD_FDS) * fds.itemsize),
+    )
+    for level, kind, data in ancdata:
+        if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+            # Discard any partial descriptor at the end.
+            fds.frombytes(data[:len(data) - (len(data) % fds.itemsize)])
+    if len(msg) < HEADER.size:
+        msg += _recv_exact(conn, HEADER.size - len(msg))
+    [size] = HEADER.unpack(msg)
+    request = json.loads(_recv_exact(conn, size).decode('utf8'))
+    return request, list(fds)
+
+
+def _settings_fingerprint() -> Tuple[Tuple[str, int, int], ...]:
+    """Get the modification time and size of the settings files."""
+    result = []
+    for filename in WATCHED_FILES:
+        try:
+            stat = os.stat(filename)
+        except FileNotFoundError:
+            result.append((filename, -1, -1))
+        else:
+            result.append((filename, stat.st_mtime_ns, stat.st_size))
+    return tuple(result)
+
+
+def reset_logging(filename: str) -> None:
+    """Discard the current log handlers, then log to this file."""
+    import logging
+    from srctools.logger import init_logging
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    init_logging(filename)
+
+
+def _run_compile(conn: socket.socket, request: Dict[str, object], fds: List[int]) -> None:
+    """Run the compile inside the forked child. This never returns."""
+    code = 1
+    try:
+        # Subprocess needs to be able to wait on VBSP/VRAD.
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        for target, fd in zip(STD_FDS, fds):
+            os.dup2(fd, target)
+        for fd in fds:
+            if fd not in STD_FDS:
+                os.close(fd)
+
+        tool = request['tool']
+        argv = list(request['argv'])
+        sys.argv = argv
+        reset_logging('bee2/{}.log'.format(tool))
+
+        try:
+            if tool == 'vbsp':
+                import vbsp
+                vbsp.BEE2_config.load()
+                vbsp.main(argv)
+            else:
+                import vrad
+                vrad.main(argv)
+        except SystemExit as exc:
+            if exc.code is None:
+                code = 0
+            elif isinstance(exc.code, int):
+                code = exc.code
+            else:
+                print(exc.code, file=sys.stderr)
+                code = 1
+        else:
+            code = 0
+    except BaseException:
+        sys.excepthook(*sys.exc_info())
+        code = 1
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            conn.sendall(EXIT_CODE.pack(code))
+        except BaseException:
+            pass
+        os._exit(code)
+
+
+def serve(restart_cmd: List[str]) -> None:
+    """Run the compile server, until killed.
+
+    restart_cmd is the command line used to launch the server, so it can
+    restart itself when the settings change.
+    """
+    if not is_supported():
+        sys.exit('The compile server is not supported on this OS.')
+
+    from srctools.logger import init_logging
+    LOGGER = init_logging('bee2/compile_server.log')
+    LOGGER.info('Starting compile server...')
+
+    import vbsp
+    import vrad
+    # Importing those reconfigured logging, switch back.
+    reset_logging('bee2/compile_server.log')
+
+    fingerprint = _settings_fingerprint()
+    try:
+        vbsp.preload_settings()
+        vrad.preload()
+    except Exception:
+        # Partially loaded settings can't be used, so don't continue.
+        LOGGER.exception('Could not load settings, export from the BEE2 first!')
+        sys.exit(1)
+
+    try:
+        os.remove(SOCKET_LOC)
+    except FileNotFoundError:
+        pass
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(SOCKET_LOC)
+    server.listen(8)
+
+    # Reap compiles automatically, we don't need their status.
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    cwd = os.path.realpath(os.getcwd())
+    LOGGER.info('Listening on "{}".', os.path.abspath(SOCKET_LOC))
+
+    try:
+        while True:
+            conn, addr = server.accept()
+            try:
+                request, fds = _recv_request(conn)
+            except (OSError, EOFError, ValueError):
+                LOGGER.warning('Invalid request:', exc_info=True)
+                conn.close()
+                continue
+
+            restart = _settings_fingerprint() != fingerprint
+            if (
+                restart
+                or request.get('tool') not in TOOLS
+                or len(fds) != len(STD_FDS)
+                or os.path.realpath(str(request.get('cwd'))) != cwd
+            ):
+                # Closing without accepting makes the client compile
+                # in-process instead.
+                if not restart:
+                    LOGGER.warning('Rejected request: {}', request)
+                conn.close()
+                for fd in fds:
+                    os.close(fd)
+                if restart:
+                    LOGGER.info('Settings changed, restarting...')
+                    server.close()
+                    os.remove(SOCKET_LOC)
+                    os.execv(restart_cmd[0], restart_cmd)
+                continue
+
+            LOGGER.info('Compile: {}', request['argv'])
+            sys.stdout.flush()
+            sys.stderr.flush()
+            conn.sendall(ACCEPTED)
+            if os.fork() == 0:
+                server.close()
+                _run_compile(conn, request, fds)
+            conn.close()
+            for fd in fds:
+                os.close(fd)
+    except KeyboardInterrupt:
+        LOGGER.info('Stopping compile server.')
+    except BaseException:
+        LOGGER.exception('Compile server crashed:')
+        raise
+    finally:
+        server.close()
+        try:
+            os.remove(SOCKET_LOC)
+        except FileNotFoundError:
+            pass
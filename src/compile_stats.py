@@ -0,0 +1,150 @@
+"""Records statistics about each map compile, for display in the BEE2.
+
+VBSP appends a line to the history after each compile, containing the
+brush/entity/overlay counts and how long each stage took. The app watches
+the file, only reading the lines added since it last checked.
+"""
+import json
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, List, NamedTuple, Optional
+
+from srctools import AtomicWriter
+import srctools.logger
+
+import utils
+
+
+LOGGER = srctools.logger.get_logger(__name__)
+
+HISTORY_LOC = utils.conf_location('config/compile_history.jsonl')
+# The number of compiles to keep. The file is trimmed to this when it gets
+# twice as long.
+MAX_RECORDS = 100
+# Approximate size of each line, used to decide when to trim.
+_TRIM_SIZE = MAX_RECORDS * 2 * 256
+
+
+class CompileStats(NamedTuple):
+    """The statistics for a single compile."""
+    timestamp: float  # Seconds since the epoch.
+    map: str  # Filename of the map.
+    success: bool
+    counts: Dict[str, int]  # 'brush', 'entity', 'overlay'.
+    limits: Dict[str, int]  # The maximum for each count.
+    timings: Dict[str, float]  # Duration of each stage, in seconds.
+
+    @property
+    def total_time(self) -> float:
+        """The total duration of the compile."""
+        return sum(self.timings.values())
+
+    @classmethod
+    def parse(cls, line: str) -> 'CompileStats':
+        """Parse a line from the history file."""
+        data = json.loads(line)
+        return cls(
+            float(data['time']),
+            str(data['map']),
+            bool(data['success']),
+            {key: int(val) for key, val in data['counts'].items()},
+            {key: int(val) for key, val in data['limits'].items()},
+            {key: float(val) for key, val in data['timings'].items()},
+        )
+
+    def export(self) -> str:
+        """Produce the line for the history file."""
+        return json.dumps({
+            'time': round(self.timestamp, 3),
+            'map': self.map,
+            'success': self.success,
+            'counts': self.counts,
+            'limits': self.limits,
+            'timings': {
+                stage: round(duration, 3)
+                for stage, duration in self.timings.items()
+            },
+        }, separators=(',', ':')) + '\n'
+
+
+def append(
+    map_name: str,
+    success: bool,
+    counts: Dict[str, int],
+    limits: Dict[str, int],
+    timings: Dict[str, float],
+) -> None:
+    """Add a compile to the history."""
+    stats = CompileStats(time.time(), map_name, success, counts, limits, timings)
+    try:
+        with open(HISTORY_LOC, 'a', encoding='utf8') as f:
+            f.write(stats.export())
+            size = f.tell()
+    except OSError:
+        LOGGER.warning('Could not write compile history:', exc_info=True)
+        return
+    if size > _TRIM_SIZE:
+        _trim()
+
+
+def _trim() -> None:
+    """Remove old compiles from the history."""
+    try:
+        with open(HISTORY_LOC, encoding='utf8') as f:
+            lines = deque(f, maxlen=MAX_RECORDS)
+        with AtomicWriter(HISTORY_LOC) as f:
+            f.writelines(lines)
+    except OSError:
+        LOGGER.warning('Could not trim compile history:', exc_info=True)
+
+
+class HistoryReader:
+    """Reads the compile history, picking up new compiles as they're added."""
+    def __init__(self) -> None:
+        self.records: Deque[CompileStats] = deque(maxlen=MAX_RECORDS)
+        # The identity of the file, and how far into it we've read.
+        self._file_id = (-1, -1)
+        self._offset = 0
+
+    @property
+    def latest(self) -> Optional[CompileStats]:
+        """The most recent compile, if any."""
+        return self.records[-1] if self.records else None
+
+    def poll(self) -> bool:
+        """Read any new compiles, returning True if there were any."""
+        try:
+            stat = os.stat(HISTORY_LOC)
+        except FileNotFoundError:
+            return False
+        file_id = (stat.st_dev, stat.st_ino)
+        if file_id != self._file_id or stat.st_size < self._offset:
+            # Replaced by a trim, read it all again.
+            self._file_id = file_id
+            self._offset = 0
+            self.records.clear()
+        if stat.st_size == self._offset:
+            return False
+
+        with open(HISTORY_LOC, 'rb') as f:
+            f.seek(self._offset)
+            data = f.read()
+        # Leave any partially written line for next time.
+        end = data.rfind(b'\n') + 1
+        self._offset += end
+        changed = False
+        for line in data[:end].decode('utf8', 'replace').splitlines():
+            if not line.strip():
+                continue
+            try:
+                self.records.append(CompileStats.parse(line))
+            except (ValueError, KeyError, TypeError, AttributeError):
+                LOGGER.warning('Invalid compile history line: {!r}', line)
+            else:
+                changed = True
+        return changed
+
+    def successful(self) -> List[CompileStats]:
+        """Return the compiles which succeeded, oldest first."""
+        return [stats for stats in self.records if stats.success]
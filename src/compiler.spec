@@ -76,7 +76,8 @@ INCLUDES += collect_submodules('srctools', lambda name: 'pyinstaller' not in nam
 import logging.handlers
 import logging.config
 
-if not hasattr(logging.handlers, 'socket') and not hasattr(logging.config, 'socket'):
+# The compile server needs sockets, but that's only used on Mac/Linux.
+if WIN and not hasattr(logging.handlers, 'socket') and not hasattr(logging.config, 'socket'):
     EXCLUDES.append('socket')
     # Subprocess uses this in UNIX-style OSes, but not Windows.
     if WIN:
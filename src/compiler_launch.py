@@ -2,16 +2,28 @@
 import os
 import sys
 
+import compile_server
+
 if hasattr(sys, 'frozen'):
     app_name = os.path.basename(sys.executable).casefold()
+    server_cmd = [sys.executable] + sys.argv[1:]
 else:
     # Sourcecode-launch - check first sys arg.
+    server_cmd = [sys.executable] + sys.argv
     app_name = sys.argv.pop(1).casefold()
 
-if app_name in ('vbsp.exe', 'vbsp_osx', 'vbsp_linux'):
+if compile_server.SERVER_ARG in sys.argv:
+    compile_server.serve(server_cmd)
+elif app_name in ('vbsp.exe', 'vbsp_osx', 'vbsp_linux'):
+    code = compile_server.run_client('vbsp', sys.argv)
+    if code is not None:
+        sys.exit(code)
     import vbsp
     vbsp.main()
 elif app_name in ('vrad.exe', 'vrad_osx', 'vrad_linux'):
+    code = compile_server.run_client('vrad', sys.argv)
+    if code is not None:
+        sys.exit(code)
     import vrad
     vrad.main(sys.argv)
 elif 'original' in app_name:
@@ -5,7 +5,7 @@ from enum import Enum, Flag
 from typing import (
     Optional, Type, Callable, NamedTuple,
     List, Dict, Tuple, Set,
-    Iterable, IO, Iterator, Mapping,
+    Iterable, IO, Iterator, Mapping, cast,
 )
 from pathlib import PurePosixPath as FSPath
 
@@ -251,6 +251,11 @@ class ConnTypes(Enum):
     FIZZ = 'CONNECTION_HAZARD'  # Output from base.
 
 
+class _Parts(List[str]):
+    """Collects strings passed to write(), so they can be joined at once."""
+    write = list.append
+
+
 class Connection(NamedTuple):
     """Activate/deactivate pair defined for connections."""
     act_name: Optional[str]
@@ -1472,8 +1477,13 @@ class Item:
         self.overlays.append(Overlay(material, center, size, rotation))
 
     @classmethod
-    def export(cls, f: IO[str], items: Iterable['Item'], renderables: Mapping[RenderableType, Renderable]) -> None:
-        """Write a full editoritems file out."""
+    def export(cls, file: IO[str], items: Iterable['Item'], renderables: Mapping[RenderableType, Renderable]) -> None:
+        """Write a full editoritems file out.
+
+        The many small strings are collected, then joined and written once.
+        """
+        parts = _Parts()
+        f = cast(IO[str], parts)
         f.write('"ItemData"\n{\n')
         for item in items:
             item.export_one(f)
@@ -1489,6 +1499,7 @@ class Item:
                 f.write('\t\t\t}\n\t\t}\n')
             f.write('\t}\n')
         f.write('}\n')
+        file.write(''.join(parts))
 
     def export_one(self, f: IO[str]) -> None:
         """Write a single item out to a file."""
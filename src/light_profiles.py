@@ -0,0 +1,242 @@
+"""Lighting profiles, which control the arguments VRAD is run with.
+
+Each profile is a section in compile.cfg named "LightProfile.<name>":
+
+- name: The name displayed in the compiler pane.
+- threads: The number of threads VRAD uses. Blank lets VRAD decide,
+  "all" uses every core.
+- bounce: The number of light bounces. Blank uses VRAD's default.
+- extra: If false, don't use extra sampling (-noextra).
+- final: If false, strip -final and the static prop lighting options.
+- hdr: "hdr", "ldr" or "both" to override the lighting mode. Blank keeps
+  the mode Portal 2 passed.
+
+The "fast" and "full" profiles are always present, matching the original
+preview and publishing arguments. Additional profiles can be added to the
+file, and will appear in the compiler pane. Publishing always uses Portal 2's
+full arguments, only "threads" from the full profile is applied.
+"""
+import json
+import os
+from collections import defaultdict, deque
+from configparser import ConfigParser, SectionProxy
+from typing import Deque, Dict, List, Optional
+
+import srctools
+import srctools.logger
+from srctools import AtomicWriter
+
+import utils
+
+
+LOGGER = srctools.logger.get_logger(__name__)
+
+SECTION_PREFIX = 'LightProfile.'
+# Used for preview compiles if nothing else is chosen.
+PROFILE_FAST = 'fast'
+# The threads option is also used when publishing.
+PROFILE_FULL = 'full'
+
+DEFAULTS = {
+    SECTION_PREFIX + PROFILE_FAST: {
+        'name': '',
+        'threads': '',
+        'bounce': '2',
+        'extra': '0',
+        'final': '0',
+        'hdr': '',
+    },
+    SECTION_PREFIX + PROFILE_FULL: {
+        'name': '',
+        'threads': '',
+        'bounce': '',
+        'extra': '1',
+        'final': '1',
+        'hdr': '',
+    },
+}
+
+# Arguments which are removed if the profile isn't final.
+FINAL_ARGS = {
+    '-final',
+    '-staticproplighting',
+    '-staticproppolys',
+    '-textureshadows',
+}
+HDR_ARGS = {'-hdr', '-ldr', '-both'}
+
+# Durations of VRAD runs with each profile.
+TIMINGS_LOC = utils.conf_location('config/light_timings.jsonl')
+# The number of runs to average for each profile. Older runs are removed
+# from the file once it gets large enough.
+TIMINGS_KEPT = 20
+# Approximate size of the file to trim at, assuming a few profiles are used.
+_TRIM_SIZE = TIMINGS_KEPT * 8 * 128
+
+
+def get_profiles(config: ConfigParser) -> List[str]:
+    """Return the names of all the profiles defined.
+
+    These are casefolded, use find_section() to get the section.
+    """
+    profiles = [PROFILE_FAST, PROFILE_FULL]
+    for section in config.sections():
+        if section.startswith(SECTION_PREFIX):
+            name = section[len(SECTION_PREFIX):].casefold()
+            if name not in profiles:
+                profiles.append(name)
+    return profiles
+
+
+def find_section(config: ConfigParser, profile: str) -> Optional[str]:
+    """Find the section for a profile, ignoring case."""
+    section_name = SECTION_PREFIX + profile
+    if section_name in config:
+        return section_name
+    profile = profile.casefold()
+    for section in config.sections():
+        if (
+            section.startswith(SECTION_PREFIX)
+            and section[len(SECTION_PREFIX):].casefold() == profile
+        ):
+            return section
+    return None
+
+
+def display_name(config: ConfigParser, profile: str) -> str:
+    """Return the name shown for a profile in the compiler pane."""
+    section = find_section(config, profile)
+    if section is not None:
+        name = config[section].get('name', '').strip()
+        if name:
+            return name
+    return profile.title()
+
+
+def _get_option(section: SectionProxy, profile: str, option: str) -> str:
+    """Fetch an option, falling back to the defaults for built-in profiles."""
+    try:
+        default = DEFAULTS[SECTION_PREFIX + profile.casefold()][option]
+    except KeyError:
+        default = ''
+    return section.get(option, default).strip()
+
+
+def build_args(config: ConfigParser, profile: str, args: List[str]) -> List[str]:
+    """Produce the VRAD arguments for this profile.
+
+    args are the arguments Portal 2 passed, with our own removed.
+    """
+    section_name = find_section(config, profile)
+    if section_name is not None:
+        section = config[section_name]
+    else:
+        if SECTION_PREFIX + profile.casefold() not in DEFAULTS:
+            LOGGER.warning('Unknown lighting profile "{}", using full!', profile)
+            profile = PROFILE_FULL
+        section = ConfigParser()['DEFAULT']
+
+    if srctools.conv_bool(_get_option(section, profile, 'final'), True):
+        args = list(args)
+    else:
+        args = [arg for arg in args if arg.casefold() not in FINAL_ARGS]
+
+    hdr = _get_option(section, profile, 'hdr').casefold()
+    if hdr:
+        args = [arg for arg in args if arg.casefold() not in HDR_ARGS]
+        args.insert(0, '-' + hdr)
+
+    prefix = _threads_args(section, profile)
+    bounce = _get_option(section, profile, 'bounce')
+    if bounce:
+        prefix += ['-bounce', bounce]
+    if not srctools.conv_bool(_get_option(section, profile, 'extra'), True):
+        prefix.append('-noextra')
+    return prefix + args
+
+
+def _threads_args(section: SectionProxy, profile: str) -> List[str]:
+    """Produce the -threads argument for this profile, if set."""
+    threads = _get_option(section, profile, 'threads').casefold()
+    if threads == 'all':
+        threads = str(os.cpu_count() or 1)
+    if threads:
+        return ['-threads', threads]
+    return []
+
+
+def publish_args(config: ConfigParser, args: List[str]) -> List[str]:
+    """Produce the VRAD arguments used when publishing.
+
+    Portal 2's arguments are kept as-is, so publishing always uses full
+    lighting. Only the threads option from the full profile is applied.
+    """
+    section_name = find_section(config, PROFILE_FULL)
+    if section_name is not None:
+        section = config[section_name]
+    else:
+        section = ConfigParser()['DEFAULT']
+    return _threads_args(section, PROFILE_FULL) + args
+
+
+def record_time(map_name: str, profile: str, duration: float) -> None:
+    """Record how long VRAD took with this profile."""
+    try:
+        with open(TIMINGS_LOC, 'a', encoding='utf8') as f:
+            json.dump({
+                'map': map_name,
+                'profile': profile,
+                'duration': round(duration, 3),
+            }, f, separators=(',', ':'))
+            f.write('\n')
+            size = f.tell()
+    except OSError:
+        LOGGER.warning('Could not write lighting timings:', exc_info=True)
+        return
+    if size > _TRIM_SIZE:
+        _trim()
+
+
+def _trim() -> None:
+    """Remove all but the last TIMINGS_KEPT runs for each profile."""
+    try:
+        with open(TIMINGS_LOC, encoding='utf8') as f:
+            lines = f.readlines()
+    except OSError:
+        LOGGER.warning('Could not trim lighting timings:', exc_info=True)
+        return
+    kept: Dict[str, Deque[int]] = defaultdict(lambda: deque(maxlen=TIMINGS_KEPT))
+    for i, line in enumerate(lines):
+        try:
+            kept[json.loads(line)['profile']].append(i)
+        except (ValueError, KeyError, TypeError):
+            continue  # Drop invalid lines.
+    indexes = sorted(i for profile_lines in kept.values() for i in profile_lines)
+    try:
+        with AtomicWriter(TIMINGS_LOC) as f:
+            f.writelines(lines[i] for i in indexes)
+    except OSError:
+        LOGGER.warning('Could not trim lighting timings:', exc_info=True)
+
+
+def average_times() -> Dict[str, float]:
+    """Read the timings, returning the average duration for each profile."""
+    durations = defaultdict(list)  # type: Dict[str, List[float]]
+    try:
+        with open(TIMINGS_LOC, encoding='utf8') as f:
+            for line in f:
+                try:
+                    data = json.loads(line)
+                    durations[data['profile']].append(float(data['duration']))
+                except (ValueError, KeyError, TypeError):
+                    continue
+    except FileNotFoundError:
+        return {}
+    except OSError:
+        LOGGER.warning('Could not read lighting timings:', exc_info=True)
+        return {}
+    result = {}
+    for profile, times in durations.items():
+        times = times[-TIMINGS_KEPT:]
+        result[profile] = sum(times) / len(times)
+    return result
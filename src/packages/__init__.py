@@ -3,13 +3,14 @@ Handles scanning through the zip packages to find all items, styles, etc.
 """
 import os
 from collections import defaultdict
+from zipfile import ZipInfo
 
 import srctools
 from app import tkMarkdown
 import utils
 from app.packageMan import PACK_CONFIG
 from srctools import Property, NoKeyError
-from srctools.filesys import FileSystem, RawFileSystem, ZipFileSystem, VPKFileSystem
+from srctools.filesys import File, FileSystem, RawFileSystem, ZipFileSystem, VPKFileSystem
 from editoritems import Item as EditorItem, Renderable, RenderableType
 import srctools.logger
 
@@ -128,6 +129,9 @@ class ObjType(NamedTuple):
     cls: Type['PakObject']
     allow_mult: bool
     has_img: bool
+    # If false, export() doesn't touch the shared ExportData values, and can
+    # be run in parallel with other exporters.
+    export_shared: bool
 
 
 class ExportData(NamedTuple):
@@ -217,6 +221,7 @@ class _PakObjectMeta(type):
         namespace: Dict[str, Any],
         allow_mult: bool = False,
         has_img: bool = True,
+        export_shared: bool = True,
     ) -> 'Type[PakObject]':
         """Adds a PakObject to the list of objects.
 
@@ -228,7 +233,7 @@ class _PakObjectMeta(type):
         # Only register subclasses of PakObject - those with a parent class.
         # PakObject isn't created yet so we can't directly check that.
         if bases:
-            OBJ_TYPES[name] = ObjType(cls, allow_mult, has_img)
+            OBJ_TYPES[name] = ObjType(cls, allow_mult, has_img, export_shared)
 
         # Maps object IDs to the object.
         cls._id_to_obj = {}
@@ -242,18 +247,22 @@ class _PakObjectMeta(type):
         namespace: Dict[str, Any],
         allow_mult: bool = False,
         has_img: bool = True,
+        export_shared: bool = True,
     ) -> None:
         """We have to strip kwargs from the type() calls to prevent errors."""
         type.__init__(cls, name, bases, namespace)
 
 
 class PakObject(metaclass=_PakObjectMeta):
-    """PackObject(allow_mult=False, has_img=True): The base class for package objects.
+    """PackObject(allow_mult=False, has_img=True, export_shared=True): The base class for package objects.
 
     In the class base list, set 'allow_mult' to True if duplicates are allowed.
     If duplicates occur, they will be treated as overrides.
     Set 'has_img' to control whether the object will count towards the images
     loading bar - this should be stepped in the UI.load_packages() method.
+    Set 'export_shared' to False if export() only writes its own files, and
+    doesn't read or modify all_items, renderables or vbsp_conf. It will then
+    be run in a background thread during exports.
     """
     # ID of the object
     id = ...  # type: str
@@ -939,6 +948,19 @@ def desc_parse(
     return tkMarkdown.convert('\n'.join(lines))
 
 
+def zip_info(file: File) -> Optional[ZipInfo]:
+    """Return the ZipInfo for a file in a zip, if available.
+
+    This lets us use the CRC and size zips store, instead of reading the
+    file. srctools doesn't expose this publicly, so this returns None if
+    its internals change - callers need to fall back to reading the file.
+    """
+    info = getattr(file, '_data', None)
+    if isinstance(info, ZipInfo):
+        return info
+    return None
+
+
 def sep_values(string: str, delimiters: Iterable[str] = ',;/') -> List[str]:
     """Split a string by a delimiter, and then strip whitespace.
 
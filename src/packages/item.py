@@ -4,22 +4,29 @@ A system is provided so configurations can be shared and partially modified
 as required.
 """
 import operator
+import os
 import re
 import copy
+import hashlib
+import pickle
+import sys
+import zlib
 from typing import (
     Optional, Union, Tuple, NamedTuple,
-    Dict, List, Match, Set, cast,
+    Dict, List, Match, Set, Iterable, cast,
 )
 from srctools import FileSystem, Property, EmptyMapping
+from srctools.filesys import RawFileSystem, ZipFileSystem
 from pathlib import PurePosixPath as FSPath
 import srctools.logger
+import utils
 
 from app import tkMarkdown
 from packages import (
     PakObject, ParseData, ExportData,
     sep_values, desc_parse,
     set_cond_source, get_config,
-    Style,
+    Style, zip_info,
 )
 from editoritems import Item as EditorItem, InstCount
 from connections import Config as ConnConfig
@@ -35,6 +42,18 @@ RE_PERCENT_VAR = re.compile(r'%(\w*)%')
 CONN_NORM = 'CONNECTION_STANDARD'
 CONN_FUNNEL = 'CONNECTION_TBEAM_POLARITY'
 
+# Parsed item folders are cached on disk, so unchanged folders don't need to
+# be parsed again on the next launch. Increment to discard old caches.
+# The caches are also discarded when the BEE2 version or the parsers change.
+FOLDER_CACHE_VERSION = 2
+# For each package, folder -> (fingerprint, pickled data).
+# _folder_cache is what was loaded from disk, _folder_cache_used is the
+# entries used this session, which are saved back.
+FolderCache = Dict[str, Tuple[tuple, bytes]]
+_folder_cache: Dict[str, FolderCache] = {}
+_folder_cache_used: Dict[str, FolderCache] = {}
+_folder_cache_key: Optional[tuple] = None
+
 
 class UnParsedItemVariant(NamedTuple):
     """The desired variant for an item, before we've figured out the dependencies."""
@@ -550,6 +569,11 @@ class Item(PakObject):
                         )
                         # our_style.override_from_folder(style)
 
+    @classmethod
+    def post_parse(cls) -> None:
+        """Save the item folders we parsed, for the next launch."""
+        save_folder_cache()
+
     def __repr__(self) -> str:
         return '<Item:{}>'.format(self.id)
 
@@ -666,7 +690,7 @@ class Item(PakObject):
         )
 
 
-class ItemConfig(PakObject, allow_mult=True, has_img=False):
+class ItemConfig(PakObject, allow_mult=True, has_img=False, export_shared=False):
     """Allows adding additional configuration for items.
 
     The ID should match an item ID.
@@ -750,40 +774,37 @@ def parse_item_folder(
     The values will be filled in with itemVariant values
     """
     folders: Dict[str, ItemVariant] = {}
+    cache = _load_folder_cache(pak_id)
+    used_cache = _folder_cache_used.setdefault(pak_id.casefold(), {})
+
     for fold in folders_to_parse:
         prop_path = 'items/' + fold + '/properties.txt'
         editor_path = 'items/' + fold + '/editoritems.txt'
         config_path = 'items/' + fold + '/vbsp_config.cfg'
 
-        first_item: Optional[Item] = None
-        extra_items: List[EditorItem] = []
         with filesystem:
-            try:
-                props = filesystem.read_prop(prop_path).find_key('Properties')
-                f = filesystem[editor_path].open_str()
-            except FileNotFoundError as err:
-                raise IOError(
-                    '"' + pak_id + ':items/' + fold + '" not valid!'
-                    'Folder likely missing! '
-                ) from err
-            with f:
-                tok = Tokenizer(f, editor_path)
-                for tok_type, tok_value in tok:
-                    if tok_type is Token.STRING:
-                        if tok_value.casefold() != 'item':
-                            raise tok.error('Unknown item option "{}"!', tok_value)
-                        if first_item is None:
-                            first_item = EditorItem.parse_one(tok)
-                        else:
-                            extra_items.append(EditorItem.parse_one(tok))
-                    elif tok_type is not Token.NEWLINE:
-                        raise tok.error(tok_type)
+            fingerprint = _folder_fingerprint(
+                filesystem,
+                [prop_path, editor_path, config_path],
+            )
+        try:
+            cache_key, cache_data = cache[fold.casefold()]
+        except KeyError:
+            cache_key = cache_data = None
 
-        if first_item is None:
-            raise ValueError(
-                '"{}:items/{}/editoritems.txt has no '
-                '"Item" block!'.format(pak_id, fold)
+        if fingerprint is not None and cache_key == fingerprint:
+            first_item, extra_items, props, conf = pickle.loads(cache_data)
+        else:
+            first_item, extra_items, props, conf = _parse_folder_files(
+                filesystem, pak_id, fold,
             )
+            # Pickle now, since these objects are modified later on.
+            cache_data = pickle.dumps(
+                (first_item, extra_items, props, conf),
+                pickle.HIGHEST_PROTOCOL,
+            )
+        if fingerprint is not None:
+            used_cache[fold.casefold()] = (fingerprint, cache_data)
 
         # extra_items is any extra blocks (offset catchers, extent items).
         # These must not have a palette section - it'll override any the user
@@ -846,16 +867,155 @@ def parse_item_folder(
                 id=pak_id,
                 path=prop_path,
             )
+        folders[fold].vbsp_config = conf
+        set_cond_source(conf, folders[fold].source)
+    return folders
+
+
+def _parse_folder_files(
+    filesystem: FileSystem,
+    pak_id: str,
+    fold: str,
+) -> Tuple[EditorItem, List[EditorItem], Property, Property]:
+    """Parse the editoritems, properties and config for an item folder."""
+    prop_path = 'items/' + fold + '/properties.txt'
+    editor_path = 'items/' + fold + '/editoritems.txt'
+    config_path = 'items/' + fold + '/vbsp_config.cfg'
+
+    first_item: Optional[EditorItem] = None
+    extra_items: List[EditorItem] = []
+    with filesystem:
         try:
-            with filesystem:
-                folders[fold].vbsp_config = conf = filesystem.read_prop(
-                    config_path,
-                )
+            props = filesystem.read_prop(prop_path).find_key('Properties')
+            f = filesystem[editor_path].open_str()
+        except FileNotFoundError as err:
+            raise IOError(
+                '"' + pak_id + ':items/' + fold + '" not valid!'
+                'Folder likely missing! '
+            ) from err
+        with f:
+            tok = Tokenizer(f, editor_path)
+            for tok_type, tok_value in tok:
+                if tok_type is Token.STRING:
+                    if tok_value.casefold() != 'item':
+                        raise tok.error('Unknown item option "{}"!', tok_value)
+                    if first_item is None:
+                        first_item = EditorItem.parse_one(tok)
+                    else:
+                        extra_items.append(EditorItem.parse_one(tok))
+                elif tok_type is not Token.NEWLINE:
+                    raise tok.error(tok_type)
+
+    if first_item is None:
+        raise ValueError(
+            '"{}:items/{}/editoritems.txt has no '
+            '"Item" block!'.format(pak_id, fold)
+        )
+
+    try:
+        with filesystem:
+            conf = filesystem.read_prop(config_path)
+    except FileNotFoundError:
+        conf = Property(None, [])
+
+    return first_item, extra_items, props, conf
+
+
+def _folder_fingerprint(filesystem: FileSystem, paths: Iterable[str]) -> Optional[tuple]:
+    """Produce a value which changes whenever the given files are modified.
+
+    For zips we use the CRC and size, for folders the modification time.
+    If the filesystem is something else, this returns None.
+    """
+    key = []
+    for path in paths:
+        try:
+            file = filesystem[path]
         except FileNotFoundError:
-            folders[fold].vbsp_config = conf = Property(None, [])
+            key.append(None)
+            continue
+        info = zip_info(file)
+        if info is not None:
+            key.append((info.CRC, info.file_size))
+        elif isinstance(filesystem, RawFileSystem):
+            stat = os.stat(os.path.join(filesystem.path, file.path))
+            key.append((stat.st_mtime_ns, stat.st_size))
+        elif isinstance(filesystem, ZipFileSystem):
+            # Compute the CRC ourselves, that's still cheaper than parsing.
+            with file.open_bin() as f:
+                data = f.read()
+            key.append((zlib.crc32(data), len(data)))
+        else:
+            return None
+    return tuple(key)
 
-        set_cond_source(conf, folders[fold].source)
-    return folders
+
+def _get_folder_cache_key() -> tuple:
+    """Return the key stored with the caches, so they're discarded when outdated.
+
+    Frozen builds only change with the BEE2 version. From source, the
+    parsers could be edited at any time, so include a hash of them.
+    """
+    global _folder_cache_key
+    if _folder_cache_key is not None:
+        return _folder_cache_key
+    if utils.FROZEN:
+        _folder_cache_key = (FOLDER_CACHE_VERSION, utils.BEE_VERSION)
+        return _folder_cache_key
+    digest = hashlib.sha1()
+    # These are all imported by now.
+    for mod_name in [__name__, 'editoritems', 'editoritems_props', 'connections']:
+        try:
+            with open(sys.modules[mod_name].__file__, 'rb') as f:
+                digest.update(f.read())
+        except (KeyError, OSError, TypeError):
+            # No source file - use something which never matches.
+            digest.update(os.urandom(16))
+    _folder_cache_key = (FOLDER_CACHE_VERSION, utils.BEE_VERSION, digest.hexdigest())
+    return _folder_cache_key
+
+
+def _folder_cache_path(pak_id: str) -> str:
+    """Return the location of the folder cache for a package."""
+    return str(utils.conf_location('cache/items/{}.bin'.format(pak_id.casefold())))
+
+
+def _load_folder_cache(pak_id: str) -> FolderCache:
+    """Load the folder cache for a package, if not already loaded."""
+    pak_id = pak_id.casefold()
+    try:
+        return _folder_cache[pak_id]
+    except KeyError:
+        pass
+    cache: FolderCache = {}
+    try:
+        with open(_folder_cache_path(pak_id), 'rb') as f:
+            key, data = pickle.load(f)
+        if key == _get_folder_cache_key():
+            cache = data
+    except FileNotFoundError:
+        pass
+    except Exception:
+        LOGGER.warning('Could not read item cache for "{}":', pak_id, exc_info=True)
+    _folder_cache[pak_id] = cache
+    return cache
+
+
+def save_folder_cache() -> None:
+    """Write the folders parsed this session back to the cache.
+
+    Only the folders we used are kept, so removed items are discarded.
+    """
+    for pak_id, cache in _folder_cache_used.items():
+        if cache == _folder_cache.get(pak_id):
+            continue  # Nothing changed.
+        try:
+            with srctools.AtomicWriter(_folder_cache_path(pak_id), is_bytes=True) as f:
+                pickle.dump((_get_folder_cache_key(), cache), f, pickle.HIGHEST_PROTOCOL)
+        except OSError:
+            LOGGER.warning('Could not write item cache for "{}":', pak_id, exc_info=True)
+    _folder_cache.clear()
+    _folder_cache_used.clear()
 
 
 def apply_replacements(conf: Property) -> Property:
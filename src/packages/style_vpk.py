@@ -1,15 +1,98 @@
 import os
 import shutil
+import zlib
+from typing import Dict, Tuple, Union, Optional
 
 import utils
 from packages import (
     PakObject, ParseData, ExportData, NoVPKExport, LOGGER,
-    VPK_OVERRIDE_README, VPK_FOLDER,
+    VPK_OVERRIDE_README, VPK_FOLDER, zip_info,
 )
 from srctools import FileSystem, VPK
-
-
-class StyleVPK(PakObject, has_img=False):
+from srctools.filesys import File
+
+
+# Written next to the VPK, recording the files packed into it. If this
+# matches, the VPK doesn't need to be rebuilt.
+MANIFEST_NAME = 'bee2_vpk_manifest.txt'
+MANIFEST_VERSION = '1'
+# When computing CRCs, read files in blocks of this size.
+CHUNK_SIZE = 64 * 1024
+
+# VPK path -> (size, CRC)
+Manifest = Dict[str, Tuple[int, int]]
+# A file in a package, or a path in vpk_override/.
+VPKSource = Union[File, str]
+
+
+def _file_crc(source: VPKSource) -> Tuple[int, int]:
+    """Compute the size and CRC of a file, without reading it all at once."""
+    if isinstance(source, File):
+        # Zips already store the CRC.
+        info = zip_info(source)
+        if info is not None:
+            return info.file_size, info.CRC
+        file = source.open_bin()
+    else:
+        file = open(source, 'rb')
+    crc = size = 0
+    with file:
+        for chunk in iter(lambda: file.read(CHUNK_SIZE), b''):
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+    return size, crc
+
+
+def _read_source(source: VPKSource) -> bytes:
+    """Read the contents of a file."""
+    if isinstance(source, File):
+        with source.open_bin() as f:
+            return f.read()
+    else:
+        with open(source, 'rb') as f:
+            return f.read()
+
+
+def _vpk_stat(dest_folder: str) -> Optional[str]:
+    """Identify the current state of the written VPK files."""
+    parts = []
+    for filename in sorted(os.listdir(dest_folder)):
+        if filename[:6] == 'pak01_':
+            stat = os.stat(os.path.join(dest_folder, filename))
+            parts.append('{}:{}:{}'.format(filename, stat.st_size, stat.st_mtime_ns))
+    return ';'.join(parts) or None
+
+
+def _read_manifest(dest_folder: str) -> Tuple[Optional[str], Manifest]:
+    """Read the manifest written alongside the VPK.
+
+    This returns the VPK state it was written for, and the files.
+    """
+    manifest: Manifest = {}
+    try:
+        with open(os.path.join(dest_folder, MANIFEST_NAME), encoding='utf8') as f:
+            version = f.readline().rstrip('\n')
+            vpk_stat = f.readline().rstrip('\n')
+            if version != MANIFEST_VERSION:
+                return None, {}
+            for line in f:
+                path, size, crc = line.rstrip('\n').rsplit('\t', 2)
+                manifest[path] = int(size), int(crc)
+    except (FileNotFoundError, ValueError):
+        return None, {}
+    return vpk_stat, manifest
+
+
+def _write_manifest(dest_folder: str, manifest: Manifest) -> None:
+    """Write the manifest for a newly generated VPK."""
+    with open(os.path.join(dest_folder, MANIFEST_NAME), 'w', encoding='utf8') as f:
+        f.write(MANIFEST_VERSION + '\n')
+        f.write((_vpk_stat(dest_folder) or '') + '\n')
+        for path, (size, crc) in sorted(manifest.items()):
+            f.write('{}\t{}\t{}\n'.format(path, size, crc))
+
+
+class StyleVPK(PakObject, has_img=False, export_shared=False):
     """A set of VPK files used for styles.
 
     These are copied into _dlc3, allowing changing the in-editor wall
@@ -51,8 +134,42 @@ class StyleVPK(PakObject, has_img=False):
         else:
             sel_vpk = None
 
+        dest_folder = StyleVPK.vpk_folder(exp_data.game)
+
+        # Additionally, pack in game/vpk_override/ into the vpk - this allows
+        # users to easily override resources in general.
+        override_folder = exp_data.game.abs_path('vpk_override')
+        os.makedirs(override_folder, exist_ok=True)
+
+        # Also write a file to explain what it's for..
+        with open(os.path.join(override_folder, 'BEE2_README.txt'), 'w') as f:
+            f.write(VPK_OVERRIDE_README)
+
+        # VPK path -> source. Overrides replace files from the style.
+        sources: Dict[str, VPKSource] = {}
+        if sel_vpk is not None:
+            for file in sel_vpk.fsys.walk_folder(sel_vpk.dir):
+                rel_path = os.path.relpath(file.path, sel_vpk.dir)
+                sources[rel_path.replace('\\', '/')] = file
+        for subfolder, _, filenames in os.walk(override_folder):
+            for filename in filenames:
+                full_path = os.path.join(subfolder, filename)
+                rel_path = os.path.relpath(full_path, override_folder)
+                # Don't add the readme to the VPK though..
+                if rel_path != 'BEE2_README.txt':
+                    sources[rel_path.replace('\\', '/')] = full_path
+
+        manifest = {
+            path: _file_crc(source)
+            for path, source in sources.items()
+        }
+        old_stat, old_manifest = _read_manifest(dest_folder)
+        if manifest == old_manifest and old_stat == _vpk_stat(dest_folder):
+            LOGGER.info('VPK is unchanged, skipping.')
+            return
+
         try:
-            dest_folder = StyleVPK.clear_vpk_files(exp_data.game)
+            StyleVPK.clear_vpk_files(exp_data.game)
         except PermissionError:
             raise NoVPKExport()  # We can't edit the VPK files - P2 is open..
 
@@ -80,28 +197,10 @@ class StyleVPK(PakObject, has_img=False):
         # Generate the VPK.
         vpk_file = VPK(os.path.join(dest_folder, 'pak01_dir.vpk'), mode='w')
         with vpk_file:
-            if sel_vpk is not None:
-                for file in sel_vpk.fsys.walk_folder(sel_vpk.dir):
-                    with file.open_bin() as open_file:
-                        vpk_file.add_file(
-                            file.path,
-                            open_file.read(),
-                            sel_vpk.dir,
-                        )
-
-            # Additionally, pack in game/vpk_override/ into the vpk - this allows
-            # users to easily override resources in general.
-
-            override_folder = exp_data.game.abs_path('vpk_override')
-            os.makedirs(override_folder, exist_ok=True)
-
-            # Also write a file to explain what it's for..
-            with open(os.path.join(override_folder, 'BEE2_README.txt'), 'w') as f:
-                f.write(VPK_OVERRIDE_README)
-
-            vpk_file.add_folder(override_folder)
-            del vpk_file['BEE2_README.txt']  # Don't add this to the VPK though..
+            for path, source in sources.items():
+                vpk_file.add_file(path, _read_source(source))
 
+        _write_manifest(dest_folder, manifest)
         LOGGER.info('Written {} files to VPK!', len(vpk_file))
 
     @staticmethod
@@ -115,6 +214,16 @@ class StyleVPK(PakObject, has_img=False):
         for i in range(999):
             yield '_{:03}.vpk'.format(i)
 
+    @staticmethod
+    def vpk_folder(game) -> str:
+        """Return the folder the VPK is written to, creating it if needed."""
+        dest_folder = game.abs_path(VPK_FOLDER.get(
+            game.steamID,
+            'portal2_dlc3',
+        ))
+        os.makedirs(dest_folder, exist_ok=True)
+        return dest_folder
+
     @staticmethod
     def clear_vpk_files(game) -> str:
         """Remove existing VPKs files from a game.
@@ -124,15 +233,10 @@ class StyleVPK(PakObject, has_img=False):
 
         This returns the path to the game folder.
         """
-        dest_folder = game.abs_path(VPK_FOLDER.get(
-            game.steamID,
-            'portal2_dlc3',
-        ))
-
-        os.makedirs(dest_folder, exist_ok=True)
+        dest_folder = StyleVPK.vpk_folder(game)
         try:
             for file in os.listdir(dest_folder):
-                if file[:6] == 'pak01_':
+                if file[:6] == 'pak01_' or file == MANIFEST_NAME:
                     os.remove(os.path.join(dest_folder, file))
         except PermissionError:
             # The player might have Portal 2 open. Abort changing the VPK.
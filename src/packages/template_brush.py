@@ -17,7 +17,7 @@ LOGGER = srctools.logger.get_logger(__name__)
 TEMPLATE_FILE = VMF(preserve_ids=True)
 
 
-class BrushTemplate(PakObject, has_img=False, allow_mult=True):
+class BrushTemplate(PakObject, has_img=False, allow_mult=True, export_shared=False):
     """A template brush which will be copied into the map, then retextured.
 
     This allows the sides of the brush to swap between wall/floor textures
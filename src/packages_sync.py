@@ -7,6 +7,10 @@ they will be copied to any packages with those resources.
 
 The destination will be 'Portal 2/bee2_dev/' if that exists, or 'Portal 2/bee2/'
 otherwise.
+
+Alternatively pass --watch to keep running, and sync any files which are
+modified in the packages, the destination folder and Portal 2's instances
+folder. In this mode files which aren't already in a package are skipped.
 """
 
 import utils
@@ -24,9 +28,13 @@ gettext.NullTranslations().install(['gettext', 'ngettext'])
 
 import os
 import sys
+import time
+import select
+import struct
 import logging
+from collections import defaultdict
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Dict, Set, Tuple, Iterable
 
 import shutil
 
@@ -43,6 +51,22 @@ SKIPPED_FILES: List[str] = []
 
 # If enabled, ignore anything not in packages and that needs prompting.
 NO_PROMPT = False
+# Set in watch mode, where other files in the folders are expected.
+WATCHING = False
+
+# Casefolded resource path (resources/...) -> packages containing it,
+# and the path with the case used in that package.
+RESOURCE_INDEX: Dict[str, List[Tuple[RawFileSystem, Path]]] = defaultdict(list)
+# Files we copied -> their modification time and size afterward. Watch mode
+# uses this to ignore our own changes.
+RECENT_COPIES: Dict[Path, Tuple[int, int]] = {}
+
+# File types which are never synced.
+IGNORED_EXTS = ('.vmx', '.log', '.bsp', '.prt', '.lin')
+# In watch mode, wait for this many seconds without changes before syncing.
+DEBOUNCE_DELAY = 0.5
+# If inotify isn't available, scan the folders this often.
+POLL_INTERVAL = 1.0
 
 
 def get_package(file: Path) -> RawFileSystem:
@@ -85,6 +109,49 @@ def get_package(file: Path) -> RawFileSystem:
             return fsys
 
 
+def _index_key(rel_loc: Path) -> str:
+    """Compute the key used in RESOURCE_INDEX."""
+    return rel_loc.as_posix().casefold()
+
+
+def build_index() -> None:
+    """Find all the resources in unzipped packages."""
+    RESOURCE_INDEX.clear()
+    for package in PACKAGES.values():
+        if not isinstance(package.fsys, RawFileSystem):
+            # In a zip or the like.
+            continue
+        root = Path(package.fsys.path)
+        for folder, _, filenames in os.walk(str(root / 'resources')):
+            for filename in filenames:
+                rel_loc = Path(folder, filename).relative_to(root)
+                RESOURCE_INDEX[_index_key(rel_loc)].append((package.fsys, rel_loc))
+
+
+def add_to_index(rel_loc: Path, fsys: RawFileSystem) -> None:
+    """Record that a package now contains this resource."""
+    systems = RESOURCE_INDEX[_index_key(rel_loc)]
+    if not any(existing is fsys for existing, _ in systems):
+        systems.append((fsys, rel_loc))
+
+
+def dest_folder(portal2: Path) -> Path:
+    """Return the folder in Portal 2 that resources are copied to."""
+    if (portal2 / 'bee2_dev').exists():
+        return portal2 / 'bee2_dev'
+    else:
+        return portal2 / 'bee2'
+
+
+def copy_file(src: Path, dest: Path) -> None:
+    """Copy a file, and record it so watch mode doesn't copy it back."""
+    LOGGER.info('"{}" -> "{}"', src, dest)
+    os.makedirs(str(dest.parent), exist_ok=True)
+    shutil.copy(str(src), str(dest))
+    stat = dest.stat()
+    RECENT_COPIES[dest.resolve()] = (stat.st_mtime_ns, stat.st_size)
+
+
 def check_file(file: Path, portal2: Path, packages: Path) -> None:
     """Check for the location this file is in, and copy it to the other place."""
     try:
@@ -115,13 +182,14 @@ def check_file(file: Path, portal2: Path, packages: Path) -> None:
             LOGGER.warning('File "{!s}" not for copying!', file)
             return
         else:
-            if (portal2 / 'bee2_dev').exists():
-                dest = portal2 / 'bee2_dev' / res_path
-            else:
-                dest = portal2 / 'bee2' / res_path
-        LOGGER.info('"{}" -> "{}"', file, dest)
-        os.makedirs(str(dest.parent), exist_ok=True)
-        shutil.copy(str(file), str(dest))
+            dest = dest_folder(portal2) / res_path
+        # This might be a new file, so make sure it can be copied back.
+        for package in PACKAGES.values():
+            if isinstance(package.fsys, RawFileSystem):
+                root = Path(package.fsys.path).resolve()
+                if root in file.resolve().parents:
+                    add_to_index(Path('resources', res_path), package.fsys)
+        copy_file(file, dest)
     else:
         # In Portal 2, copy to each matching package.
         try:
@@ -129,34 +197,221 @@ def check_file(file: Path, portal2: Path, packages: Path) -> None:
                 'sdk_content/maps/instances/bee2'
             )
         except ValueError:
-            rel_loc = Path('resources') / relative.relative_to(
-                'bee2_dev' if (portal2 / 'bee2_dev').exists() else 'bee2'
-            )
-
-        target_systems = []
+            try:
+                rel_loc = Path('resources') / file.relative_to(dest_folder(portal2))
+            except ValueError:
+                LOGGER.warning('File "{!s}" not in bee2_dev/ or bee2/, skipping.', file)
+                return
 
-        for package in PACKAGES.values():
-            if not isinstance(package.fsys, RawFileSystem):
-                # In a zip or the like.
-                continue
-            if str(rel_loc) in package.fsys:
-                target_systems.append(package.fsys)
+        target_systems = list(RESOURCE_INDEX.get(_index_key(rel_loc), ()))
 
         if not target_systems:
+            if WATCHING:
+                # Compile logs and the like, not a resource.
+                LOGGER.debug('"{}" is not in any package, skipping.', rel_loc)
+                return
             if NO_PROMPT:
-                EXTRA_FILES.append(rel_loc)
+                LOGGER.warning('"{}" is not in any package, skipping.', rel_loc)
+                SKIPPED_FILES.append(str(rel_loc))
                 return
             # This file is totally new.
             try:
-                target_systems.append(get_package(rel_loc))
+                fsys = get_package(rel_loc)
             except KeyboardInterrupt:
                 return
+            target_systems.append((fsys, rel_loc))
+            add_to_index(rel_loc, fsys)
+
+        for fsys, pack_loc in target_systems:
+            # Use the package's case, so we don't create a duplicate.
+            copy_file(file, Path(fsys.path, pack_loc))
+
+
+class PollWatcher:
+    """Detects modified files by periodically scanning folders."""
+    def __init__(self, folders: List[Path]) -> None:
+        self.folders = folders
+        self.state = self._scan()
+
+    def _scan(self) -> Dict[Path, Tuple[int, int]]:
+        """Find the modification time and size of every file."""
+        state = {}
+        for root in self.folders:
+            for folder, _, filenames in os.walk(str(root)):
+                for filename in filenames:
+                    path = Path(folder, filename)
+                    try:
+                        stat = path.stat()
+                    except OSError:
+                        continue
+                    state[path] = (stat.st_mtime_ns, stat.st_size)
+        return state
+
+    def wait(self, timeout: Optional[float]) -> Set[Path]:
+        """Wait up to timeout seconds, then return the modified files."""
+        time.sleep(POLL_INTERVAL if timeout is None else timeout)
+        new_state = self._scan()
+        changed = {
+            path for path, key in new_state.items()
+            if self.state.get(path) != key
+        }
+        self.state = new_state
+        return changed
+
+
+class InotifyWatcher:
+    """Detects modified files using Linux's inotify API."""
+    IN_CLOSE_WRITE = 0x8
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_Q_OVERFLOW = 0x4000
+    IN_IGNORED = 0x8000
+    IN_ISDIR = 0x40000000
+    MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+    # wd, mask, cookie, name length.
+    EVENT = struct.Struct('iIII')
+
+    def __init__(self, folders: List[Path]) -> None:
+        import ctypes
+        import ctypes.util
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1() failed')
+        self._folders: Dict[int, Path] = {}
+        for folder in folders:
+            self._add_tree(folder)
+
+    def _add_tree(self, root: Path) -> Set[Path]:
+        """Watch a folder and all its subfolders, returning the files inside."""
+        files = set()
+        for folder, _, filenames in os.walk(str(root)):
+            watch = self._libc.inotify_add_watch(
+                self._fd, os.fsencode(folder), self.MASK,
+            )
+            if watch < 0:
+                LOGGER.warning('Could not watch "{}"!', folder)
+            else:
+                self._folders[watch] = Path(folder)
+            files.update(Path(folder, filename) for filename in filenames)
+        return files
+
+    def wait(self, timeout: Optional[float]) -> Set[Path]:
+        """Wait up to timeout seconds for files to be modified."""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+        data = os.read(self._fd, 64 * 1024)
+        changed = set()
+        pos = 0
+        while pos < len(data):
+            watch, mask, cookie, length = self.EVENT.unpack_from(data, pos)
+            pos += self.EVENT.size
+            name = os.fsdecode(data[pos:pos + length].rstrip(b'\0'))
+            pos += length
+
+            if mask & self.IN_Q_OVERFLOW:
+                LOGGER.warning('Too many changes at once, some may be missed!')
+                continue
+            if mask & self.IN_IGNORED:
+                # The folder was deleted.
+                self._folders.pop(watch, None)
+                continue
+            try:
+                path = self._folders[watch] / name
+            except KeyError:
+                continue
+            if mask & self.IN_ISDIR:
+                # Watch new folders, and sync anything already inside.
+                changed |= self._add_tree(path)
+            elif mask & (self.IN_CLOSE_WRITE | self.IN_MOVED_TO):
+                changed.add(path)
+        return changed
 
-        for fsys in target_systems:
-            full_loc = fsys.path / rel_loc
-            LOGGER.info('"{}" -> "{}"', file, full_loc)
-            os.makedirs(str(full_loc.parent), exist_ok=True)
-            shutil.copy(str(file), str(full_loc))
+
+def make_watcher(folders: List[Path]):
+    """Use inotify if possible, falling back to polling."""
+    if utils.LINUX:
+        try:
+            return InotifyWatcher(folders)
+        except (OSError, AttributeError, TypeError):
+            LOGGER.warning('inotify is unavailable, polling for changes instead.', exc_info=True)
+    return PollWatcher(folders)
+
+
+def expand_files(paths: Iterable[Path]) -> Set[Path]:
+    """Skip ignored files, and add the other files used by models."""
+    files_to_check = set()
+    for file_path in paths:
+        if file_path.suffix.casefold() in IGNORED_EXTS:
+            # Ignore these file types.
+            continue
+        files_to_check.add(file_path)
+        if file_path.suffix == '.mdl':
+            for suffix in ['.vvd', '.phy', '.dx90.vtx', '.sw.vtx']:
+                sub_file = file_path.with_suffix(suffix)
+                if sub_file.exists():
+                    files_to_check.add(sub_file)
+    return files_to_check
+
+
+def is_own_copy(file: Path) -> bool:
+    """Check if this file was just written by us, and is unchanged since."""
+    try:
+        key = RECENT_COPIES[file.resolve()]
+        stat = file.stat()
+    except (KeyError, OSError):
+        return False
+    return key == (stat.st_mtime_ns, stat.st_size)
+
+
+def watch(portal2: Path, packages: Path) -> int:
+    """Keep running, syncing files as they're modified."""
+    global NO_PROMPT, WATCHING
+    # We can't prompt while running in the background.
+    NO_PROMPT = WATCHING = True
+
+    folders = [
+        folder for folder in [
+            dest_folder(portal2),
+            portal2 / 'sdk_content/maps/instances/bee2',
+            packages,
+        ]
+        if folder.is_dir()
+    ]
+    watcher = make_watcher(folders)
+    LOGGER.info('Watching for changes in:')
+    for folder in folders:
+        LOGGER.info('- {}', folder)
+    LOGGER.info('Press Ctrl+C to stop.')
+
+    try:
+        while True:
+            changed = watcher.wait(None)
+            if not changed:
+                continue
+            # Editors often write several times, wait for that to stop.
+            while True:
+                more = watcher.wait(DEBOUNCE_DELAY)
+                if not more:
+                    break
+                changed |= more
+
+            files = [
+                file for file in sorted(expand_files(changed))
+                if file.is_file() and not is_own_copy(file)
+            ]
+            if not files:
+                continue
+            LOGGER.info('Syncing {} files...', len(files))
+            for file_path in files:
+                try:
+                    check_file(file_path, portal2, packages)
+                except (OSError, ValueError):
+                    LOGGER.exception('Could not sync "{}":', file_path)
+    except KeyboardInterrupt:
+        LOGGER.info('Stopping.')
+    return 0
 
 
 def print_package_ids() -> None:
@@ -172,7 +427,9 @@ def print_package_ids() -> None:
 
 def main(files: List[str]) -> int:
     """Run the transfer."""
-    if not files:
+    do_watch = '--watch' in files
+    files = [file for file in files if file != '--watch']
+    if not files and not do_watch:
         LOGGER.error('No files to copy!')
         LOGGER.error('packages_sync: {}', __doc__)
         return 1
@@ -201,6 +458,10 @@ def main(files: List[str]) -> int:
     print_package_ids()
 
     package_loc = Path('../', GEN_OPTS['Directories']['package']).resolve()
+    build_index()
+
+    if do_watch:
+        return watch(portal2_loc.resolve(), package_loc)
 
     file_list = []  # type: List[Path]
 
@@ -213,18 +474,7 @@ def main(files: List[str]) -> int:
         else:
             file_list.append(file_path)
 
-    files_to_check = set()
-
-    for file_path in file_list:
-        if file_path.suffix.casefold() in ('.vmx', '.log', '.bsp', '.prt', '.lin'):
-            # Ignore these file types.
-            continue
-        files_to_check.add(file_path)
-        if file_path.suffix == '.mdl':
-            for suffix in ['.vvd', '.phy', '.dx90.vtx', '.sw.vtx']:
-                sub_file = file_path.with_suffix(suffix)
-                if sub_file.exists():
-                    files_to_check.add(sub_file)
+    files_to_check = expand_files(file_list)
 
     LOGGER.info('Processing {} files...', len(files_to_check))
 
@@ -0,0 +1,245 @@
+"""Caches the FGD and soundscript databases between VRAD compiles.
+
+Both are stored in bin/bee2/, and are rebuilt if the source files change.
+For soundscripts, only the names of the sounds are cached. Every name is
+registered with the packlist, but each script is only fully parsed the
+first time one of its sounds is looked up. That relies on how PackList
+stores sounds internally, so it's only done for srctools versions known to
+work, otherwise all the scripts are parsed immediately.
+"""
+import hashlib
+import os
+import pickle
+import sys
+from collections import Counter
+from typing import Dict, FrozenSet, Optional, Tuple
+
+import srctools
+import srctools.logger
+from srctools import AtomicWriter, FGD, Property
+from srctools.filesys import File, FileSystem, RawFileSystem
+from srctools.packlist import PackList
+
+import utils
+
+
+LOGGER = srctools.logger.get_logger(__name__)
+
+# Increment if the format of the caches changes.
+CACHE_VERSION = 1
+FGD_CACHE = 'bee2/fgd_cache.bin'
+SOUNDSCRIPT_CACHE = 'bee2/sndscript_index.bin'
+SOUNDSCRIPT_FOLDER = 'scripts/bee2_snd/'
+
+# Soundscript filename -> (fingerprint, sound names).
+# If the names are None, the file couldn't be parsed and should always be
+# loaded so the error is reported.
+SoundIndex = Dict[str, Tuple[str, Optional[FrozenSet[str]]]]
+
+# srctools versions whose PackList only accesses soundscripts by casefolded
+# name, using "in", [] and get(). Check PackList before adding to this.
+LAZY_SOUNDSCRIPT_VERSIONS = {'1.2.0'}
+
+
+def _srctools_version() -> Optional[str]:
+    """Find the version of srctools installed, if possible."""
+    version = getattr(srctools, '__version__', None)
+    if version is not None:
+        return str(version)
+    try:
+        from importlib.metadata import version as get_version  # type: ignore
+    except ImportError:  # Python < 3.8
+        try:
+            from importlib_metadata import version as get_version  # type: ignore
+        except ImportError:
+            return None
+    try:
+        return str(get_version('srctools'))
+    except Exception:  # Not installed normally, or frozen without metadata.
+        return None
+
+
+def _load_pickle(filename: str, key: object) -> Optional[object]:
+    """Load a cache file, if it exists and matches the key."""
+    try:
+        with open(filename, 'rb') as f:
+            version, file_key, data = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception:
+        LOGGER.warning('Could not read cache "{}":', filename, exc_info=True)
+        return None
+    if version != CACHE_VERSION or file_key != key:
+        return None
+    return data
+
+
+def _save_pickle(filename: str, key: object, data: object) -> None:
+    """Write a cache file, ignoring errors since it's only an optimisation."""
+    try:
+        with AtomicWriter(filename, is_bytes=True) as f:
+            pickle.dump((CACHE_VERSION, key, data), f, pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        LOGGER.warning('Could not write cache "{}":', filename, exc_info=True)
+
+
+def load_fgd() -> FGD:
+    """Load the engine FGD database, using the cached copy if possible."""
+    # The database is packaged with srctools, so it changes only if that's
+    # updated.
+    if utils.FROZEN:
+        source = sys.executable
+    else:
+        source = srctools.__file__
+    try:
+        key = (utils.BEE_VERSION, os.stat(source).st_mtime_ns)
+    except OSError:
+        return FGD.engine_dbase()
+
+    fgd = _load_pickle(FGD_CACHE, key)
+    if isinstance(fgd, FGD):
+        return fgd
+    fgd = FGD.engine_dbase()
+    _save_pickle(FGD_CACHE, key, fgd)
+    return fgd
+
+
+def _fingerprint(file: File) -> str:
+    """Compute a value which changes when this file is modified."""
+    fsys: FileSystem = file.sys
+    if isinstance(fsys, RawFileSystem):
+        try:
+            stat = os.stat(os.path.join(fsys.path, file.path))
+        except OSError:
+            pass
+        else:
+            return '{}:{}'.format(stat.st_mtime_ns, stat.st_size)
+    # Otherwise, hash the contents - that's still cheaper than parsing.
+    with file.open_bin() as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def _sound_names(file: File) -> Optional[FrozenSet[str]]:
+    """Read the names of the sounds defined in a soundscript."""
+    try:
+        with file.open_str() as f:
+            props = Property.parse(f, file.path)
+    except Exception:
+        LOGGER.warning('Could not parse soundscript "{}":', file.path, exc_info=True)
+        return None
+    # Property names are already casefolded.
+    return frozenset(prop.name for prop in props)
+
+
+class _LazySoundscripts(dict):
+    """Replaces PackList.soundscripts, parsing scripts when first needed.
+
+    Each missing sound name is looked up in the index, and if found the
+    script defining it is loaded into the packlist normally.
+    """
+    def __init__(
+        self,
+        packlist: PackList,
+        existing: dict,
+        pending: Dict[str, File],
+    ) -> None:
+        super().__init__(existing)
+        self.packlist = packlist
+        # Sound name -> file which hasn't been parsed yet.
+        self.pending = pending
+
+    def _load(self, key: object) -> bool:
+        """Try loading the script for this sound, returning if it was found."""
+        if not isinstance(key, str):
+            return False
+        try:
+            file = self.pending[key.casefold()]
+        except KeyError:
+            return False
+        # Remove every name from this file first, so we don't reload it.
+        for name, other in list(self.pending.items()):
+            if other is file:
+                del self.pending[name]
+        self.packlist.load_soundscript(file, always_include=False)
+        return True
+
+    def __missing__(self, key: str) -> object:
+        if self._load(key) and dict.__contains__(self, key):
+            return dict.__getitem__(self, key)
+        raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        return dict.__contains__(self, key) or (
+            self._load(key) and dict.__contains__(self, key)
+        )
+
+    def get(self, key: object, default: object = None) -> object:
+        """Look up a sound, loading it if required."""
+        if key in self:
+            return self[key]
+        return default
+
+
+def load_soundscripts(packlist: PackList, fsys: FileSystem) -> None:
+    """Register the soundscripts in scripts/bee2_snd/.
+
+    This way we can pack those, if required. Scripts are parsed when
+    one of their sounds is first looked up.
+    """
+    old_index: SoundIndex = _load_pickle(SOUNDSCRIPT_CACHE, None) or {}
+    index: SoundIndex = {}
+    files: Dict[str, File] = {}
+    changed = False
+
+    for file in fsys.walk_folder(SOUNDSCRIPT_FOLDER):
+        if not file.path.endswith('.txt'):
+            continue
+        fingerprint = _fingerprint(file)
+        try:
+            old_fingerprint, names = old_index[file.path]
+            if old_fingerprint != fingerprint:
+                raise KeyError(file.path)
+        except KeyError:
+            names = _sound_names(file)
+            changed = True
+        index[file.path] = fingerprint, names
+        files[file.path] = file
+
+    if changed or index.keys() != old_index.keys():
+        _save_pickle(SOUNDSCRIPT_CACHE, None, index)
+
+    existing = getattr(packlist, 'soundscripts', None)
+    version = _srctools_version()
+    lazy = version in LAZY_SOUNDSCRIPT_VERSIONS and type(existing) is dict
+    if not lazy:
+        LOGGER.debug(
+            'Not loading soundscripts lazily with srctools {}.',
+            version or '(unknown version)',
+        )
+    # If a sound is defined in multiple scripts, the last one loaded wins.
+    # Load those scripts now in order, so that stays the case.
+    name_counts = Counter(
+        name
+        for fingerprint, names in index.values()
+        if names is not None
+        for name in names
+    )
+    pending: Dict[str, File] = {}
+    for path, (fingerprint, names) in index.items():
+        if (
+            names is None or not lazy
+            or any(name_counts[name] > 1 for name in names)
+        ):
+            # Broken scripts are loaded now so the error is reported.
+            # If we don't know how the packlist stores sounds, we have to
+            # parse everything.
+            packlist.load_soundscript(files[path], always_include=False)
+        else:
+            for name in names:
+                pending[name] = files[path]
+    if pending:
+        packlist.soundscripts = _LazySoundscripts(packlist, existing, pending)
+    LOGGER.info(
+        'Registered {} BEE2 soundscripts ({} sounds).',
+        len(index), len(pending),
+    )
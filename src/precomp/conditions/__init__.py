@@ -39,14 +39,14 @@ from typing import (
     TextIO,
 )
 
-from precomp import instanceLocs
+from precomp import instanceLocs, instance_index
 import consts
 import srctools.logger
 import utils
 from srctools import (
     Property,
     Vec_tuple, Vec,
-    VMF, Entity, Output, Solid, Angle,
+    VMF, Entity, Output, Solid, Angle, Matrix,
 )
 
 
@@ -60,8 +60,11 @@ ALL_INST = set()  # type: Set[str]
 
 conditions: List['Condition'] = []
 FLAG_LOOKUP = {}  # type: Dict[str, Callable[[srctools.VMF, Entity, Property], bool]]
+FLAG_SETUP = {}  # type: Dict[str, Callable[[srctools.VMF, Property], object]]
 RESULT_LOOKUP = {}  # type: Dict[str, Callable[[srctools.VMF, Entity, Property], object]]
 RESULT_SETUP = {}  # type: Dict[str, Callable[[srctools.VMF, Property], object]]
+# id(flag) -> (vmf, flag, compiled), for check_flag().
+_CHECK_FLAG_CACHE = {}  # type: Dict[int, Tuple[VMF, Property, CompiledFlag]]
 
 # Used to dump a list of the flags, results, meta-conditions
 ALL_FLAGS = []  # type: List[Tuple[str, Iterable[str], Callable[[srctools.VMF, Entity, Property], bool]]]
@@ -161,9 +164,46 @@ class EndCondition(Exception):
 RES_EXHAUSTED = object()
 
 
+class CompiledFlag:
+    """A flag, with its function looked up and any setup done ahead of time.
+
+    Calling this with an instance evaluates the flag.
+    """
+    __slots__ = ['vmf', 'func', 'prop', 'desired']
+
+    def __init__(
+        self,
+        vmf: VMF,
+        func: Callable[[VMF, Entity, Property], bool],
+        prop: Property,
+        desired: bool,
+    ) -> None:
+        self.vmf = vmf
+        self.func = func
+        self.prop = prop
+        # If the flag starts with '!', this is false to invert the result.
+        self.desired = desired
+
+    def __repr__(self) -> str:
+        return 'CompiledFlag({!r}, {!r}, {!r})'.format(
+            self.func, self.prop, self.desired,
+        )
+
+    def __call__(self, inst: Entity) -> bool:
+        return self.func(self.vmf, inst, self.prop) == self.desired
+
+
+def _flag_invalid(vmf: VMF, inst: Entity, flag: Property) -> bool:
+    """Used for flags which don't exist, to always fail."""
+    return False
+
+
 class Condition:
     """A single condition which may be evaluated."""
-    __slots__ = ['flags', 'results', 'else_results', 'priority', 'source']
+    __slots__ = [
+        'flags', 'results', 'else_results', 'priority', 'source',
+        'compiled_flags',
+    ]
 
     def __init__(
         self,
@@ -178,6 +218,8 @@ class Condition:
         self.else_results = else_results or []
         self.priority = priority
         self.source = source
+        # Set by setup().
+        self.compiled_flags: Optional[List[CompiledFlag]] = None
 
     def __repr__(self) -> str:
         return (
@@ -235,9 +277,26 @@ class Condition:
         )
 
     def setup(self, vmf: VMF) -> None:
-        """Some results need some pre-processing before they can be used.
+        """Some flags and results need some pre-processing before they can be used.
 
         """
+        # noinspection PyBroadException
+        try:
+            self.compiled_flags = [
+                compile_flag(vmf, flag)
+                for flag in self.flags
+            ]
+        except Exception:
+            LOGGER.exception(
+                'Error in {} flag setup:',
+                self.source or 'condition',
+            )
+            if utils.DEV_MODE:
+                utils.quit_app(1)
+            else:
+                # Skip this condition, but keep compiling.
+                self.compiled_flags = [CompiledFlag(vmf, _flag_invalid, Property('', ''), True)]
+
         for res in self.results[:]:
             self.setup_result(vmf, self.results, res, self.source)
 
@@ -290,9 +349,14 @@ class Condition:
 
     def test(self, inst: Entity) -> None:
         """Try to satisfy this condition on the given instance."""
+        if self.compiled_flags is None:
+            self.compiled_flags = [
+                compile_flag(inst.map, flag)
+                for flag in self.flags
+            ]
         success = True
-        for flag in self.flags:
-            if not check_flag(inst.map, flag, inst):
+        for flag in self.compiled_flags:
+            if not flag(inst):
                 success = False
                 break
         results = self.results if success else self.else_results
@@ -444,6 +508,20 @@ def make_flag(orig_name: str, *aliases: str):
     return x
 
 
+def make_flag_setup(*names: str):
+    """Decorator to do setup for this flag.
+
+    This is called once with the flag's configuration, the return value is
+    then passed to the flag as its value instead.
+    """
+    def x(func: Callable[..., Any]):
+        wrapper = annotation_caller(func, srctools.VMF, Property)
+        for name in names:
+            FLAG_SETUP[name.casefold()] = wrapper
+        return func
+    return x
+
+
 def make_result(orig_name: str, *aliases: str):
     """Decorator to add results to the lookup."""
     folded_name = orig_name.casefold()
@@ -538,15 +616,13 @@ def check_all(vmf: VMF) -> None:
         vbsp.settings['has_attr'].items()
         if value
     ])
-    # Dynamically added by lru_cache()
-    # noinspection PyUnresolvedReferences
-    LOGGER.info('instanceLocs cache: {}', instanceLocs.resolve.cache_info())
+    LOGGER.info('instanceLocs cache: {}', instanceLocs.cache_info())
     LOGGER.info('Style Vars: {}', dict(vbsp.settings['style_vars']))
     LOGGER.info('Global instances: {}', GLOBAL_INSTANCES)
 
 
-def check_flag(vmf: VMF, flag: Property, inst: Entity) -> bool:
-    """Determine the result for a condition flag."""
+def compile_flag(vmf: VMF, flag: Property) -> CompiledFlag:
+    """Look up a flag's function and perform its setup, if required."""
     name = flag.name
     # If starting with '!', invert the result.
     if name[:1] == '!':
@@ -564,10 +640,36 @@ def check_flag(vmf: VMF, flag: Property, inst: Entity) -> bool:
         else:
             LOGGER.warning(err_msg)
             # Skip these conditions..
-            return False
+            return CompiledFlag(vmf, _flag_invalid, flag, True)
+
+    try:
+        setup_func = FLAG_SETUP[name]
+    except KeyError:
+        pass
+    else:
+        # Don't modify the original, it may be compiled again.
+        flag = Property(flag.real_name, setup_func(vmf, flag))
+    return CompiledFlag(vmf, func, flag, desired_result)
+
 
-    res = func(vmf, inst, flag)
-    return res == desired_result
+def check_flag(vmf: VMF, flag: Property, inst: Entity) -> bool:
+    """Determine the result for a condition flag.
+
+    The compiled flag is cached, so the setup is only done once for each
+    flag even if this is called for many instances.
+    """
+    try:
+        cached_vmf, cached_flag, compiled = _CHECK_FLAG_CACHE[id(flag)]
+    except KeyError:
+        pass
+    else:
+        # Check the ID wasn't reused by a different flag.
+        if cached_vmf is vmf and cached_flag is flag:
+            return compiled(inst)
+    compiled = compile_flag(vmf, flag)
+    # Keep a reference to the flag, so the ID stays valid.
+    _CHECK_FLAG_CACHE[id(flag)] = vmf, flag, compiled
+    return compiled(inst)
 
 
 def import_conditions() -> None:
@@ -772,7 +874,7 @@ def add_suffix(inst: Entity, suff: str) -> None:
     """
     file = inst['file']
     old_name, dot, ext = file.partition('.')
-    inst['file'] = ''.join((old_name, suff, dot, ext))
+    instance_index.set_file(inst, ''.join((old_name, suff, dot, ext)))
 
 
 def local_name(inst: Entity, name: Union[str, Entity]) -> str:
@@ -905,6 +1007,65 @@ def resolve_value(inst: Entity, value: Union[str, T]) -> Union[str, T]:
         return value
 
 
+class InstCache:
+    """Parsed values for an instance, reused by flags and results.
+
+    Use get_cache() to fetch the cache attached to an instance. The raw
+    keyvalue strings are stored alongside, so if a result modifies the
+    origin or angles the values are reparsed the next time they are
+    requested. Copies are returned, so callers can freely modify them.
+    """
+    __slots__ = [
+        'inst',
+        '_origin_str', '_origin',
+        '_angles_str', '_angles', '_orient',
+    ]
+
+    def __init__(self, inst: Entity) -> None:
+        self.inst = inst
+        self._origin_str = self._angles_str = None  # type: Optional[str]
+        self._origin = Vec()
+        self._angles = Angle()
+        self._orient = None  # type: Optional[Matrix]
+
+    def origin(self) -> Vec:
+        """Return the instance's origin."""
+        value = self.inst['origin']
+        if value != self._origin_str:
+            self._origin = Vec.from_str(value)
+            self._origin_str = value
+        return self._origin.copy()
+
+    def _check_angles(self) -> None:
+        """Reparse the angles if they were changed."""
+        value = self.inst['angles']
+        if value != self._angles_str:
+            self._angles = Angle.from_str(value)
+            self._angles_str = value
+            self._orient = None
+
+    def angles(self) -> Angle:
+        """Return the instance's angles."""
+        self._check_angles()
+        return self._angles.copy()
+
+    def orient(self) -> Matrix:
+        """Return the instance's orientation, as a matrix."""
+        self._check_angles()
+        if self._orient is None:
+            self._orient = Matrix.from_angle(self._angles)
+        return self._orient.copy()
+
+
+def get_cache(inst: Entity) -> InstCache:
+    """Return the parsed-value cache for an instance, creating it if needed."""
+    try:
+        return inst.cond_cache
+    except AttributeError:
+        inst.cond_cache = cache = InstCache(inst)
+        return cache
+
+
 def resolve_offset(inst, value: str, scale: float=1, zoff: float=0) -> Vec:
     """Retrieve an offset from an instance var. This allows several special values:
 
@@ -943,10 +1104,8 @@ def resolve_offset(inst, value: str, scale: float=1, zoff: float=0) -> Vec:
         offset = Vec.from_str(resolve_value(inst, value)) * scale
     offset.z += zoff
 
-    offset.localise(
-        Vec.from_str(inst['origin']),
-        Angle.from_str(inst['angles']),
-    )
+    cache = get_cache(inst)
+    offset.localise(cache.origin(), cache.orient())
 
     return offset
 
@@ -1147,9 +1306,18 @@ def res_switch_setup(vmf: VMF, res: Property):
     if method is SWITCH_TYPE.LAST:
         cases[:] = cases[::-1]
 
+    # Compile the flag for each case.
+    compiled_cases = [
+        (
+            case,
+            compile_flag(vmf, Property(flag, case.real_name))
+            if flag is not None else None,
+        )
+        for case in cases
+    ]
+
     return (
-        flag,
-        cases,
+        compiled_cases,
         default,
         method,
         rand_seed,
@@ -1169,7 +1337,7 @@ def res_switch(vmf: VMF, inst: Entity, res: Property):
     For 'random' mode, you can omit the flag to choose from all objects. In
     this case the flag arguments are ignored.
     """
-    flag_name, cases, default, method, rand_seed = res.value
+    cases, default, method, rand_seed = res.value
 
     if method is SWITCH_TYPE.RANDOM:
         cases = cases[:]
@@ -1178,11 +1346,9 @@ def res_switch(vmf: VMF, inst: Entity, res: Property):
 
     run_case = False
 
-    for case in cases:
-        if flag_name is not None:
-            flag = Property(flag_name, case.real_name)
-            if not check_flag(vmf, flag, inst):
-                continue
+    for case, flag in cases:
+        if flag is not None and not flag(inst):
+            continue
         for res in case:
             Condition.test_result(inst, res)
         run_case = True
@@ -1251,7 +1417,7 @@ def make_static_pist(vmf: srctools.VMF, ent: Entity, res: Property):
         # Use instances based on the height of the bottom position.
         val = res.value['bottom_' + str(bottom_pos)]
         if val:  # Only if defined
-            ent['file'] = val
+            instance_index.set_file(ent, val)
 
         logic_file = res.value['logic_' + str(bottom_pos)]
         if logic_file:
@@ -1259,7 +1425,7 @@ def make_static_pist(vmf: srctools.VMF, ent: Entity, res: Property):
             # piston. This allows easily splitting the piston logic
             # from the styled components
             logic_ent = ent.copy()
-            logic_ent['file'] = logic_file
+            instance_index.set_file(logic_ent, logic_file)
             vmf.add_ent(logic_ent)
             # If no connections are present, set the 'enable' value in
             # the logic to True so the piston can function
@@ -1276,7 +1442,7 @@ def make_static_pist(vmf: srctools.VMF, ent: Entity, res: Property):
 
         val = res.value['static_' + str(pos)]
         if val:
-            ent['file'] = val
+            instance_index.set_file(ent, val)
 
     # Add in the grating for the bottom as an overlay.
     # It's low to fit the piston at minimum, or higher if needed.
@@ -1287,7 +1453,7 @@ def make_static_pist(vmf: srctools.VMF, ent: Entity, res: Property):
     ]
     if grate:
         grate_ent = ent.copy()
-        grate_ent['file'] = grate
+        instance_index.set_file(grate_ent, grate)
         vmf.add_ent(grate_ent)
 
 
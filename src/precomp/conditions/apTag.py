@@ -7,7 +7,7 @@ from typing import Optional
 from srctools import Vec, Property, VMF, Entity, Output
 import srctools.logger
 
-from precomp import instanceLocs, options, connections
+from precomp import instanceLocs, instance_index, options, connections
 from precomp.conditions import (
     meta_cond, make_result,
     PETI_INST_ANGLE, RES_EXHAUSTED,
@@ -116,7 +116,7 @@ def ap_tag_modifications(vmf: VMF):
     for inst in vmf.by_class['func_instance']:
         if inst['file'].casefold() not in transition_ents:
             continue
-        inst['file'] = 'instances/bee2/transition_ents_tag.vmf'
+        instance_index.set_file(inst, 'instances/bee2/transition_ents_tag.vmf')
 
     # Because of a bug in P2, these folders aren't created automatically.
     # We need a folder with the user's ID in portal2/maps/puzzlemaker.
@@ -254,7 +254,7 @@ def res_make_tag_fizzler(vmf: VMF, inst: Entity, res: Property):
     loc = Vec.from_str(inst['origin'])
 
     if disable_other or (blue_enabled and oran_enabled):
-        inst['file'] = inst_frame_double
+        instance_index.set_file(inst, inst_frame_double)
         # On a wall, and pointing vertically
         if inst_normal.z == 0 and Vec(y=1).rotate(*inst_angle).z:
             # They're vertical, make sure blue's on top!
@@ -270,7 +270,7 @@ def res_make_tag_fizzler(vmf: VMF, inst: Entity, res: Property):
             blue_loc = loc + offset
             oran_loc = loc - offset
     else:
-        inst['file'] = inst_frame_single
+        instance_index.set_file(inst, inst_frame_single)
         # They're always centered
         blue_loc = loc
         oran_loc = loc
@@ -208,8 +208,9 @@ def res_set_texture(inst: Entity, res: Property):
     will be rotated by the instance angles, and then the face with the same
     orientation will be applied to the face (with the rotation and texture).
     """
-    angles = Angle.from_str(inst['angles'])
-    origin = Vec.from_str(inst['origin'])
+    cache = conditions.get_cache(inst)
+    angles = cache.angles()
+    origin = cache.origin()
 
     pos = Vec.from_str(res['pos', '0 0 0'])
     pos.z -= 64  # Subtract so origin is the floor-position
@@ -272,8 +273,9 @@ def res_add_brush(vmf: VMF, inst: Entity, res: Property) -> None:
     The sides will be textured with 1x1, 2x2 or 4x4 wall, ceiling and floor
     textures as needed.
     """
-    origin = Vec.from_str(inst['origin'])
-    angles = Angle.from_str(inst['angles'])
+    cache = conditions.get_cache(inst)
+    origin = cache.origin()
+    angles = cache.angles()
 
     point1 = Vec.from_str(res['point1'])
     point2 = Vec.from_str(res['point2'])
@@ -640,8 +642,9 @@ def res_import_template(vmf: VMF, inst: Entity, res: Property):
         force_colour = template_brush.TEMP_COLOUR_INVERT[force_colour]
     # else: False value, no invert.
 
-    origin = Vec.from_str(inst['origin'])
-    angles = Angle.from_str(inst['angles', '0 0 0'])
+    cache = conditions.get_cache(inst)
+    origin = cache.origin()
+    angles = cache.angles()
     temp_data = template_brush.import_template(
         vmf,
         template,
@@ -696,8 +699,9 @@ def res_import_template(vmf: VMF, inst: Entity, res: Property):
 def res_antigel(inst: Entity) -> None:
     """Implement the Antigel marker."""
     inst.remove()
-    origin = Vec.from_str(inst['origin'])
-    orient = Matrix.from_angle(Angle.from_str(inst['angles']))
+    cache = conditions.get_cache(inst)
+    origin = cache.origin()
+    orient = cache.orient()
 
     pos = round(origin - 128 * orient.up(), 6)
     norm = round(orient.up(), 6)
@@ -747,7 +751,7 @@ def res_checkpoint_trigger(inst: Entity, res: Property) -> None:
         return
 
     pos = brushLoc.POS.raycast_world(
-        Vec.from_str(inst['origin']),
+        conditions.get_cache(inst).origin(),
         direction=Vec(0, 0, -1),
     )
     bbox_min = pos - (192, 192, 64)
@@ -818,8 +822,9 @@ def res_set_tile(inst: Entity, res: Property) -> None:
     - `x`: Cutout Tile (Broken)
     - `o`: Cutout Tile (Partial)
     """
-    origin = Vec.from_str(inst['origin'])
-    orient = Matrix.from_angle(Angle.from_str(inst['angles']))
+    cache = conditions.get_cache(inst)
+    origin = cache.origin()
+    orient = cache.orient()
 
     offset = (res.vec('offset', -48, 48) - (0, 0, 64)) @ orient + origin
 
@@ -902,7 +907,7 @@ def res_add_placement_helper(inst: Entity, res: Property):
     the helper should be added to. If `upDir` is specified, this is the
     direction of the top of the portal.
     """
-    orient = Matrix.from_angle(Angle.from_str(inst['angles']))
+    orient = conditions.get_cache(inst).orient()
 
     pos = conditions.resolve_offset(inst, res['offset', '0 0 0'], zoff=-64)
     normal = res.vec('normal', 0, 0, 1) @ orient
@@ -1028,9 +1033,10 @@ def res_create_panel(vmf: VMF, inst: Entity, props: Property) -> None:
 
 def edit_panel(vmf: VMF, inst: Entity, props: Property, create: bool) -> None:
     """Implements SetPanelOptions and CreatePanel."""
-    orient = Matrix.from_angle(Angle.from_str(inst['angles']))
+    cache = conditions.get_cache(inst)
+    orient = cache.orient()
     normal: Vec = round(props.vec('normal', 0, 0, 1) @ orient, 6)
-    origin = Vec.from_str(inst['origin'])
+    origin = cache.origin()
     uaxis, vaxis = Vec.INV_AXIS[normal.axis()]
 
     points: Set[Tuple[float, float, float]] = set()
@@ -1143,7 +1149,7 @@ def edit_panel(vmf: VMF, inst: Entity, props: Property, create: bool) -> None:
 
         if 'offset' in props:
             panel.offset = conditions.resolve_offset(inst, props['offset'])
-            panel.offset -= Vec.from_str(inst['origin'])
+            panel.offset -= origin
         if 'template' in props:
             # We only want the template inserted once. So remove it from all but one.
             if len(panels) == 1:
@@ -1201,10 +1207,7 @@ def edit_panel(vmf: VMF, inst: Entity, props: Property, create: bool) -> None:
             # Localise any origin value.
             if 'origin' in brush_ent.keys:
                 pos = Vec.from_str(brush_ent['origin'])
-                pos.localise(
-                    Vec.from_str(inst['origin']),
-                    Vec.from_str(inst['angles']),
-                )
+                pos.localise(origin, orient)
                 brush_ent['origin'] = pos
             elif old_pos is not None:
                 brush_ent['origin'] = old_pos
@@ -1248,7 +1251,7 @@ def res_transfer_bullseye(inst: Entity, props: Property):
     """Transfer catapult targets and placement helpers from one tile to another."""
     start_pos = conditions.resolve_offset(inst, props['start_pos', ''])
     end_pos = conditions.resolve_offset(inst, props['end_pos', ''])
-    angles = Angle.from_str(inst['angles'])
+    angles = conditions.get_cache(inst).angles()
     start_norm = props.vec('start_norm', 0, 0, 1) @ angles
     end_norm = props.vec('end_norm', 0, 0, 1) @ angles
 
@@ -2,7 +2,7 @@
 from srctools import Vec, Property, VMF, Entity
 import srctools.logger
 
-from precomp import brushLoc, instanceLocs
+from precomp import brushLoc, instanceLocs, instance_index
 from precomp.conditions import make_result, RES_EXHAUSTED, INST_ANGLE
 from precomp.connections import ITEMS
 import utils
@@ -136,7 +136,7 @@ def res_make_catwalk(vmf: VMF, res: Property):
         * `single_wall`: A section connecting to an East wall.
     """
     LOGGER.info("Starting catwalk generator...")
-    marker = instanceLocs.resolve(res['markerInst'])
+    marker = instanceLocs.resolve_filter(res['markerInst'])
 
     instances = {
         name: instanceLocs.resolve_one(res[name, ''], error=True)
@@ -237,19 +237,19 @@ def res_make_catwalk(vmf: VMF, res: Property):
         normal = Vec(0, 0, 1).rotate_by_str(inst['angles'])
 
         new_type, inst['angles'] = utils.CONN_LOOKUP[dir_mask.as_tuple()]
-        inst['file'] = instances[CATWALK_TYPES[new_type]]
+        instance_index.set_file(inst, instances[CATWALK_TYPES[new_type]])
 
         if new_type is utils.CONN_TYPES.side:
             # If the end piece is pointing at a wall, switch the instance.
             if normal.z == 0:
                 if normal == dir_mask.conn_dir():
-                    inst['file'] = instances['end_wall']
+                    instance_index.set_file(inst, instances['end_wall'])
             continue  # We never have normal supports on end pieces
         elif new_type is utils.CONN_TYPES.none:
             # Unconnected catwalks on the wall switch to a special instance.
             # This lets players stand next to a portal surface on the wall.
             if normal.z == 0:
-                inst['file'] = instances['single_wall']
+                instance_index.set_file(inst, instances['single_wall'])
                 inst['angles'] = INST_ANGLE[normal.as_tuple()]
             else:
                 inst.remove()
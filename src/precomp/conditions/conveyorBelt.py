@@ -52,7 +52,7 @@ def res_conveyor_belt(vmf: VMF, inst: Entity, res: Property) -> None:
 
     track_speed = res['speed', None]
 
-    start_pos = Vec.from_str(inst['origin'])
+    start_pos = conditions.get_cache(inst).origin()
     end_pos = start_pos + move_dist * move_dir
 
     if start_offset > 0:
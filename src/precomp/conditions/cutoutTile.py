@@ -80,7 +80,7 @@ def res_cutout_tile(vmf: srctools.VMF, res: Property):
             (This allows customising the surfaceprop.)
 
     """
-    marker_filenames = instanceLocs.resolve(res['markeritem'])
+    marker_filenames = instanceLocs.resolve_filter(res['markeritem'])
 
     x: float
     y: float
@@ -177,7 +177,7 @@ def res_cutout_tile(vmf: srctools.VMF, res: Property):
             io_list = CEIL_IO
 
         # Reuse orient to calculate where the solid face will be.
-        loc = Vec.from_str(inst['origin']) - 64 * normal
+        loc = conditions.get_cache(inst).origin() - 64 * normal
         INST_LOCS[targ] = loc
 
         item = connections.ITEMS[targ]
@@ -63,17 +63,16 @@ def res_insert_overlay(vmf: VMF, inst: Entity, res: Property) -> None:
     if temp_id[:1] == '$':
         temp_id = inst.fixup[temp_id]
 
-    origin = Vec.from_str(inst['origin'])  # type: Vec
-    angles = Vec.from_str(inst['angles', '0 0 0'])
+    cache = conditions.get_cache(inst)
+    origin = cache.origin()  # type: Vec
+    orient = cache.orient()
 
-    face_pos = Vec(face).rotate(*angles)
+    face_pos = round(Vec(face) @ orient, 6)
     face_pos += origin
-    normal = Vec(norm).rotate(*angles)
+    normal = round(Vec(norm) @ orient, 6)
 
     # Don't make offset change the face_pos value..
-    origin += offset.copy().rotate_by_str(
-        inst['angles', '0 0 0']
-    )
+    origin += round(offset @ orient, 6)
     
     for axis, norm in enumerate(normal):
         # Align to the center of the block grid. The normal direction is
@@ -98,7 +97,7 @@ def res_insert_overlay(vmf: VMF, inst: Entity, res: Property) -> None:
         vmf,
         temp_id,
         origin,
-        angles,
+        orient,
         targetname=inst['targetname', ''],
         force_type=TEMP_TYPES.detail,
     )
@@ -137,7 +136,7 @@ def res_create_entity(vmf: VMF, inst: Entity, res: Property):
     * `Origin` will be used to offset the given amount from the current location.
     """
 
-    origin = Vec.from_str(inst['origin'])
+    origin = conditions.get_cache(inst).origin()
 
     new_ent = vmf.create_ent(
         # Ensure there's a classname, just in case.
@@ -220,11 +219,12 @@ def res_water_splash(vmf: VMF, inst: Entity, res: Property) -> None:
         # Directly from the given value.
         pos2 = Vec.from_str(conditions.resolve_value(inst, pos2))
 
-    origin = Vec.from_str(inst['origin'])
-    angles = Vec.from_str(inst['angles'])
-    splash_pos.localise(origin, angles)
-    pos1.localise(origin, angles)
-    pos2.localise(origin, angles)
+    cache = conditions.get_cache(inst)
+    origin = cache.origin()
+    orient = cache.orient()
+    splash_pos.localise(origin, orient)
+    pos1.localise(origin, orient)
+    pos2.localise(origin, orient)
 
     # Since it's a straight line and you can't go through walls,
     # if pos1 and pos2 aren't in goo we aren't ever in goo.
@@ -299,7 +299,8 @@ def res_make_funnel_light(inst: Entity) -> None:
             need_blue = True
 
     loc = Vec(0, 0, -56)
-    loc.localise(Vec.from_str(inst['origin']), Vec.from_str(inst['angles']))
+    cache = conditions.get_cache(inst)
+    loc.localise(cache.origin(), cache.orient())
 
     if need_blue:
         inst.map.create_ent(
@@ -3,14 +3,14 @@
 """
 import operator
 
-from typing import Dict, Optional, Union
+from typing import Dict, Optional, Union, FrozenSet
 
 import srctools.logger
 from precomp.conditions import (
-    make_flag, make_result, make_result_setup,
+    make_flag, make_flag_setup, make_result, make_result_setup,
     ALL_INST,
 )
-from precomp import instance_traits, instanceLocs, conditions
+from precomp import instance_traits, instance_index, instanceLocs, conditions
 from srctools import Property, Vec, Entity, Output, VMF
 
 LOGGER = srctools.logger.get_logger(__name__, 'cond.instances')
@@ -18,10 +18,16 @@ LOGGER = srctools.logger.get_logger(__name__, 'cond.instances')
 COND_MOD_NAME = 'Instances'
 
 
+@make_flag_setup('instance')
+def flag_file_equal_setup(flag: Property) -> FrozenSet[str]:
+    """Resolve the instance selector once."""
+    return instanceLocs.resolve_filter(flag.value)
+
+
 @make_flag('instance')
 def flag_file_equal(inst: Entity, flag: Property):
     """Evaluates True if the instance matches the given file."""
-    return inst['file'].casefold() in instanceLocs.resolve(flag.value)
+    return inst['file'].casefold() in flag.value
 
 
 @make_flag('instFlag', 'InstPart')
@@ -33,7 +39,7 @@ def flag_file_cont(inst: Entity, flag: Property):
 @make_flag('hasInst')
 def flag_has_inst(flag: Property):
     """Checks if the given instance is present anywhere in the map."""
-    flags = instanceLocs.resolve(flag.value)
+    flags = instanceLocs.resolve_filter(flag.value)
     return any(
         inst.casefold() in flags
         for inst in
@@ -159,7 +165,7 @@ def flag_offset_distance(inst: Entity, flag: Property) -> bool:
     of the voxel.
     The value can be the distance for an exact check, '< x', '> $var', etc.
     """
-    origin = Vec.from_str(inst['origin'])
+    origin = conditions.get_cache(inst).origin()
     grid_pos = origin // 128 * 128 + 64
     offset = (origin - grid_pos).mag()
 
@@ -181,7 +187,7 @@ def flag_offset_distance(inst: Entity, flag: Property) -> bool:
 @make_result('rename', 'changeInstance')
 def res_change_instance(inst: Entity, res: Property):
     """Set the file to a value."""
-    inst['file'] = instanceLocs.resolve_one(res.value, error=True)
+    instance_index.set_file(inst, instanceLocs.resolve_one(res.value, error=True))
 
 
 @make_result('suffix', 'instSuffix')
@@ -296,7 +302,7 @@ def res_replace_instance(vmf: VMF, inst: Entity, res: Property):
     """
     import vbsp
 
-    origin = Vec.from_str(inst['origin'])
+    origin = conditions.get_cache(inst).origin()
     angles = inst['angles']
 
     if not srctools.conv_bool(res['keep_instance', '0'], False):
@@ -1,7 +1,7 @@
 """Handles generating Piston Platforms with specific logic."""
 from typing import Dict, List, Optional
 
-from precomp import packing, template_brush, conditions
+from precomp import packing, template_brush, conditions, instance_index
 import srctools.logger
 from consts import FixupVars
 from precomp.conditions import make_result, make_result_setup, local_name
@@ -129,7 +129,7 @@ def res_piston_plat(vmf: VMF, inst: Entity, res: Property) -> None:
             inst.fixup[FixupVars.PIST_TOP] = position
             static_inst = inst.copy()
             vmf.add_ent(static_inst)
-            static_inst['file'] = inst_filenames['fullstatic_' + str(position)]
+            instance_index.set_file(static_inst, inst_filenames['fullstatic_' + str(position)])
             return
 
     init_script = 'SPAWN_UP <- {}'.format('true' if start_up else 'false')
@@ -165,7 +165,7 @@ def res_piston_plat(vmf: VMF, inst: Entity, res: Property) -> None:
         Output('OnUser2', '!self', 'RunScriptCode', 'moveto({})'.format(end_pos)),
     )
 
-    origin = Vec.from_str(inst['origin'])
+    origin = conditions.get_cache(inst).origin()
     angles = Vec.from_str(inst['angles'])
     off = Vec(z=128).rotate(*angles)
     move_ang = off.to_angle()
@@ -181,12 +181,12 @@ def res_piston_plat(vmf: VMF, inst: Entity, res: Property) -> None:
 
         if pist_ind <= min_pos:
             # It's below the lowest position, so it can be static.
-            pist_ent['file'] = inst_filenames['static_' + str(pist_ind)]
+            instance_index.set_file(pist_ent, inst_filenames['static_' + str(pist_ind)])
             pist_ent['origin'] = brush_pos = origin + pist_ind * off
             temp_targ = static_ent
         else:
             # It's a moving component.
-            pist_ent['file'] = inst_filenames['dynamic_' + str(pist_ind)]
+            instance_index.set_file(pist_ent, inst_filenames['dynamic_' + str(pist_ind)])
             if pist_ind > max_pos:
                 # It's 'after' the highest position, so it never extends.
                 # So simplify by merging those all.
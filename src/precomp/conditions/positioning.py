@@ -1,9 +1,9 @@
 import math
-from typing import Tuple, Dict, Set
+from typing import Tuple, Dict, Set, NamedTuple, Optional
 
 from precomp.conditions import (
-    make_flag, make_result, resolve_offset,
-    DIRECTIONS,
+    make_flag, make_flag_setup, make_result, make_result_setup,
+    resolve_offset, get_cache, DIRECTIONS,
 )
 from precomp import tiling, brushLoc
 from srctools import (
@@ -42,8 +42,6 @@ def flag_angles(inst: Entity, flag: Property):
     - `Allow_inverse`: If true, this also returns True if the instance is
         pointed the opposite direction .
     """
-    angle = inst['angles', '0 0 0']
-
     if flag.has_children():
         targ_angle = flag['direction', '0 0 0']
         from_dir = flag['from_dir', '0 0 1']
@@ -62,7 +60,7 @@ def flag_angles(inst: Entity, flag: Property):
         return False  # If it's not a special angle,
         # so it failed the exact match
 
-    inst_normal = from_dir.rotate_by_str(angle)
+    inst_normal = round(from_dir @ get_cache(inst).orient(), 6)
 
     if normal == 'WALL':
         # Special case - it's not on the floor or ceiling
@@ -73,44 +71,75 @@ def flag_angles(inst: Entity, flag: Property):
         )
 
 
+class BrushLocConf(NamedTuple):
+    """The parsed options for brush_at_loc()."""
+    pos: Vec  # Relative to the floor-position of the brush.
+    pos2: Optional[Vec]
+    normal: Vec
+    grid_pos: bool
+    result_var: str
+    remove_tile: bool
+    # posIsSolid only.
+    mode: str = 'avg'
+    tile_pred: Optional[Set[tiling.TileType]] = None
+
+
+def parse_brush_loc(props: Property, result_var: str) -> BrushLocConf:
+    """Parse the options shared by posIsSolid and ReadSurfType."""
+    # Allow using pos1 instead, to match pos2.
+    pos = props.vec('pos1' if 'pos1' in props else 'pos')
+    pos.z -= 64  # Subtract so origin is the floor-position
+
+    if 'pos2' in props:
+        pos2 = props.vec('pos2')
+        pos2.z -= 64
+    else:
+        pos2 = None
+
+    return BrushLocConf(
+        pos,
+        pos2,
+        props.vec('dir', 0, 0, 1),
+        props.bool('gridpos'),
+        result_var,
+        # RemoveBrush is the pre-tiling name.
+        props.bool('RemoveTile', props.bool('RemoveBrush', False)),
+    )
+
+
 def brush_at_loc(
     inst: Entity,
-    props: Property,
+    conf: BrushLocConf,
 ) -> Tuple[tiling.TileType, bool, Set[tiling.TileType]]:
     """Common code for posIsSolid and ReadSurfType.
 
     This returns the average tiletype, if both colors were found,
     and a set of all types found.
     """
-    origin = Vec.from_str(inst['origin'])
-    angles = Angle.from_str(inst['angles'])
-
-    # Allow using pos1 instead, to match pos2.
-    pos = props.vec('pos1' if 'pos1' in props else 'pos')
-    pos.z -= 64  # Subtract so origin is the floor-position
+    cache = get_cache(inst)
+    origin = cache.origin()
+    orient = cache.orient()
 
-    pos.localise(origin, angles)
+    pos = conf.pos.copy()
+    pos.localise(origin, orient)
 
-    norm: Vec = round(props.vec('dir', 0, 0, 1) @ angles, 6)
+    norm: Vec = round(conf.normal @ orient, 6)
 
-    if props.bool('gridpos') and norm is not None:
+    if conf.grid_pos and norm is not None:
         for axis in 'xyz':
             # Don't realign things in the normal's axis -
             # those are already fine.
             if norm[axis] == 0:
                 pos[axis] = pos[axis] // 128 * 128 + 64
 
-    result_var = props['setVar', '']
-    # RemoveBrush is the pre-tiling name.
-    should_remove = props.bool('RemoveTile', props.bool('RemoveBrush', False))
+    should_remove = conf.remove_tile
 
     tile_types: Set[tiling.TileType] = set()
     both_colors = False
 
-    if 'pos2' in props:
-        pos2 = props.vec('pos2')
-        pos2.z -= 64  # Subtract so origin is the floor-position
-        pos2.localise(origin, angles)
+    if conf.pos2 is not None:
+        pos2 = conf.pos2.copy()
+        pos2.localise(origin, orient)
 
         bbox_min, bbox_max = Vec.bbox(round(pos, 6), round(pos2, 6))
 
@@ -153,18 +182,60 @@ def brush_at_loc(
                 tiledef[u, v] = tiling.TileType.VOID
         tile_types.add(tile_type)
 
-    if result_var:
+    if conf.result_var:
         if tile_type.is_tile:
             # Don't distinguish between 4x4, goo sides
-            inst.fixup[result_var] = tile_type.color.value
+            inst.fixup[conf.result_var] = tile_type.color.value
         elif tile_type is tiling.TileType.VOID:
-            inst.fixup[result_var] = 'none'
+            inst.fixup[conf.result_var] = 'none'
         else:
-            inst.fixup[result_var] = tile_type.name.casefold()
+            inst.fixup[conf.result_var] = tile_type.name.casefold()
 
     return tile_type, both_colors, tile_types
 
 
+@make_flag_setup('posIsSolid')
+def flag_brush_at_loc_setup(flag: Property) -> BrushLocConf:
+    """Parse the options for posIsSolid once."""
+    conf = parse_brush_loc(flag, flag['setVar', ''])
+
+    if conf.pos2 is None:  # Others are useless.
+        mode = 'avg'
+    else:
+        mode = flag['mode', 'avg'].casefold()
+
+    if mode in ('same', 'diff', 'different'):
+        # These don't need 'type', force the value so it can't error out.
+        des_type = 'any'
+    else:
+        des_type = flag['type', 'any'].casefold()
+
+    if des_type in ('same', 'diff', 'different'):
+        LOGGER.warning(
+            'Using type={} in posIsSolid is deprecated, put this in mode!',
+            des_type,
+        )
+        mode = des_type
+        des_type = 'any'
+
+    try:
+        tile_pred = TILE_PREDICATES[des_type]
+    except KeyError:
+        LOGGER.warning(
+            'Unknown tile type "{}" for posIsSolid command!',
+            des_type
+        )
+        tile_pred = None
+
+    if mode not in ('diff', 'different', 'same', 'and', 'or', 'avg'):
+        LOGGER.warning(
+            'Unknown check mode "{}" for posIsSolid command!',
+            mode,
+        )
+
+    return conf._replace(mode=mode, tile_pred=tile_pred)
+
+
 @make_flag('posIsSolid')
 def flag_brush_at_loc(inst: Entity, flag: Property):
     """Checks to see if a tile is present at the given location.
@@ -195,36 +266,12 @@ def flag_brush_at_loc(inst: Entity, flag: Property):
       the 128 grid (Useful with fizzler/light strip items).
     - `RemoveTile`: If set to `1`, the tile will be removed if found.
     """
-    avg_type, both_colors, tile_types = brush_at_loc(inst, flag)
-
-    if 'pos2' not in flag:  # Others are useless.
-        mode = 'avg'
-    else:
-        mode = flag['mode', 'avg'].casefold()
+    conf: BrushLocConf = flag.value
+    avg_type, both_colors, tile_types = brush_at_loc(inst, conf)
 
-    if mode in ('same', 'diff', 'different'):
-        # These don't need 'type', force the value so it can't error out.
-        des_type = 'any'
-    else:
-        des_type = flag['type', 'any'].casefold()
-
-    if des_type in ('same', 'diff', 'different'):
-        LOGGER.warning(
-            'Using type={} in posIsSolid is deprecated, put this in mode!',
-            des_type,
-        )
-        # Modify the properties, so it doesn't happen again.
-        mode = flag['mode'] = des_type
-        des_type = 'any'
-        del flag['type']
-
-    try:
-        tile_pred = TILE_PREDICATES[des_type]
-    except KeyError:
-        LOGGER.warning(
-            'Unknown tile type "{}" for posIsSolid command!',
-            des_type
-        )
+    mode = conf.mode
+    tile_pred = conf.tile_pred
+    if tile_pred is None:
         return False
 
     if mode in ('diff', 'different'):
@@ -237,10 +284,6 @@ def flag_brush_at_loc(inst: Entity, flag: Property):
         return any(tile in tile_pred for tile in tile_types)
     elif mode == 'avg':
         return avg_type in tile_pred
-
-    LOGGER.warning(
-        'Unknown check mode "{}" for posIsSolid command!'
-    )
     return False
 
 
@@ -291,6 +334,12 @@ _fill_predicates()
 del _fill_predicates
 
 
+@make_result_setup('ReadSurfType')
+def res_brush_at_loc_setup(res: Property) -> BrushLocConf:
+    """Parse the options for ReadSurfType once."""
+    return parse_brush_loc(res, res['resultVar'])
+
+
 @make_result('ReadSurfType')
 def res_brush_at_loc(inst: Entity, res: Property):
     """Read the type of surface at a particular location.
@@ -308,8 +357,7 @@ def res_brush_at_loc(inst: Entity, res: Property):
     - `RemoveTile`: If set to `1`, the tile will be removed if found.
     """
     # Alias PosIsSolid to also be a result, for using the variable mode by itself.
-    res['setVar'] = res['resultVar']
-    brush_at_loc(inst, res)
+    brush_at_loc(inst, res.value)
 
 
 @make_flag('PosIsGoo')
@@ -454,8 +502,9 @@ def res_calc_opposite_wall_dist(inst: Entity, res: Property):
         dist_off = 0
         collide_goo = adjust_goo = False
 
-    origin = Vec.from_str(inst['origin'])
-    normal = Vec(z=1).rotate_by_str(inst['angles'])
+    cache = get_cache(inst)
+    origin = cache.origin()
+    normal = round(Vec(z=1) @ cache.orient(), 6)
 
     mask = [
         brushLoc.Block.SOLID,
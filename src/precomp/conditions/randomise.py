@@ -246,6 +246,6 @@ def res_rand_inst_shift(inst: Entity, res: Property) -> None:
         random.uniform(min_z, max_z),
     ).rotate_by_str(inst['angles'])
 
-    origin = Vec.from_str(inst['origin'])
+    origin = conditions.get_cache(inst).origin()
     origin += offset
     inst['origin'] = origin
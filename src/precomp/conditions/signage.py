@@ -3,7 +3,7 @@ from typing import Tuple, Dict, Optional, Iterable, List
 from enum import Enum
 
 import srctools.logger
-from precomp import tiling, texturing, template_brush, conditions
+from precomp import tiling, texturing, template_brush, conditions, instance_index
 import consts
 from srctools import Property, Entity, VMF, Vec, NoKeyError
 from srctools.vmf import make_overlay, Side
@@ -122,7 +122,7 @@ def res_signage(vmf: VMF, inst: Entity, res: Property):
         inst.remove()
         return
 
-    origin = Vec.from_str(inst['origin'])
+    origin = conditions.get_cache(inst).origin()
     angles = Vec.from_str(inst['angles'])
 
     normal = Vec(z=-1).rotate(*angles)
@@ -147,10 +147,10 @@ def res_signage(vmf: VMF, inst: Entity, res: Property):
         sec_visgroup = 'secondary'
 
     if sign_prim and sign_sec:
-        inst['file'] = res['large_clip', '']
+        instance_index.set_file(inst, res['large_clip', ''])
         inst['origin'] = (prim_pos + sec_pos) / 2
     else:
-        inst['file'] = res['small_clip', '']
+        instance_index.set_file(inst, res['small_clip', ''])
         inst['origin'] = prim_pos if sign_prim else sec_pos
 
     brush_faces: List[Side] = []
@@ -5,7 +5,7 @@ import srctools.logger
 from precomp.conditions import (
     make_result, RES_EXHAUSTED,
 )
-from precomp import instanceLocs, conditions
+from precomp import instanceLocs, instance_index, conditions
 from srctools import Vec, Property, Entity, VMF
 
 
@@ -52,7 +52,7 @@ def res_track_plat(vmf: VMF, res: Property):
 
     # All the track_set in the map, indexed by origin
     track_instances = {
-        Vec.from_str(inst['origin']).as_tuple(): inst
+        conditions.get_cache(inst).origin().as_tuple(): inst
         for inst in
         vmf.by_class['func_instance']
         if inst['file'].casefold() in track_files
@@ -99,7 +99,7 @@ def res_track_plat(vmf: VMF, res: Property):
         if track_type == inst_single:
             # Track is one block long, use a single-only instance and
             # remove track!
-            plat_inst['file'] = single_plat_inst
+            instance_index.set_file(plat_inst, single_plat_inst)
             first_track.remove()
             continue  # Next platform
 
@@ -6,7 +6,7 @@ from typing import Dict, Tuple, List, Iterator, Optional, NamedTuple
 from srctools import Vec, Vec_tuple, Property, Entity, VMF, Solid, Matrix, Angle
 import srctools.logger
 
-from precomp import tiling, instanceLocs, connections, template_brush
+from precomp import tiling, instanceLocs, instance_index, connections, template_brush
 from precomp.brushLoc import POS as BLOCK_POS
 from precomp.conditions import (
     make_result, make_result_setup, RES_EXHAUSTED,
@@ -209,11 +209,11 @@ def vactube_gen(vmf: VMF) -> None:
         vmf.add_ent(start_logic)
 
         if start_normal.z > 0:
-            start_logic['file'] = start.conf.inst_entry_ceil
+            instance_index.set_file(start_logic, start.conf.inst_entry_ceil)
         elif start_normal.z < 0:
-            start_logic['file'] = start.conf.inst_entry_floor
+            instance_index.set_file(start_logic, start.conf.inst_entry_floor)
         else:
-            start_logic['file'] = start.conf.inst_entry_wall
+            instance_index.set_file(start_logic, start.conf.inst_entry_wall)
 
         end = start
 
@@ -238,7 +238,7 @@ def vactube_gen(vmf: VMF) -> None:
         if BLOCK_POS['world': end_loc].is_goo and end_norm.z < 0:
             end_logic = end.ent.copy()
             vmf.add_ent(end_logic)
-            end_logic['file'] = end.conf.inst_exit
+            instance_index.set_file(end_logic, end.conf.inst_exit)
 
 
 def push_trigger(vmf: VMF, loc: Vec, normal: Vec, solids: List[Solid]) -> None:
@@ -5,12 +5,13 @@ the outputs with optimisations and custom settings.
 """
 from enum import Enum
 from collections import defaultdict
+import time
 
 from connections import InputType, FeatureMode, Config, ConnType, OutNames
 from srctools import VMF, Entity, Output, Property, conv_bool, Vec
 from precomp.antlines import Antline, AntType
 from precomp import (
-    instance_traits, instanceLocs,
+    instance_traits, instance_index, instanceLocs,
     options,
     packing,
     conditions,
@@ -19,7 +20,9 @@ import editoritems
 import consts
 import srctools.logger
 
-from typing import Optional, Iterable, Dict, List, Set, Tuple, Iterator, Union
+from typing import (
+    Optional, Iterable, Dict, List, Set, Tuple, Iterator, Union, TextIO,
+)
 
 
 COND_MOD_NAME = "Item Connections"
@@ -423,6 +426,85 @@ def collapse_item(item: Item) -> None:
     item.inst.remove()
 
 
+class ConnectionGraph:
+    """A snapshot of the item connections, for debugging.
+
+    Each item is given an integer ID (its index in items), and connections
+    are stored as tuples of those IDs. This is only used to dump the map's
+    logic for inspection, the compile itself uses the Item/Connection
+    objects. Changes made to those afterward are not reflected.
+    """
+    __slots__ = ['items', 'ids', 'inputs', 'outputs', 'conn_types']
+
+    def __init__(self, items: Iterable[Item]) -> None:
+        # Sort so the IDs are consistent between compiles.
+        self.items = sorted(items, key=lambda item: item.name)  # type: List[Item]
+        self.ids = {
+            item.name: ind
+            for ind, item in enumerate(self.items)
+        }  # type: Dict[str, int]
+        # Item ID -> IDs of the items it triggers, or is triggered by.
+        self.outputs = []  # type: List[Tuple[int, ...]]
+        self.inputs = []  # type: List[Tuple[int, ...]]
+        # (from, to) -> connection type.
+        self.conn_types = {}  # type: Dict[Tuple[int, int], ConnType]
+
+        ids = self.ids
+        for ind, item in enumerate(self.items):
+            out_ids = []
+            for conn in item.outputs:
+                to_ind = ids[conn.to_item.name]
+                out_ids.append(to_ind)
+                self.conn_types[ind, to_ind] = conn.type
+            self.outputs.append(tuple(sorted(out_ids)))
+            self.inputs.append(tuple(sorted(
+                ids[conn.from_item.name]
+                for conn in item.inputs
+            )))
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def dump(self, file: TextIO) -> None:
+        """Write the graph in Graphviz DOT format."""
+        file.write('digraph connections {\n')
+        for ind, item in enumerate(self.items):
+            file.write('\tn{} [label="{}\\n{}"];\n'.format(
+                ind, _dot_escape(item.name), _dot_escape(item.config.id),
+            ))
+        for ind, out_ids in enumerate(self.outputs):
+            for out_ind in out_ids:
+                conn_type = self.conn_types[ind, out_ind]
+                if conn_type is ConnType.DEFAULT:
+                    file.write('\tn{} -> n{};\n'.format(ind, out_ind))
+                else:
+                    file.write('\tn{} -> n{} [label="{}"];\n'.format(
+                        ind, out_ind, CONN_NAMES[conn_type],
+                    ))
+        file.write('}\n')
+
+
+def _dot_escape(text: str) -> str:
+    """Escape text for use in a quoted DOT string."""
+    return text.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def build_graph() -> ConnectionGraph:
+    """Build a graph snapshot of the current items."""
+    return ConnectionGraph(ITEMS.values())
+
+
+def dump_graph(filename: str) -> None:
+    """Write the current connections to a DOT file."""
+    graph = build_graph()
+    with open(filename, 'w') as f:
+        graph.dump(f)
+    LOGGER.info(
+        'Connection graph with {} items and {} connections written to "{}".',
+        len(graph), len(graph.conn_types), filename,
+    )
+
+
 def read_configs(all_items: Iterable[editoritems.Item]) -> None:
     """Load our connection configuration from the config files."""
     for item in all_items:
@@ -456,6 +538,7 @@ def calc_connections(
     Instance Traits must have been calculated.
     It also applies frames to shape signage to distinguish repeats.
     """
+    start = time.perf_counter()
     # First we want to match targetnames to item types.
     toggles = {}  # type: Dict[str, Entity]
     # Accumulate all the signs into groups, so the list should be 2-long:
@@ -649,6 +732,11 @@ def calc_connections(
                     frame['material'] = frame_mat
                     frame['renderorder'] = 1  # On top
 
+    LOGGER.info(
+        'Calculated connections for {} items in {:.2f}s.',
+        len(ITEMS), time.perf_counter() - start,
+    )
+
 
 @conditions.make_result_setup('ChangeIOType')
 def res_change_io_type_parse(props: Property):
@@ -738,6 +826,7 @@ def gen_item_outputs(vmf: VMF) -> None:
     items may not have connections altered.
     """
     LOGGER.info('Generating item IO...')
+    start = time.perf_counter()
 
     pan_switching_check = options.get(PanelSwitchingStyle, 'ind_pan_check_switching')
     pan_switching_timer = options.get(PanelSwitchingStyle, 'ind_pan_timer_switching')
@@ -879,7 +968,7 @@ def gen_item_outputs(vmf: VMF) -> None:
         desired_panel_inst = panel_check if item.timer is None else panel_timer
 
         for pan in item.ind_panels:
-            pan['file'] = desired_panel_inst
+            instance_index.set_file(pan, desired_panel_inst)
             pan.fixup[consts.FixupVars.TIM_ENABLED] = item.timer is not None
 
     logic_auto = vmf.create_ent(
@@ -897,7 +986,7 @@ def gen_item_outputs(vmf: VMF) -> None:
                 logic_auto.add_out(out)
                 out.only_once = True
 
-    LOGGER.info('Item IO generated.')
+    LOGGER.info('Item IO generated in {:.2f}s.', time.perf_counter() - start)
 
 
 def add_locking(item: Item) -> None:
@@ -10,7 +10,7 @@ from typing import (
     Dict, List, Set, FrozenSet, Iterable, MutableMapping
 )
 
-from precomp import brushLoc, options, packing, conditions
+from precomp import brushLoc, options, packing, conditions, instance_index
 from precomp.conditions import meta_cond, make_result, make_flag, RES_EXHAUSTED
 from precomp.conditions.globals import precache_model
 from precomp.instanceLocs import resolve as resolve_inst
@@ -1137,7 +1137,7 @@ def link_cubes(vmf: VMF):
     # Cube items.
     cubes = []  # type: List[Tuple[Entity, CubeType]]
 
-    for inst in vmf.by_class['func_instance']:
+    for inst in instance_index.by_file(inst_to_type):
         try:
             inst_type = inst_to_type[inst['file'].casefold()]
         except KeyError:
@@ -1264,7 +1264,7 @@ def link_cubes(vmf: VMF):
 
     LOGGER.info('SPLAT File: {}', splat_inst)
 
-    for inst in vmf.by_class['func_instance']:
+    for inst in instance_index.by_file([*colorizer_inst, *splat_inst]):
         file = inst['file'].casefold()
 
         if file in colorizer_inst:
@@ -12,7 +12,7 @@ import srctools.vmf
 from srctools.vmf import VMF, Solid, Entity, Side, Output
 from srctools import Property, NoKeyError, Vec, Matrix, Angle
 from precomp import (
-    instance_traits, tiling, instanceLocs,
+    instance_traits, instance_index, tiling, instanceLocs,
     texturing,
     connections,
     options,
@@ -965,11 +965,8 @@ def parse_map(vmf: VMF, voice_attrs: Dict[str, bool]) -> None:
     fizz_pos = {}  # type: Dict[Tuple[Tuple[float, float, float], Tuple[float, float, float]], str]
 
     # First use traits to gather up all the instances.
-    for inst in vmf.by_class['func_instance']:
+    for inst in instance_index.by_trait('fizzler'):
         traits = instance_traits.get(inst)
-        if 'fizzler' not in traits:
-            continue
-
         name = inst['targetname']
 
         if 'fizzler_model' in traits:
@@ -1058,15 +1055,12 @@ def parse_map(vmf: VMF, voice_attrs: Dict[str, bool]) -> None:
             brush.remove()
 
     # Check for fizzler output relays.
-    relay_file = instanceLocs.resolve('<ITEM_BEE2_FIZZLER_OUT_RELAY>', silent=True)
+    relay_file = instanceLocs.resolve_filter('<ITEM_BEE2_FIZZLER_OUT_RELAY>', silent=True)
     if not relay_file:
         # No relay item - deactivated most likely.
         return
 
-    for inst in vmf.by_class['func_instance']:
-        if inst['file'].casefold() not in relay_file:
-            continue
-
+    for inst in instance_index.by_file(relay_file):
         inst.remove()
 
         relay_item = connections.ITEMS[inst['targetname']]
@@ -1141,7 +1135,7 @@ def generate_fizzlers(vmf: VMF):
 
         if fizz_type.inst[FizzInst.BASE, is_static]:
             random.seed('{}_fizz_base_{}'.format(MAP_RAND_SEED, fizz_name))
-            fizz.base_inst['file'] = random.choice(fizz_type.inst[FizzInst.BASE, is_static])
+            instance_index.set_file(fizz.base_inst, random.choice(fizz_type.inst[FizzInst.BASE, is_static]))
 
         if not fizz.emitters:
             LOGGER.warning('No emitters for fizzler "{}"!', fizz_name)
@@ -6,14 +6,13 @@ multiple styles.
 import logging
 import re
 from collections import defaultdict
-from functools import lru_cache
 
 import editoritems
 import srctools.logger
 
 from typing import (
-    Optional, Union,
-    List, Dict, Tuple, TypeVar, Iterable,
+    Optional, Union, NamedTuple,
+    List, Dict, Tuple, TypeVar, Iterable, FrozenSet,
 )
 
 LOGGER = srctools.logger.get_logger(__name__)
@@ -25,6 +24,21 @@ INSTANCE_FILES: Dict[str, List[str]] = {}
 # Note this is imperfect - two items could reuse the same instance.
 ITEM_FOR_FILE: Dict[str, Tuple[str, Union[int, str]]] = {}
 
+# Resolved selectors are constant once loaded, so they're cached forever.
+# Selector -> list of instances, and the same as a set for membership tests.
+_RESOLVE_CACHE: Dict[str, List[str]] = {}
+_RESOLVE_SET_CACHE: Dict[str, FrozenSet[str]] = {}
+
+
+class CacheInfo(NamedTuple):
+    """Statistics for the resolve() cache."""
+    hits: int
+    misses: int
+    currsize: int
+
+_cache_hits = 0
+_cache_misses = 0
+
 _RE_DEFS = re.compile(r'\s* ((?: \[ [^][]+ \] ) | (?: < [^<>]+ > )) \s* ,? \s*', re.VERBOSE)
 _RE_SUBITEMS = re.compile(r'''
     \s*<
@@ -218,6 +232,7 @@ SPECIAL_INST_FOLDED = {
 
 def load_conf(items: Iterable[editoritems.Item]) -> None:
     """Read the config and build our dictionaries."""
+    cache_clear()
     for item in items:
         # Extra definitions: key -> filename.
         # Make sure to do this first, so numbered instances are set in
@@ -267,16 +282,60 @@ def resolve(path: str, silent: bool=False) -> List[str]:
     If silent is True, no error messages will be output (for use with hardcoded
     names).
     """
+    global _cache_hits, _cache_misses
+    try:
+        result = _RESOLVE_CACHE[path]
+    except KeyError:
+        pass
+    else:
+        _cache_hits += 1
+        return result
+
+    _cache_misses += 1
     if silent:
         # Ignore messages < ERROR (warning and info)
         log_level = LOGGER.level
         LOGGER.setLevel(logging.ERROR)
         try:
-            return _resolve(path)
+            result = _resolve(path)
         finally:
             LOGGER.setLevel(log_level)
     else:
-        return _resolve(path)
+        result = _resolve(path)
+
+    _RESOLVE_CACHE[path] = result
+    _RESOLVE_SET_CACHE[path] = frozenset(result)
+    return result
+
+
+def resolve_filter(path: str, silent: bool=False) -> FrozenSet[str]:
+    """Resolve an instance path into a set of the instances it refers to.
+
+    This is the same as resolve(), but is faster for checking if an instance
+    matches.
+    """
+    global _cache_hits
+    try:
+        result = _RESOLVE_SET_CACHE[path]
+    except KeyError:
+        resolve(path, silent)
+        return _RESOLVE_SET_CACHE[path]
+    else:
+        _cache_hits += 1
+        return result
+
+
+def cache_info() -> CacheInfo:
+    """Return statistics about the resolve() cache."""
+    return CacheInfo(_cache_hits, _cache_misses, len(_RESOLVE_CACHE))
+
+
+def cache_clear() -> None:
+    """Discard all resolved selectors."""
+    global _cache_hits, _cache_misses
+    _RESOLVE_CACHE.clear()
+    _RESOLVE_SET_CACHE.clear()
+    _cache_hits = _cache_misses = 0
 
 Default_T = TypeVar('Default_T')
 
@@ -300,8 +359,6 @@ def resolve_one(path, default: Default_T='', error=False) -> Union[str, Default_
     return instances[0]
 
 
-# Cache the return values, since they're constant.
-@lru_cache(maxsize=256)
 def _resolve(path: str) -> List[str]:
     """Use a secondary function to allow caching values, while ignoring the
     'silent' parameter.
@@ -407,11 +464,6 @@ def get_subitems(comma_list, item_inst, item_id) -> List[str]:
     return inst_out
 
 
-# Copy over the lru_cache() functions to make them easily acessable.
-resolve.cache_info = _resolve.cache_info
-resolve.cache_clear = _resolve.cache_clear
-
-
 def get_cust_inst(item_id: str, inst: str) -> Optional[str]:
     """Get the filename used for a custom instance defined in editoritems.
 
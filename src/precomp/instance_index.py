@@ -0,0 +1,255 @@
+"""Indexes the instances in the map, so they don't need to be scanned repeatedly.
+
+The index is built once right after the map is loaded. Instances can then be
+looked up by file or trait, instead of each stage looping over every
+instance and re-parsing its keyvalues.
+
+Instances added to or removed from the map are detected automatically, by
+replacing the map's set of instances with one that records changes to it.
+Results are checked against the instance's current file, so a changed
+instance is never returned under the old value. Use set_file() to change
+the file, so the instance can be found under the new one.
+
+Results are always returned in a consistent order, since the map seed is
+built from some of them.
+"""
+from collections import defaultdict
+
+from srctools import VMF, Entity
+from precomp.instanceLocs import ITEM_FOR_FILE
+import srctools.logger
+
+from typing import (
+    Optional, Union, Iterable, Iterator,
+    Dict, Set, List, Tuple, FrozenSet, Any,
+)
+
+
+LOGGER = srctools.logger.get_logger(__name__)
+
+
+class _Record:
+    """The values an instance was indexed with."""
+    __slots__ = ['file', 'item', 'traits']
+
+    def __init__(self, inst: Entity) -> None:
+        self.file = inst['file'].casefold()
+        self.item: Optional[Tuple[str, Union[int, str]]] = ITEM_FOR_FILE.get(self.file)
+        self.traits: FrozenSet[str] = frozenset()
+
+    def matches(self, inst: Entity) -> bool:
+        """Check if the instance still has the indexed file."""
+        return inst['file'].casefold() == self.file
+
+
+class _TrackedSet(set):
+    """Replaces vmf.by_class['func_instance'], to record changes made to it."""
+    def add(self, inst: Entity) -> None:
+        """Add an instance, and record that it changed."""
+        super().add(inst)
+        _CHANGED[inst] = None
+
+    def discard(self, inst: Entity) -> None:
+        """Remove an instance if present, and record that it changed."""
+        super().discard(inst)
+        _CHANGED[inst] = None
+
+    def remove(self, inst: Entity) -> None:
+        """Remove an instance, and record that it changed."""
+        super().remove(inst)
+        _CHANGED[inst] = None
+
+
+def _rescan_after(name: str) -> Any:
+    """Wrap a set method, so using it causes the whole map to be checked again."""
+    method = getattr(set, name)
+
+    def func(self: _TrackedSet, *args: Any) -> Any:
+        global _NEEDS_RESCAN
+        _NEEDS_RESCAN = True
+        return method(self, *args)
+    func.__name__ = name
+    func.__doc__ = method.__doc__
+    return func
+
+# Other ways to change the set are unlikely, so just check everything.
+for _name in [
+    'pop', 'clear', 'update',
+    'difference_update', 'intersection_update', 'symmetric_difference_update',
+    '__ior__', '__iand__', '__isub__', '__ixor__',
+]:
+    setattr(_TrackedSet, _name, _rescan_after(_name))
+del _name
+
+
+_VMF: Optional[VMF] = None
+# The set we placed in the map, if it's been replaced we need to rescan.
+_TRACKED: Optional[_TrackedSet] = None
+# Instances which may have been added or removed since the last query.
+# Dicts are used instead of sets here, to keep the order consistent.
+_CHANGED: Dict[Entity, None] = {}
+# Set if the instances were changed in a way which wasn't recorded.
+_NEEDS_RESCAN = False
+
+_RECORDS: Dict[Entity, _Record] = {}
+_BY_FILE: Dict[str, Dict[Entity, None]] = defaultdict(dict)
+_BY_TRAIT: Dict[str, Dict[Entity, None]] = defaultdict(dict)
+
+
+def _add(inst: Entity) -> None:
+    """Index an instance."""
+    rec = _RECORDS[inst] = _Record(inst)
+    _BY_FILE[rec.file][inst] = None
+
+
+def _discard(inst: Entity) -> None:
+    """Remove an instance from the index."""
+    rec = _RECORDS.pop(inst, None)
+    if rec is None:
+        return
+    _BY_FILE[rec.file].pop(inst, None)
+    for trait in rec.traits:
+        _BY_TRAIT[trait].pop(inst, None)
+
+
+def build(vmf: VMF) -> None:
+    """Index all the instances in the map."""
+    global _VMF, _TRACKED, _NEEDS_RESCAN
+    _VMF = vmf
+    for mapping in [_RECORDS, _BY_FILE, _BY_TRAIT, _CHANGED]:
+        mapping.clear()
+    _NEEDS_RESCAN = False
+    _TRACKED = vmf.by_class['func_instance'] = _TrackedSet(vmf.by_class['func_instance'])
+    # Use the order in the map, not the set.
+    for inst in vmf.entities:
+        if inst in _TRACKED:
+            _add(inst)
+    LOGGER.info(
+        'Indexed {} instances using {} files.',
+        len(_RECORDS), len(_BY_FILE),
+    )
+
+
+def _rescan() -> None:
+    """Compare the index to every instance in the map."""
+    global _TRACKED, _NEEDS_RESCAN
+    assert _VMF is not None
+    current = _VMF.by_class['func_instance']
+    if current is not _TRACKED:
+        _TRACKED = _VMF.by_class['func_instance'] = _TrackedSet(current)
+    for inst in list(_RECORDS):
+        if inst not in _TRACKED:
+            _discard(inst)
+    for inst in _VMF.entities:
+        if inst in _TRACKED and inst not in _RECORDS:
+            _add(inst)
+    _CHANGED.clear()
+    _NEEDS_RESCAN = False
+
+
+def _sync() -> None:
+    """Pick up any instances added or removed since the last query."""
+    if _VMF is None:
+        raise ValueError('Instances have not been indexed!')
+    if _NEEDS_RESCAN or _VMF.by_class['func_instance'] is not _TRACKED:
+        _rescan()
+        return
+    if not _CHANGED:
+        return
+    changed = list(_CHANGED)
+    _CHANGED.clear()
+    for inst in changed:
+        if inst in _TRACKED:
+            if inst not in _RECORDS:
+                _add(inst)
+        else:
+            _discard(inst)
+
+
+def update(inst: Entity) -> None:
+    """Re-index an instance, after its file was changed."""
+    if _VMF is None:
+        raise ValueError('Instances have not been indexed!')
+    try:
+        traits = _RECORDS[inst].traits
+    except KeyError:
+        traits = frozenset()
+    _discard(inst)
+    if inst in _VMF.by_class['func_instance']:
+        _add(inst)
+        index_traits(inst, traits)
+
+
+def set_file(inst: Entity, filename: str) -> None:
+    """Change the file an instance uses, and re-index it.
+
+    The instance doesn't need to have been added to the map yet.
+    """
+    inst['file'] = filename
+    if _VMF is not None:
+        update(inst)
+
+
+def _check(found: Iterable[Entity]) -> List[Entity]:
+    """Return the instances which still match their records.
+
+    Those which don't are re-indexed.
+    """
+    result = []
+    changed = []
+    for inst in found:
+        if _RECORDS[inst].matches(inst):
+            result.append(inst)
+        else:
+            changed.append(inst)
+    for inst in changed:
+        update(inst)
+    return result
+
+
+def index_traits(inst: Entity, traits: Iterable[str]) -> None:
+    """Index the traits for an instance."""
+    rec = _RECORDS[inst]
+    for trait in rec.traits:
+        _BY_TRAIT[trait].pop(inst, None)
+    rec.traits = frozenset(traits)
+    for trait in rec.traits:
+        _BY_TRAIT[trait][inst] = None
+
+
+def instances() -> Iterator[Tuple[Entity, str, Optional[Tuple[str, Union[int, str]]]]]:
+    """Yield every instance, with the casefolded file and item it is part of."""
+    _sync()
+    for inst, rec in list(_RECORDS.items()):
+        yield inst, rec.file, rec.item
+
+
+def files() -> Set[str]:
+    """Return the casefolded filenames of all the instances in the map."""
+    _sync()
+    return {file for file, insts in _BY_FILE.items() if insts}
+
+
+def by_file(filenames: Union[str, Iterable[str]]) -> List[Entity]:
+    """Return all instances using any of these (casefolded) files.
+
+    This accepts the results of instanceLocs.resolve_filter() directly.
+    """
+    _sync()
+    if isinstance(filenames, str):
+        filenames = [filenames]
+    found: List[Entity] = []
+    # Sets of filenames have no consistent order, so sort them.
+    for file in sorted(filenames):
+        found.extend(_BY_FILE.get(file, ()))
+    return _check(found)
+
+
+def by_trait(trait: str) -> List[Entity]:
+    """Return all instances which had this trait when index_traits() was called."""
+    _sync()
+    return [
+        inst for inst in _BY_TRAIT.get(trait, ())
+        if trait in getattr(inst, 'traits', ())
+    ]
+
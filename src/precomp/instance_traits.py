@@ -2,7 +2,7 @@
 from srctools import Entity
 from srctools import VMF
 import srctools.logger
-from precomp.instanceLocs import ITEM_FOR_FILE
+from precomp import instance_index
 from editoritems import Item, ItemClass
 
 from typing import Optional, Callable, Dict, Set, List
@@ -182,16 +182,17 @@ def get_item_id(inst: Entity) -> Optional[str]:
 
 
 def set_traits(vmf: VMF, id_to_item: Dict[str, Item]) -> None:
-    """Scan through the map, and apply traits to instances."""
-    for inst in vmf.by_class['func_instance']:
-        inst_file = inst['file'].casefold()
+    """Scan through the map, and apply traits to instances.
+
+    The instances must have been indexed first.
+    """
+    for inst, inst_file, item in instance_index.instances():
         if not inst_file:
             continue
-        try:
-            item_id, item_ind = ITEM_FOR_FILE[inst_file]
-        except KeyError:
+        if item is None:
             LOGGER.warning('Unknown instance "{}"!', inst['file'])
             continue
+        item_id, item_ind = item
 
         # BEE2_xxx special instance, shouldn't be in the original map...
         if isinstance(item_ind, str):
@@ -228,3 +229,4 @@ def set_traits(vmf: VMF, id_to_item: Dict[str, Item]) -> None:
             pass
         else:
             func(inst, traits, item_id, item_ind)
+        instance_index.index_traits(inst, traits)
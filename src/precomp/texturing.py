@@ -628,13 +628,35 @@ def load_config(conf: Property):
     OVERLAYS = GENERATORS[GenCat.OVERLAYS]
 
 
-def setup(game: Game, vmf: VMF, global_seed: str, tiles: List['TileDef']) -> None:
+def _gen_key_str(gen_key: Union[GenCat, Tuple[GenCat, Orient, Portalable]]) -> Union[GenCat, str]:
+    """Compute a unique string for randomisation."""
+    if isinstance(gen_key, tuple):
+        gen_cat, gen_orient, gen_portal = gen_key
+        return '{}.{}.{}'.format(
+            gen_cat.value,
+            gen_portal.value,
+            gen_orient,
+        )
+    else:
+        return gen_key
+
+
+def setup(game: Optional[Game], vmf: VMF, global_seed: str, tiles: List['TileDef']) -> None:
     """Do various setup steps, needed for generating textures.
 
     - Set randomisation seed on all the generators.
     - Build clumps.
     - Generate antigel materials
+
+    If the game is not provided, antigel materials are not generated.
     """
+    if game is None:
+        LOGGER.warning('No game provided, antigel materials will not be generated!')
+        for gen_key, generator in GENERATORS.items():
+            generator.map_seed = '{}_tex_{}_'.format(global_seed, _gen_key_str(gen_key))
+            generator.setup(vmf, global_seed, tiles)
+        return
+
     material_folder = game.path / '../bee2/materials/'
     antigel_loc = material_folder / ANTIGEL_PATH
     antigel_loc.mkdir(parents=True, exist_ok=True)
@@ -667,20 +689,8 @@ def setup(game: Game, vmf: VMF, global_seed: str, tiles: List['TileDef']) -> Non
         tex_to_antigel[texture.casefold()] = mat_name
         antigel_mats.add(vmt_file.stem)
 
-    gen_key_str: Union[GenCat, str]
     for gen_key, generator in GENERATORS.items():
-        # Compute a unique string for randomisation
-        if isinstance(gen_key, tuple):
-            gen_cat, gen_orient, gen_portal = gen_key
-            gen_key_str = '{}.{}.{}'.format(
-                gen_cat.value,
-                gen_portal.value,
-                gen_orient,
-            )
-        else:
-            gen_key_str = gen_key
-
-        generator.map_seed = '{}_tex_{}_'.format(global_seed, gen_key_str)
+        generator.map_seed = '{}_tex_{}_'.format(global_seed, _gen_key_str(gen_key))
         generator.setup(vmf, global_seed, tiles)
 
         # No need to convert if it's overlay, or it's bullseye and those
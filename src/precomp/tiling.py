@@ -31,6 +31,7 @@ from precomp.texturing import TileSize, Portalable
 from . import (
     grid_optim,
     instanceLocs,
+    instance_index,
     texturing,
     options,
     antlines,
@@ -1695,12 +1696,12 @@ def analyse_map(vmf_file: VMF, side_to_ant_seg: Dict[int, List[
 
     # Look for Angled and Flip Panels, to link the tiledef to the instance.
     # First grab the instances.
-    panel_fname = instanceLocs.resolve('<ITEM_PANEL_ANGLED>, <ITEM_PANEL_FLIP>')
+    panel_fname = instanceLocs.resolve_filter('<ITEM_PANEL_ANGLED>, <ITEM_PANEL_FLIP>')
     # Also find PeTI-placed placement helpers, and move them into the tiledefs.
-    placement_helper_file = instanceLocs.resolve('<ITEM_PLACEMENT_HELPER>')
+    placement_helper_file = instanceLocs.resolve_filter('<ITEM_PLACEMENT_HELPER>')
 
     panels: Dict[str, Entity] = {}
-    for inst in vmf_file.by_class['func_instance']:
+    for inst in instance_index.by_file(panel_fname | placement_helper_file):
         filename = inst['file'].casefold()
         if filename in panel_fname:
             panels[inst['targetname']] = inst
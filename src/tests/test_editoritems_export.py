@@ -0,0 +1,94 @@
+"""Check Item.export() produces exactly the same output as writing directly."""
+import io
+from typing import IO, Iterable, Mapping
+
+from editoritems import Item, Renderable, RenderableType
+
+
+ITEM_TEMPLATE = '''\
+"Item"
+    {
+    "Type" "ITEM_TEST_%d"
+    "ItemClass" "ItemButtonFloor"
+    "Editor"
+        {
+        "SubType"
+            {
+            "Name" "Test Item %d"
+            "Model"
+                {
+                "ModelName" "buttonweight.3ds"
+                }
+            "Palette"
+                {
+                "Tooltip" "TEST ITEM %d"
+                "Image" "palette/bee2/test_%d.png"
+                "Position" "%d 0 0"
+                }
+            "Sounds"
+                {
+                "SOUND_CREATED" "P2Editor.PlaceButton"
+                }
+            "Animations"
+                {
+                "ANIM_IDLE" "0"
+                "ANIM_EDITING_ACTIVATE" "1"
+                }
+            }
+        "MovementHandle" "HANDLE_4_DIRECTIONS"
+        }
+    }
+'''
+
+RENDERABLES = '''\
+"Renderables"
+    {
+    "Item"
+        {
+        "Type" "ErrorState"
+        "Model" "error_state.mdl"
+        "Animations"
+            {
+            "ANIM_IDLE" "0"
+            }
+        }
+    }
+'''
+
+
+def old_export(
+    f: IO[str],
+    items: Iterable[Item],
+    renderables: Mapping[RenderableType, Renderable],
+) -> None:
+    """The original implementation of Item.export(), writing each piece directly."""
+    f.write('"ItemData"\n{\n')
+    for item in items:
+        item.export_one(f)
+    if renderables:
+        f.write('\n\n"Renderables"\n\t{\n')
+        for rend_type, rend in renderables.items():
+            f.write('\t"Item"\n\t\t{\n')
+            f.write(f'\t\t"Type"  "{rend_type.value}"\n')
+            f.write(f'\t\t"Model" "{rend.model}"\n')
+            f.write('\t\t"Animations"\n\t\t\t{\n')
+            for anim, ind in rend.animations.items():
+                f.write(f'\t\t\t"{anim.value}" "{ind}"\n')
+            f.write('\t\t\t}\n\t\t}\n')
+        f.write('\t}\n')
+    f.write('}\n')
+
+
+def test_editoritems_identical() -> None:
+    """Item.export() must match writing each piece to the file."""
+    text = ''.join(ITEM_TEMPLATE % ((i, ) * 5) for i in range(2000)) + RENDERABLES
+    items, renderables = Item.parse(text.splitlines(keepends=True))
+    assert len(items) == 2000
+
+    old_file = io.StringIO()
+    old_export(old_file, items, renderables)
+    new_file = io.StringIO()
+    Item.export(new_file, items, renderables)
+
+    assert new_file.getvalue().encode('utf8') == old_file.getvalue().encode('utf8')
+
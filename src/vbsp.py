@@ -9,19 +9,23 @@ import sys
 import shutil
 import random
 import logging
+import time
 import pickle
-from io import StringIO
+import json
+import re
 from collections import defaultdict, namedtuple, Counter
 
 from srctools import Property, Vec, AtomicWriter, Vec_tuple, Angle
 from srctools.vmf import VMF, Entity, Output
 from srctools.game import Game
 from BEE2_config import ConfigFile
+import compile_stats
 import utils
 import srctools.run
 import srctools.logger
 from precomp import (
     instance_traits,
+    instance_index,
     brushLoc,
     bottomlessPit,
     instanceLocs,
@@ -43,7 +47,7 @@ from precomp import (
 import consts
 import editoritems
 
-from typing import Any, Dict, Tuple, List, Set, Iterable
+from typing import Any, Dict, Tuple, List, Set, Iterable, Optional
 
 
 COND_MOD_NAME = 'VBSP'
@@ -82,6 +86,9 @@ BLACK_PAN = [
 
 BEE2_config = ConfigFile('compile.cfg')
 
+# The duration of each stage of the compile, recorded in the compile history.
+STAGE_TIMES = {}  # type: Dict[str, float]
+
 GAME_MODE = 'ERR'  # SP or COOP?
 # Are we in preview mode? (Spawn in entry door instead of elevator)
 IS_PREVIEW = 'ERR'  # type: bool
@@ -97,6 +104,10 @@ IGNORED_OVERLAYS = set()
 
 PRESET_CLUMPS = []  # Additional clumps set by conditions, for certain areas.
 
+# If the compile server loaded settings ahead of time, the result of
+# load_settings().
+PRELOADED_SETTINGS = None  # type: Optional[Tuple[antlines.AntType, antlines.AntType, Dict[str, editoritems.Item]]]
+
 
 def load_settings() -> Tuple[antlines.AntType, antlines.AntType, Dict[str, editoritems.Item]]:
     """Load in all our settings from vbsp_config."""
@@ -223,6 +234,17 @@ def load_settings() -> Tuple[antlines.AntType, antlines.AntType, Dict[str, edito
     return ant_floor, ant_wall, id_to_item
 
 
+def preload_settings() -> None:
+    """Load settings before any map is compiled, for the compile server.
+
+    Each compile is done in a forked copy of the server, so this data is
+    never modified by previous maps.
+    """
+    global PRELOADED_SETTINGS
+    conditions.import_conditions()
+    PRELOADED_SETTINGS = load_settings()
+
+
 def load_map(map_path: str) -> VMF:
     """Load in the VMF file."""
     with open(map_path) as file:
@@ -824,8 +846,6 @@ def get_map_info(vmf: VMF) -> Set[str]:
     """
     global GAME_MODE, IS_PREVIEW
 
-    inst_files = set()  # Get a set of every instance in the map.
-
     file_coop_entry = instanceLocs.get_special_inst('coopEntry')
     file_coop_exit = instanceLocs.get_special_inst('coopExit')
     file_sp_exit = instanceLocs.get_special_inst('spExit')
@@ -867,17 +887,28 @@ def get_map_info(vmf: VMF) -> Set[str]:
     # The door frame instances
     entry_door_frame = exit_door_frame = None
 
-    for item in vmf.by_class['func_instance']:
-        # Loop through all the instances in the map, looking for the entry/exit
-        # doors.
+    special_files = set()
+    for special in [
+        file_coop_entry, file_coop_exit,
+        file_sp_entry, file_sp_exit,
+    ]:
+        if special:
+            special_files.add(special)
+    for specials in [
+        file_coop_corr, file_sp_entry_corr, file_sp_exit_corr,
+        file_sp_door_frame, file_coop_door_frame,
+    ]:
+        if specials:
+            special_files.update(specials)
+
+    for item in instance_index.by_file(special_files):
+        # Loop through all the entry/exit doors in the map.
         # - Read the $no_player_start var to see if we're in preview mode,
         #   or override the value if specified in compile.cfg
         # - Determine whether the map is SP or Coop by the
         #   presence of certain instances.
         # - Switch the entry/exit corridors to particular ones if specified
         #   in compile.cfg
-        # Also build a set of all instances, to make a condition check easy
-        # later
 
         file = item['file'].casefold()
         LOGGER.debug('File: "{}"', file)
@@ -956,7 +987,9 @@ def get_map_info(vmf: VMF) -> Set[str]:
             # The coop frame must be the exit door...
             exit_door_frame = item
 
-        inst_files.add(item['file'])
+    # Get a set of every instance in the map, to make a condition check easy
+    # later.
+    inst_files = instance_index.files()
 
     LOGGER.info("Game Mode: " + GAME_MODE)
     LOGGER.info("Is Preview: " + str(IS_PREVIEW))
@@ -1054,7 +1087,7 @@ def mod_entryexit(
             'Using upward variant for {}',
             pretty_name,
         )
-        inst['file'] = vert_up
+        instance_index.set_file(inst, vert_up)
         return 'vert_up'
 
     if normal == (0, 0, -1) and vert_down is not None:
@@ -1062,7 +1095,7 @@ def mod_entryexit(
             'Using downward variant for {}',
             pretty_name,
         )
-        inst['file'] = vert_down
+        instance_index.set_file(inst, vert_down)
         return 'vert_down'
 
     if override_corr == -1:
@@ -1084,7 +1117,7 @@ def mod_entryexit(
             override_corr,
         )
         inst.fixup[consts.FixupVars.BEE_CORR_INDEX] = override_corr
-        inst['file'] = files[override_corr - 1]
+        instance_index.set_file(inst, files[override_corr - 1])
         return str(override_corr - 1)
 
 
@@ -1113,7 +1146,7 @@ def mod_doorframe(inst: Entity, corr_id, corr_type, corr_name):
         )
     )
     if replace is not None:
-        inst['file'] = replace
+        instance_index.set_file(inst, replace)
 
 
 def calc_rand_seed(vmf: VMF) -> str:
@@ -1121,12 +1154,11 @@ def calc_rand_seed(vmf: VMF) -> str:
 
      This ensures textures remain the same when the map is recompiled.
     """
-    amb_light = instanceLocs.resolve('<ITEM_POINT_LIGHT>')
+    amb_light = instanceLocs.resolve_filter('<ITEM_POINT_LIGHT>')
     lst = [
         inst['targetname'] or '-'  # If no targ
         for inst in
-        vmf.by_class['func_instance']
-        if inst['file'].casefold() in amb_light
+        instance_index.by_file(amb_light)
         ]
     if len(lst) == 0:
         # Very small maps won't have any ambient light entities at all.
@@ -1605,13 +1637,153 @@ def save(vmf: VMF, path: str) -> None:
     LOGGER.info("Complete!")
 
 
-def run_vbsp(vbsp_args, path, new_path=None) -> None:
+class VBSPOutput:
+    """Parses VBSP's output as it is produced.
+
+    This tracks the stages VBSP goes through and how long each takes,
+    the brush/entity/overlay counts, and any leaks or limit errors.
+    """
+    # VBSP prints lines like "Building Faces...done (0)" or
+    # "ProcessBlock_Thread: 0...1...2" when starting each stage.
+    _PHASE_RE = re.compile(r'^([A-Za-z][\w ]*?):? *\.\.\.|^([A-Za-z][\w ]*?): *0\.\.\.')
+    # The VBSP values we display -> config names.
+    # The other options rarely hit the limits, so we don't track them.
+    COUNT_NAMES = {
+        'nummapbrushes': 'brush',
+        'num_map_overlays': 'overlay',
+        'num_entities': 'entity',
+    }
+
+    def __init__(self) -> None:
+        self.start = self._phase_start = time.perf_counter()
+        self.phase = ''  # The current stage of the compile.
+        # The duration of each stage, in order.
+        self.phases = {}  # type: Dict[str, float]
+        # Config name -> (count, limit).
+        self.counts = {
+            'brush': (0, 8192),
+            'overlay': (0, 512),
+            'entity': (0, 2048),
+        }
+        self.leaked = False
+        # The entity the leak was found from.
+        self.leak_info = ''
+        # Lines reporting errors, like exceeding limits.
+        self.errors = []  # type: List[str]
+
+    def feed(self, text: str) -> None:
+        """Parse the next line(s) of output."""
+        for line in text.splitlines():
+            line = line.strip(' \t[|')
+            if line:
+                self._parse_line(line)
+
+    def _parse_line(self, line: str) -> None:
+        """Parse a single line."""
+        if self.leaked and not self.leak_info and 'leaked' in line:
+            # Entity info_player_start (-32 64 128) leaked!
+            self.leak_info = line
+            LOGGER.error('VBSP: {}', line)
+            return
+        if '**** leaked ****' in line:
+            self.leaked = True
+            LOGGER.error('VBSP: Map leaked during "{}"!', self.phase)
+            return
+        if 'MAX_MAP_' in line or line.startswith(('Error', '***')):
+            self.errors.append(line)
+            LOGGER.error('VBSP: {}', line)
+            return
+
+        name, colon, fraction = line.partition(':')
+        if colon and name in self.COUNT_NAMES:
+            self._parse_count(self.COUNT_NAMES[name], line, fraction)
+            return
+
+        match = self._PHASE_RE.match(line)
+        if match is not None:
+            self._next_phase(match.group(1) or match.group(2))
+
+    def _parse_count(self, conf_name: str, line: str, fraction: str) -> None:
+        """Parse a count line, like 'nummapbrushes:    (?? / 8192)'."""
+        # Grab the two numbers from ( onwards.
+        try:
+            count, limit = fraction.split('(', 1)[1].split('/', 1)
+            # Strip the ending ) off the max, and anything after it.
+            self.counts[conf_name] = (
+                int(count.strip()),
+                int(limit.split(')', 1)[0].strip()),
+            )
+        except (ValueError, IndexError):
+            LOGGER.warning('Could not parse VBSP count: "{}"', line)
+
+    def _next_phase(self, phase: str) -> None:
+        """Record the time taken by the previous phase."""
+        now = time.perf_counter()
+        if self.phase:
+            duration = now - self._phase_start
+            self.phases[self.phase] = self.phases.get(self.phase, 0.0) + duration
+            LOGGER.debug('VBSP: "{}" took {:.2f}s', self.phase, duration)
+        self.phase = phase
+        self._phase_start = now
+
+    def finish(self) -> None:
+        """Called when VBSP exits."""
+        self._next_phase('')
+        LOGGER.info(
+            'VBSP took {:.2f}s. Slowest stages: {}',
+            time.perf_counter() - self.start,
+            ', '.join(
+                '{} = {:.2f}s'.format(phase, duration)
+                for phase, duration in sorted(
+                    self.phases.items(),
+                    key=lambda t: t[1],
+                    reverse=True,
+                )[:3]
+            ),
+        )
+
+    def summary(self, code: int) -> Dict[str, Any]:
+        """Produce the data to export."""
+        return {
+            'exit_code': code,
+            'duration': round(time.perf_counter() - self.start, 3),
+            'phases': {
+                phase: round(duration, 3)
+                for phase, duration in self.phases.items()
+            },
+            'counts': {
+                name: {'count': count, 'limit': limit}
+                for name, (count, limit) in self.counts.items()
+            },
+            'leaked': self.leaked,
+            'leak_info': self.leak_info,
+            'errors': self.errors,
+        }
+
+
+class _VBSPOutputHandler(logging.Handler):
+    """Passes each line VBSP outputs to the parser."""
+    def __init__(self, output: VBSPOutput) -> None:
+        super().__init__()
+        self.output = output
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """Parse the message."""
+        try:
+            self.output.feed(record.getMessage())
+        except Exception:
+            self.handleError(record)
+
+
+def run_vbsp(vbsp_args, path, new_path=None, save_stats=True) -> None:
     """Execute the original VBSP, copying files around so it works correctly.
 
     vbsp_args are the arguments to pass.
     path is the original .vmf, new_path is the styled/ name.
     If new_path is passed VBSP will be run on the map in styled/, and we'll
     read through the output to find the entity counts.
+    If save_stats is False, the counts, summary and compile history
+    aren't written - batch compiles run several of these at once.
     """
 
     is_peti = new_path is not None
@@ -1636,15 +1808,32 @@ def run_vbsp(vbsp_args, path, new_path=None) -> None:
     # Use a special name for VBSP's output..
     vbsp_logger = srctools.logger.get_logger('valve.VBSP', alias='<Valve>')
 
-    # And also save a copy for us to analyse.
-    buff = StringIO()
-    vbsp_logger.addHandler(logging.StreamHandler(buff))
+    # And also analyse the output as it's produced.
+    output = VBSPOutput()
+    handler = _VBSPOutputHandler(output)
+    vbsp_logger.addHandler(handler)
+
+    start = time.perf_counter()
+    try:
+        code = srctools.run.run_compiler('vbsp', vbsp_args, vbsp_logger)
+    finally:
+        vbsp_logger.removeHandler(handler)
+    stage_done('vbsp', start)
+    output.finish()
+    if save_stats:
+        try:
+            with open('bee2/vbsp_summary.json', 'w') as f:
+                json.dump(output.summary(code), f, indent=1)
+        except OSError:
+            LOGGER.warning('Could not write VBSP summary:', exc_info=True)
+    else:
+        LOGGER.info('Retrieved counts: {}', output.counts)
 
-    code = srctools.run.run_compiler('vbsp', vbsp_args, vbsp_logger)
     if code != 0:
         # VBSP didn't succeed.
-        if is_peti:  # Ignore Hammer maps
-            process_vbsp_fail(buff.getvalue())
+        if is_peti and save_stats:  # Ignore Hammer maps
+            process_vbsp_fail(output)
+            record_stats(path, success=False)
 
         # Propagate the fail code to Portal 2, and quit.
         sys.exit(code)
@@ -1653,7 +1842,9 @@ def run_vbsp(vbsp_args, path, new_path=None) -> None:
     LOGGER.info("VBSP Done!")
 
     if is_peti:  # Ignore Hammer maps
-        process_vbsp_log(buff.getvalue())
+        if save_stats:
+            process_vbsp_log(output)
+            record_stats(path, success=True)
 
     # Copy over the real files so vvis/vrad can read them
         for ext in (".bsp", ".log", ".prt"):
@@ -1664,12 +1855,11 @@ def run_vbsp(vbsp_args, path, new_path=None) -> None:
                 )
 
 
-def process_vbsp_log(output: str) -> None:
-    """Read through VBSP's log, extracting entity counts.
+def process_vbsp_log(output: VBSPOutput) -> None:
+    """Store the entity counts VBSP reported.
 
     This is then passed back to the main BEE2 application for display.
     """
-
     # The output is something like this:
     # nummapplanes:     (?? / 65536)
     # nummapbrushes:    (?? / 8192)
@@ -1677,48 +1867,43 @@ def process_vbsp_log(output: str) -> None:
     # num_map_overlays: (?? / 512)
     # nummodels:        (?? / 1024)
     # num_entities:     (?? / 16384)
+    LOGGER.info('Retrieved counts: {}', output.counts)
+    count_section = BEE2_config['Counts']
+    for count_name, (value, limit) in output.counts.items():
+        count_section[count_name] = str(value)
+        count_section['max_' + count_name] = str(limit)
+    BEE2_config.save()
 
-    desired_vals = [
-        # VBSP values -> config names
-        ('nummapbrushes:', 'brush'),
-        ('num_map_overlays:', 'overlay'),
-        ('num_entities:', 'entity'),
-    ]
-    # The other options rarely hit the limits, so we don't track them.
 
-    counts = {
-        'brush': ('0', '8192'),
-        'overlay': ('0', '512'),
-        'entity': ('0', '2048'),
-    }
+def stage_done(stage: str, start: float) -> float:
+    """Record how long a stage of the compile took.
+
+    This returns the current time, for the start of the next stage.
+    """
+    now = time.perf_counter()
+    STAGE_TIMES[stage] = now - start
+    return now
 
-    for line in output.splitlines():
-        line = line.lstrip(' \t[|')
-        for name, conf in desired_vals:
-            if not line.startswith(name):
-                continue
-            # Grab the value from ( onwards
-            fraction = line.split('(', 1)[1]
-            # Grab the two numbers, convert to ascii and strip
-            # whitespace.
-            count_num, count_max = fraction.split('/')
-            counts[conf] = (
-                count_num.strip(' \t\n'),
-                # Strip the ending ) off the max. We have the value, so
-                # we might as well tell the BEE2 if it changes..
-                count_max.strip(') \t\n'),
-            )
 
-    LOGGER.info('Retrieved counts: {}', counts)
+def record_stats(path: str, success: bool) -> None:
+    """Add the counts and timings for this compile to the history."""
     count_section = BEE2_config['Counts']
-    for count_name, (value, limit) in counts.items():
-        count_section[count_name] = value
-        count_section['max_' + count_name] = limit
-    BEE2_config.save()
+    counts = {}
+    limits = {}
+    for name in ['brush', 'overlay', 'entity']:
+        counts[name] = srctools.conv_int(count_section.get(name, '0'))
+        limits[name] = srctools.conv_int(count_section.get('max_' + name, '0'))
+    compile_stats.append(
+        os.path.basename(path),
+        success,
+        counts,
+        limits,
+        STAGE_TIMES,
+    )
 
 
-def process_vbsp_fail(output: str) -> None:
-    """Read through VBSP's logs when failing, to update counts."""
+def process_vbsp_fail(output: VBSPOutput) -> None:
+    """Read through VBSP's errors when failing, to update counts."""
     # VBSP doesn't output the actual entity counts, so set the errorred
     # one to max and the others to zero.
     count_section = BEE2_config['Counts']
@@ -1727,7 +1912,7 @@ def process_vbsp_fail(output: str) -> None:
     count_section['max_entity'] = '2048'
     count_section['max_overlay'] = '512'
 
-    for line in reversed(output.splitlines()):
+    for line in reversed(output.errors):
         if 'MAX_MAP_OVERLAYS' in line:
             count_section['entity'] = '0'
             count_section['brush'] = '0'
@@ -1753,11 +1938,96 @@ def process_vbsp_fail(output: str) -> None:
     BEE2_config.save_check()
 
 
-def main() -> None:
-    """Main program code.
+def convert_map(path: str, game: Optional[Game]) -> VMF:
+    """Load and convert a PeTI map, returning the styled VMF.
 
+    This is the main part of the conversion, shared by main() and the batch
+    compiler. If no game is provided, antigel materials will not be
+    generated.
     """
     global MAP_RAND_SEED
+
+    start = time.perf_counter()
+    if PRELOADED_SETTINGS is not None:
+        LOGGER.info("Using preloaded settings.")
+        ant_floor, ant_wall, id_to_item = PRELOADED_SETTINGS
+    else:
+        LOGGER.info("Loading settings...")
+        ant_floor, ant_wall, id_to_item = load_settings()
+    start = stage_done('settings', start)
+
+    vmf = load_map(path)
+    instance_index.build(vmf)
+    instance_traits.set_traits(vmf, id_to_item)
+
+    ant, side_to_antline = antlines.parse_antlines(vmf)
+
+    # Requires instance traits!
+    connections.calc_connections(
+        vmf,
+        ant,
+        texturing.OVERLAYS.get_all('shapeframe'),
+        settings['style_vars']['enableshapesignageframe'],
+        antline_wall=ant_wall,
+        antline_floor=ant_floor,
+    )
+    if 'BEE2_CONN_GRAPH_LOC' in os.environ:
+        # Debug option - write out the item connections for inspection.
+        connections.dump_graph(os.environ['BEE2_CONN_GRAPH_LOC'])
+
+    MAP_RAND_SEED = calc_rand_seed(vmf)
+
+    all_inst = get_map_info(vmf)
+    start = stage_done('load', start)
+
+    brushLoc.POS.read_from_map(vmf, settings['has_attr'], id_to_item)
+
+    fizzler.parse_map(vmf, settings['has_attr'])
+    barriers.parse_map(vmf, settings['has_attr'])
+
+    conditions.init(
+        seed=MAP_RAND_SEED,
+        inst_list=all_inst,
+        vmf_file=vmf,
+    )
+
+    tiling.gen_tile_temp()
+    tiling.analyse_map(vmf, side_to_antline)
+
+    del side_to_antline
+
+    texturing.setup(game, vmf, MAP_RAND_SEED, list(tiling.TILES.values()))
+
+    conditions.check_all(vmf)
+    start = stage_done('conditions', start)
+    add_extra_ents(vmf, GAME_MODE)
+
+    change_ents(vmf)
+    tiling.generate_brushes(vmf)
+    faithplate.gen_faithplates(vmf)
+    change_overlays(vmf)
+    barriers.make_barriers(vmf)
+    fix_worldspawn(vmf)
+
+    # Ensure all VMF outputs use the correct separator.
+    for ent in vmf.entities:
+        for out in ent.outputs:
+            out.comma_sep = False
+
+    # Ensure VRAD knows that the map is PeTI, it can't figure that out
+    # from parameters.
+    vmf.spawn['BEE2_is_peti'] = True
+    # Set this so VRAD can know.
+    vmf.spawn['BEE2_is_preview'] = IS_PREVIEW
+    stage_done('generate', start)
+    return vmf
+
+
+def main(argv: List[str]=None) -> None:
+    """Main program code.
+
+    argv defaults to sys.argv, the compile server passes it explicitly.
+    """
     LOGGER.info("BEE{} VBSP hook initiallised.", utils.BEE_VERSION)
 
     conditions.import_conditions()  # Import all the conditions and
@@ -1777,11 +2047,13 @@ def main() -> None:
     # data.
     open('bee2/vrad_config.cfg', 'w').close()
 
-    args = " ".join(sys.argv)
-    new_args = sys.argv[1:]
-    old_args = sys.argv[1:]
+    if argv is None:
+        argv = sys.argv
+    args = " ".join(argv)
+    new_args = argv[1:]
+    old_args = argv[1:]
     folded_args = [arg.casefold() for arg in old_args]
-    path = sys.argv[-1]  # The path is the last argument to vbsp
+    path = argv[-1]  # The path is the last argument to vbsp
 
     if not old_args:
         # No arguments!
@@ -1855,69 +2127,10 @@ def main() -> None:
         )
     else:
         LOGGER.info("PeTI map detected!")
-
-        LOGGER.info("Loading settings...")
-        ant_floor, ant_wall, id_to_item = load_settings()
-
-        vmf = load_map(path)
-        instance_traits.set_traits(vmf, id_to_item)
-
-        ant, side_to_antline = antlines.parse_antlines(vmf)
-
-        # Requires instance traits!
-        connections.calc_connections(
-            vmf,
-            ant,
-            texturing.OVERLAYS.get_all('shapeframe'),
-            settings['style_vars']['enableshapesignageframe'],
-            antline_wall=ant_wall,
-            antline_floor=ant_floor,
-        )
-
-        MAP_RAND_SEED = calc_rand_seed(vmf)
-
-        all_inst = get_map_info(vmf)
-
-        brushLoc.POS.read_from_map(vmf, settings['has_attr'], id_to_item)
-
-        fizzler.parse_map(vmf, settings['has_attr'])
-        barriers.parse_map(vmf, settings['has_attr'])
-
-        conditions.init(
-            seed=MAP_RAND_SEED,
-            inst_list=all_inst,
-            vmf_file=vmf,
-        )
-
-        tiling.gen_tile_temp()
-        tiling.analyse_map(vmf, side_to_antline)
-
-        del side_to_antline
-
-        texturing.setup(game, vmf, MAP_RAND_SEED, list(tiling.TILES.values()))
-
-        conditions.check_all(vmf)
-        add_extra_ents(vmf, GAME_MODE)
-
-        change_ents(vmf)
-        tiling.generate_brushes(vmf)
-        faithplate.gen_faithplates(vmf)
-        change_overlays(vmf)
-        barriers.make_barriers(vmf)
-        fix_worldspawn(vmf)
-
-        # Ensure all VMF outputs use the correct separator.
-        for ent in vmf.entities:
-            for out in ent.outputs:
-                out.comma_sep = False
-
-        # Ensure VRAD knows that the map is PeTI, it can't figure that out
-        # from parameters.
-        vmf.spawn['BEE2_is_peti'] = True
-        # Set this so VRAD can know.
-        vmf.spawn['BEE2_is_preview'] = IS_PREVIEW
-
+        vmf = convert_map(path, game)
+        start = time.perf_counter()
         save(vmf, new_path)
+        stage_done('save', start)
         run_vbsp(
             vbsp_args=new_args,
             path=path,
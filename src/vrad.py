@@ -12,9 +12,10 @@ import shutil
 import sys
 import importlib
 import pkgutil
+import time
 from io import BytesIO
 from zipfile import ZipFile
-from typing import List, Set
+from typing import List, Set, Optional
 from pathlib import Path
 
 import srctools.run
@@ -27,7 +28,8 @@ from srctools.bsp_transform import run_transformations
 from srctools.scripts.plugin import PluginFinder, Source as PluginSource
 
 from BEE2_config import ConfigFile
-from postcomp import music, screenshot
+import light_profiles
+from postcomp import music, screenshot, res_cache
 # Load our BSP transforms.
 # noinspection PyUnresolvedReferences
 from postcomp import (
@@ -37,12 +39,35 @@ from postcomp import (
 import utils
 
 
+# Set once the transforms are imported, so the compile server only does it once.
+_transforms_loaded = False
+# The engine FGD, loaded once.
+_engine_fgd: Optional[FGD] = None
+
+
+def preload() -> None:
+    """Load the transforms and FGD ahead of time, for the compile server."""
+    load_transforms()
+    load_fgd()
+
+
+def load_fgd() -> FGD:
+    """Load the engine FGD database, reusing it if already loaded."""
+    global _engine_fgd
+    if _engine_fgd is None:
+        _engine_fgd = res_cache.load_fgd()
+    return _engine_fgd
+
+
 def load_transforms() -> None:
     """Load all the BSP transforms.
 
     We need to do this differently when frozen, since they're embedded in our
     executable.
     """
+    global _transforms_loaded
+    if _transforms_loaded:
+        return
     # Find the modules in the conditions package.
     # PyInstaller messes this up a bit.
     if utils.FROZEN:
@@ -72,9 +97,10 @@ def load_transforms() -> None:
         ])
         sys.meta_path.append(finder)
         finder.load_all()
+    _transforms_loaded = True
 
 
-def dump_files(bsp: BSP, dump_folder: str) -> None:
+def dump_files(zipfile: ZipFile, dump_folder: str) -> None:
     """Dump packed files to a location.
     """
     dump_folder = os.path.abspath(dump_folder)
@@ -99,16 +125,23 @@ def dump_files(bsp: BSP, dump_folder: str) -> None:
         else:
             os.remove(name)
 
-    with bsp.packfile() as zipfile:
-        for zipinfo in zipfile.infolist():
-            zipfile.extract(zipinfo, dump_folder)
+    for zipinfo in zipfile.infolist():
+        zipfile.extract(zipinfo, dump_folder)
 
 
-def run_vrad(args: List[str]) -> None:
-    """Execute the original VRAD."""
+def run_vrad(args: List[str], path: str, profile: Optional[str]=None) -> None:
+    """Execute the original VRAD.
+
+    If a lighting profile was used, the time taken is recorded.
+    """
+    LOGGER.info('VRAD arguments: {}', args)
+    start = time.perf_counter()
     code = srctools.run.run_compiler(os.path.join(os.getcwd(), "vrad"), args)
+    duration = time.perf_counter() - start
     if code == 0:
-        LOGGER.info("Done!")
+        LOGGER.info("Done in {:.2f}s!", duration)
+        if profile is not None:
+            light_profiles.record_time(os.path.basename(path), profile, duration)
     else:
         LOGGER.warning("VRAD failed! ({})", code)
         sys.exit(code)
@@ -119,10 +152,9 @@ def main(argv: List[str]) -> None:
     LOGGER.info('BEE2 VRAD hook started!')
         
     args = " ".join(argv)
-    fast_args = argv[1:]
-    full_args = argv[1:]
-    
-    if not fast_args:
+    vrad_args = argv[1:]
+
+    if not vrad_args:
         # No arguments!
         LOGGER.info(
             'No arguments!\n'
@@ -137,38 +169,27 @@ def main(argv: List[str]) -> None:
 
     # The path is the last argument to vrad
     # P2 adds wrong slashes sometimes, so fix that.
-    fast_args[-1] = path = os.path.normpath(argv[-1])  # type: str
+    vrad_args[-1] = path = os.path.normpath(argv[-1])  # type: str
 
     LOGGER.info("Map path is " + path)
 
     LOGGER.info('Loading Settings...')
     config = ConfigFile('compile.cfg')
 
-    for a in fast_args[:]:
+    for a in vrad_args[:]:
         folded_a = a.casefold()
-        if folded_a.casefold() in (
-                "-final",
-                "-staticproplighting",
-                "-staticproppolys",
-                "-textureshadows",
-                ):
-            # remove final parameters from the modified arguments
-            fast_args.remove(a)
-        elif folded_a == '-both':
+        if folded_a == '-both':
             # LDR Portal 2 isn't actually usable, so there's not much
             # point compiling for it.
-            pos = fast_args.index(a)
-            fast_args[pos] = full_args[pos] = '-hdr'
+            vrad_args[vrad_args.index(a)] = '-hdr'
         elif a in ('-force_peti', '-force_hammer', '-no_pack'):
             # we need to strip these out, otherwise VRAD will get confused
-            fast_args.remove(a)
-            full_args.remove(a)
-
-    fast_args = ['-bounce', '2', '-noextra'] + fast_args
+            vrad_args.remove(a)
 
-    # Fast args: -bounce 2 -noextra -game $gamedir $path\$file
-    # Final args: -both -final -staticproplighting -StaticPropPolys
+    # Portal 2 passes: -both -final -staticproplighting -StaticPropPolys
     # -textureshadows  -game $gamedir $path\$file
+    # The lighting profile then adjusts these. The default fast profile
+    # gives: -bounce 2 -noextra -game $gamedir $path\$file
 
     if not path.endswith(".bsp"):
         path += ".bsp"
@@ -183,13 +204,24 @@ def main(argv: List[str]) -> None:
 
     bsp_ents = bsp_file.read_ent_data()
 
+    # The lighting profile to use, if edit_args is set.
+    profile = light_profiles.PROFILE_FAST
+
     # If VBSP marked it as Hammer, trust that.
     if srctools.conv_bool(bsp_ents.spawn['BEE2_is_peti']):
         is_peti = True
         # Detect preview via knowing the bsp name. If we are in preview,
         # check the config file to see what was specified there.
         if os.path.basename(path) == "preview.bsp":
-            edit_args = not config.get_bool('General', 'vrad_force_full')
+            # Previously this was a boolean.
+            if config.get_bool('General', 'vrad_force_full'):
+                default_profile = light_profiles.PROFILE_FULL
+            else:
+                default_profile = light_profiles.PROFILE_FAST
+            profile = config.get_val('General', 'vrad_profile', default_profile).casefold()
+            # Even the full profile goes through here, so it's not
+            # reported as publishing.
+            edit_args = True
         else:
             # publishing - always force full lighting.
             edit_args = False
@@ -219,9 +251,11 @@ def main(argv: List[str]) -> None:
             fsys.systems.remove(child_sys)
             fsys.systems.insert(0, child_sys)
 
-    zip_data = BytesIO()
-    zip_data.write(bsp_file.get_lump(BSP_LUMPS.PAKFILE))
-    zipfile = ZipFile(zip_data)
+    # BytesIO shares the lump's bytes object until it's written to,
+    # so this doesn't copy the (possibly large) pakfile.
+    zipfile = ZipFile(BytesIO(bsp_file.get_lump(BSP_LUMPS.PAKFILE)))
+    # Cubemap files packed into the map already.
+    existing = set(zipfile.namelist())
 
     # Mount the existing packfile, so the cubemap files are recognised.
     fsys.add_sys(ZipFileSystem('<BSP pakfile>', zipfile))
@@ -235,7 +269,7 @@ def main(argv: List[str]) -> None:
         LOGGER.debug('- {}: {!r}', child_sys[1], child_sys[0])
 
     LOGGER.info('Reading our FGD files...')
-    fgd = FGD.engine_dbase()
+    fgd = load_fgd()
 
     packlist = PackList(fsys)
     packlist.load_soundscript_manifest(
@@ -244,11 +278,8 @@ def main(argv: List[str]) -> None:
 
     load_transforms()
 
-    # We need to add all soundscripts in scripts/bee2_snd/
-    # This way we can pack those, if required.
-    for soundscript in fsys.walk_folder('scripts/bee2_snd/'):
-        if soundscript.path.endswith('.txt'):
-            packlist.load_soundscript(soundscript, always_include=False)
+    # We need to add soundscripts in scripts/bee2_snd/
+    res_cache.load_soundscripts(packlist, fsys)
 
     if is_peti:
         LOGGER.info('Checking for music:')
@@ -280,11 +311,8 @@ def main(argv: List[str]) -> None:
             else:
                 pack_blacklist.add(child_sys)
 
-    if '-no_pack' not in args:
-        # Cubemap files packed into the map already.
-        with bsp_file.packfile() as zipfile:
-            existing = set(zipfile.namelist())
-
+    do_pack = '-no_pack' not in args
+    if do_pack:
         LOGGER.info('Writing to BSP...')
         packlist.pack_into_zip(
             bsp_file,
@@ -293,17 +321,20 @@ def main(argv: List[str]) -> None:
             blacklist=pack_blacklist,
         )
 
+    do_dump = config.get_bool('General', 'packfile_dump_enable')
+    if do_pack or do_dump:
+        # Open the final pakfile just once, for both of these.
         with bsp_file.packfile() as zipfile:
-            LOGGER.info('Packed files:\n{}', '\n'.join(
-                set(zipfile.namelist()) - existing
-            ))
-
-    if config.get_bool('General', 'packfile_dump_enable'):
-        dump_files(bsp_file, config.get_val(
-            'General',
-            'packfile_dump_dir',
-            '../dump/'
-        ))
+            if do_pack:
+                LOGGER.info('Packed files:\n{}', '\n'.join(
+                    set(zipfile.namelist()) - existing
+                ))
+            if do_dump:
+                dump_files(zipfile, config.get_val(
+                    'General',
+                    'packfile_dump_dir',
+                    '../dump/'
+                ))
 
     # Copy new entity data.
     bsp_file.lumps[BSP_LUMPS.ENTITIES].data = BSP.write_ent_data(bsp_ents)
@@ -315,14 +346,18 @@ def main(argv: List[str]) -> None:
         screenshot.modify(config, game.path)
 
     if edit_args:
-        LOGGER.info("Forcing Cheap Lighting!")
-        run_vrad(fast_args)
+        LOGGER.info('Using lighting profile "{}"!', profile)
+        run_vrad(light_profiles.build_args(config, profile, vrad_args), path, profile)
+    elif is_peti:
+        LOGGER.info("Publishing - Full lighting enabled! (or forced to do so)")
+        run_vrad(
+            light_profiles.publish_args(config, vrad_args),
+            path,
+            light_profiles.PROFILE_FULL,
+        )
     else:
-        if is_peti:
-            LOGGER.info("Publishing - Full lighting enabled! (or forced to do so)")
-        else:
-            LOGGER.info("Hammer map detected! Not forcing cheap lighting..")
-        run_vrad(full_args)
+        LOGGER.info("Hammer map detected! Not forcing cheap lighting..")
+        run_vrad(vrad_args, path)
 
     LOGGER.info("BEE2 VRAD hook finished!")
 